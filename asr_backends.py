@@ -0,0 +1,249 @@
+import json
+import threading
+import time
+import zlib
+
+from instrumentation import observe, span
+from streaming import to_mono_int16
+
+# Importações opcionais: cada reconhecedor só precisa da sua biblioteca
+try:
+    import speech_recognition as sr
+except ImportError:
+    sr = None
+
+try:
+    import vosk
+except ImportError:
+    vosk = None
+
+
+class NoSpeechError(Exception):
+    """O reconhecedor não encontrou fala compreensível no áudio"""
+
+
+class BackendError(Exception):
+    """Falha do reconhecedor (rede, serviço, modelo); pode valer a pena repetir"""
+
+
+class ASRBackend:
+    """Interface dos reconhecedores de fala.
+
+    ``transcribe(amostras, taxa)`` recebe int16 mono e retorna uma lista de
+    segmentos ``{'start', 'end', 'text', 'confidence'}`` (tempos em segundos
+    a partir do início do áudio). Lança NoSpeechError quando não há fala e
+    BackendError em falhas. A latência de cada chamada é medida aqui, igual
+    para todas as implementações (e vai para o registro de instrumentation
+    como 'asr_request', com o nome do reconhecedor); implementações que
+    convertem o áudio antes do pedido medem essa etapa como 'encoding'.
+    """
+
+    name = "base"
+    label = "Base"
+    offline = False
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.audio_seconds = 0.0
+        self.last_seconds = 0.0
+
+    def available(self):
+        """(disponível, motivo) - motivo explica o que instalar quando não estiver"""
+        return True, ""
+
+    def transcribe(self, samples, rate, energy_threshold=None):
+        samples = to_mono_int16(samples)
+        if len(samples) == 0:
+            raise NoSpeechError("áudio vazio")
+        start = time.perf_counter()
+        try:
+            return self._transcribe(samples, rate, energy_threshold)
+        finally:
+            elapsed = time.perf_counter() - start
+            observe('asr_request', elapsed, backend=self.name)
+            with self._stats_lock:
+                self.calls += 1
+                self.total_seconds += elapsed
+                self.audio_seconds += len(samples) / float(rate)
+                self.last_seconds = elapsed
+
+    def _transcribe(self, samples, rate, energy_threshold):
+        raise NotImplementedError
+
+    def latency_stats(self):
+        """Latência média/última por chamada e fator de tempo real (processamento / duração do áudio)"""
+        with self._stats_lock:
+            return {
+                'calls': self.calls,
+                'mean_ms': 1000.0 * self.total_seconds / self.calls if self.calls else 0.0,
+                'last_ms': 1000.0 * self.last_seconds,
+                'real_time_factor': self.total_seconds / self.audio_seconds if self.audio_seconds else 0.0,
+            }
+
+    def format_latency(self):
+        stats = self.latency_stats()
+        if not stats['calls']:
+            return f"{self.label}: sem chamadas"
+        return (f"{self.label}: {stats['mean_ms']:.0f} ms/pedido (último {stats['last_ms']:.0f} ms, "
+                f"{stats['calls']} pedidos, {stats['real_time_factor']:.2f}x tempo real)")
+
+
+class GoogleBackend(ASRBackend):
+    """Google Web Speech via speech_recognition (um pedido de rede por áudio)"""
+
+    name = "google"
+    label = "Google (online)"
+
+    def __init__(self, language='pt-BR'):
+        super().__init__()
+        self.language = language
+
+    def available(self):
+        if sr is None:
+            return False, "Instale: pip install SpeechRecognition"
+        return True, ""
+
+    def _transcribe(self, samples, rate, energy_threshold):
+        recognizer = sr.Recognizer()
+        # Otimização 2: Configurações mais rápidas para transcrição
+        if energy_threshold is not None:
+            recognizer.energy_threshold = energy_threshold  # Limiar calibrado pelo VAD
+        recognizer.dynamic_energy_threshold = False  # Desabilitar ajuste dinâmico
+
+        # O áudio vai direto da memória para o reconhecedor, sem WAV temporário.
+        # Sem 'encoding' aqui: a compressão em FLAC acontece dentro de
+        # recognize_google, junto com o pedido, e é medida em 'asr_request'
+        audio = sr.AudioData(samples.tobytes(), rate, 2)
+        print(f"  Enviando para transcrição... ({len(audio.frame_data):,} bytes)")
+        try:
+            # show_all traz a confiança da melhor alternativa
+            result = recognizer.recognize_google(audio, language=self.language, show_all=True)
+        except sr.UnknownValueError as e:
+            raise NoSpeechError(str(e)) from e
+        except sr.RequestError as e:
+            raise BackendError(str(e)) from e
+        alternatives = result.get('alternative') if isinstance(result, dict) else None
+        if not alternatives:
+            raise NoSpeechError("nenhuma alternativa reconhecida")
+        best = alternatives[0]
+        return [{
+            'start': 0.0,
+            'end': len(samples) / float(rate),
+            'text': best.get('transcript', ''),
+            'confidence': best.get('confidence'),
+        }]
+
+
+class VoskBackend(ASRBackend):
+    """Reconhecimento offline com Vosk (Kaldi), só CPU, no próprio processo.
+
+    O modelo (ex.: vosk-model-small-pt-0.3) é carregado uma vez e compartilhado;
+    cada chamada cria seu próprio reconhecedor, então várias podem rodar em paralelo.
+    """
+
+    name = "vosk"
+    label = "Vosk (offline)"
+    offline = True
+
+    # Blocos de 0,25 s a 16 kHz entregues ao reconhecedor
+    FEED_FRAMES = 4000
+
+    def __init__(self, model_path=None):
+        super().__init__()
+        self.model_path = model_path
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    def available(self):
+        if vosk is None:
+            return False, "Instale: pip install vosk (e baixe um modelo em alphacephei.com/vosk/models)"
+        if not self.model_path:
+            return False, "Defina VOSK_MODEL_PATH no config.py com a pasta do modelo Vosk em português"
+        return True, ""
+
+    def _get_model(self):
+        with self._model_lock:
+            if self._model is None:
+                try:
+                    vosk.SetLogLevel(-1)
+                    self._model = vosk.Model(self.model_path)
+                except Exception as e:
+                    raise BackendError(f"Não foi possível carregar o modelo Vosk: {e}") from e
+            return self._model
+
+    def _transcribe(self, samples, rate, energy_threshold):
+        recognizer = vosk.KaldiRecognizer(self._get_model(), rate)
+        recognizer.SetWords(True)
+        results = []
+        with span('encoding', format='pcm', backend=self.name):
+            data = samples.tobytes()
+        step = self.FEED_FRAMES * 2
+        for offset in range(0, len(data), step):
+            if recognizer.AcceptWaveform(data[offset:offset + step]):
+                results.append(json.loads(recognizer.Result()))
+        results.append(json.loads(recognizer.FinalResult()))
+
+        segments = []
+        for result in results:
+            words = result.get('result') or []
+            text = result.get('text', '').strip()
+            if not text or not words:
+                continue
+            segments.append({
+                'start': float(words[0]['start']),
+                'end': float(words[-1]['end']),
+                'text': text,
+                'confidence': sum(w.get('conf', 0.0) for w in words) / len(words),
+            })
+        if not segments:
+            raise NoSpeechError("nenhuma palavra reconhecida")
+        return segments
+
+
+class FakeBackend(ASRBackend):
+    """Reconhecedor determinístico para testes e benchmarks, sem rede nem modelo.
+
+    O texto depende só do conteúdo do áudio (CRC32 das amostras) e a latência
+    simulada é ``latency + latency_per_second * duração``.
+    """
+
+    name = "fake"
+    label = "Simulado (benchmark)"
+    offline = True
+
+    def __init__(self, latency=0.0, latency_per_second=0.0):
+        super().__init__()
+        self.latency = latency
+        self.latency_per_second = latency_per_second
+
+    def _transcribe(self, samples, rate, energy_threshold):
+        duration = len(samples) / float(rate)
+        delay = self.latency + self.latency_per_second * duration
+        if delay > 0:
+            time.sleep(delay)
+        checksum = zlib.crc32(samples.tobytes())
+        return [{
+            'start': 0.0,
+            'end': duration,
+            'text': f"fala {checksum:08x} ({duration:.1f}s)",
+            'confidence': 1.0,
+        }]
+
+
+BACKENDS = {backend.name: backend for backend in (GoogleBackend, VoskBackend, FakeBackend)}
+
+
+def create_backend(name, **options):
+    """Cria o reconhecedor pelo nome ('google', 'vosk', 'fake') com as opções do config"""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Reconhecedor desconhecido: {name} (opções: {', '.join(BACKENDS)})")
+    return backend_class(**options)
+
+
+def segments_text(segments):
+    """Texto corrido dos segmentos, na ordem"""
+    return " ".join(segment['text'].strip() for segment in segments if segment['text'].strip())
@@ -0,0 +1,698 @@
+import os
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import anthropic
+import soundfile as sf
+
+import config
+import document_extraction
+import text_cleanup
+from asr_backends import BackendError, NoSpeechError, create_backend, segments_text
+from corpus import DocumentCorpus
+from extraction_cache import ExtractionCache
+from instrumentation import increment, observe, span
+from response_cache import ResponseCache
+from retrieval import format_chunks, page_offsets
+from segment_transcription import SegmentTranscriber, split_at_silence, join_segments, format_timestamp, merge_labeled
+from similar_cache import SimilarQuestionCache
+from streaming import to_mono_int16
+from token_budget import TokenBudget, TokenBudgetError, MESSAGE_OVERHEAD_TOKENS, fit_chunks, summarize_pages
+
+# Configurações opcionais (config.py antigos continuam funcionando com os padrões)
+RETRIEVAL_TOP_K = getattr(config, "RETRIEVAL_TOP_K", 5)
+RETRIEVAL_CHUNK_SIZE = getattr(config, "RETRIEVAL_CHUNK_SIZE", 1200)
+PROMPT_CACHE_DOCUMENT = getattr(config, "PROMPT_CACHE_DOCUMENT", True)
+PROMPT_CACHE_MAX_CHARS = getattr(config, "PROMPT_CACHE_MAX_CHARS", 400000)
+CONTEXT_WINDOW_TOKENS = getattr(config, "CONTEXT_WINDOW_TOKENS", 200000)
+PROMPT_LATENCY_SECONDS = getattr(config, "PROMPT_LATENCY_SECONDS", 8)
+PREFILL_TOKENS_PER_SECOND = getattr(config, "PREFILL_TOKENS_PER_SECOND", 10000)
+RESPONSE_CACHE_PATH = getattr(config, "RESPONSE_CACHE_PATH", None)
+RESPONSE_CACHE_MAX_MB = getattr(config, "RESPONSE_CACHE_MAX_MB", 50)
+RESPONSE_CACHE_TTL_HOURS = getattr(config, "RESPONSE_CACHE_TTL_HOURS", 24 * 7)
+SIMILAR_QUESTION_THRESHOLD = getattr(config, "SIMILAR_QUESTION_THRESHOLD", 0.8)
+SIMILAR_QUESTION_MAX_ENTRIES = getattr(config, "SIMILAR_QUESTION_MAX_ENTRIES", 5000)
+PDF_EXTRACTION_WORKERS = getattr(config, "PDF_EXTRACTION_WORKERS", None)
+EXTRACTION_CACHE_DIR = getattr(config, "EXTRACTION_CACHE_DIR", None)
+EXTRACTION_CACHE_MAX_MB = getattr(config, "EXTRACTION_CACHE_MAX_MB", 500)
+DOCUMENT_CLEANUP = getattr(config, "DOCUMENT_CLEANUP", True)
+TRANSCRIPTION_SEGMENT_SECONDS = getattr(config, "TRANSCRIPTION_SEGMENT_SECONDS", 30)
+TRANSCRIPTION_WORKERS = getattr(config, "TRANSCRIPTION_WORKERS", 4)
+TRANSCRIPTION_RETRIES = getattr(config, "TRANSCRIPTION_RETRIES", 2)
+ASR_BACKEND = getattr(config, "ASR_BACKEND", "google")
+VOSK_MODEL_PATH = getattr(config, "VOSK_MODEL_PATH", None)
+FAKE_ASR_LATENCY_SECONDS = getattr(config, "FAKE_ASR_LATENCY_SECONDS", 0.2)
+
+# Parâmetros do modelo
+CLAUDE_MODEL = "claude-3-haiku-20240307"  # Modelo mais rápido que sonnet
+CLAUDE_MAX_TOKENS = 1500  # Reduzir tokens para resposta mais rápida
+CLAUDE_TEMPERATURE = 0.3  # Menos criatividade = mais velocidade
+
+# Instruções fixas: ficam no início do prompt para fazer parte do prefixo em cache
+CLAUDE_INSTRUCTIONS = """Você responde perguntas feitas durante uma reunião sobre o documento fornecido.
+
+INSTRUÇÕES PARA RESPOSTA:
+- Use o documento como base principal e cite as páginas quando possível
+- Se houver mais de um documento, diga de qual documento vem cada informação
+- Adicione informações complementares úteis quando relevante
+- Mantenha a resposta concisa (máximo 1000 tokens)
+- Priorize clareza e objetividade mas linguagem acessivel"""
+
+# Taxa de amostragem de todo o áudio entregue aos reconhecedores
+SAMPLE_RATE = 16000
+
+
+class MeetingAssistant:
+    """Núcleo do transcritor sem interface: documentos, reconhecimento de fala e perguntas ao Claude.
+
+    Guarda o estado compartilhado (corpus, caches, orçamento de tokens,
+    reconhecedores e cliente da API) e pode ser usado por várias threads ao
+    mesmo tempo. A interface Tk, o modo em lote e o servidor usam esta classe;
+    o progresso é informado por callbacks, nunca por widgets.
+    """
+
+    def __init__(self, api_key=None, client=None, asr_backend=ASR_BACKEND, rate=SAMPLE_RATE):
+        self.rate = rate
+        self.api_key = api_key
+        self._client = client
+        self._client_lock = threading.Lock()
+        # Salvar em WAV o áudio enviado ao reconhecedor (só para depuração)
+        self.debug_save_audio = os.environ.get("TRANSCRITOR_DEBUG_AUDIO") == "1"
+
+        # Otimização: Cache persistente (SQLite) para respostas da API
+        self.response_cache = ResponseCache(
+            path=RESPONSE_CACHE_PATH,
+            max_size_mb=RESPONSE_CACHE_MAX_MB,
+            ttl_seconds=RESPONSE_CACHE_TTL_HOURS * 3600
+        )
+        # Perguntas quase iguais (variações da transcrição) reaproveitam a resposta
+        self.similar_cache = SimilarQuestionCache(
+            threshold=SIMILAR_QUESTION_THRESHOLD,
+            ttl_seconds=RESPONSE_CACHE_TTL_HOURS * 3600,
+            max_entries=SIMILAR_QUESTION_MAX_ENTRIES
+        )
+        # Otimização: tamanho do prompt conferido localmente antes de chamar a API
+        self.token_budget = TokenBudget(
+            context_tokens=CONTEXT_WINDOW_TOKENS,
+            max_output_tokens=CLAUDE_MAX_TOKENS,
+            latency_seconds=PROMPT_LATENCY_SECONDS,
+            prefill_tokens_per_second=PREFILL_TOKENS_PER_SECOND
+        )
+
+        # Requisições simultâneas ao reconhecedor por transcrição
+        self.transcription_workers = TRANSCRIPTION_WORKERS
+        # Reconhecedor de fala plugável (Google, Vosk offline ou simulado)
+        self.asr_backends = {}
+        self.asr_backend = self.get_asr_backend(asr_backend)
+
+        # Corpus: vários documentos, cada um extraído e indexado separadamente;
+        # as páginas ficam disponíveis para perguntas durante a extração
+        self.corpus = DocumentCorpus(chunk_size=RETRIEVAL_CHUNK_SIZE, cleanup=DOCUMENT_CLEANUP)
+        self.extraction_cache = ExtractionCache(EXTRACTION_CACHE_DIR, max_size_mb=EXTRACTION_CACHE_MAX_MB)
+
+    @property
+    def client(self):
+        """Cliente da API, criado no primeiro uso (transcrever não exige API key)"""
+        with self._client_lock:
+            if self._client is None:
+                self._client = anthropic.Anthropic(api_key=self.api_key)
+            return self._client
+
+    # ------------------------------------------------------------------
+    # Documentos
+    # ------------------------------------------------------------------
+
+    def load_document(self, file_path, on_pages=None):
+        """Adiciona um documento ao corpus e o converte nesta thread; retorna o CorpusDocument"""
+        document = self.corpus.add(file_path)
+        self.convert_document(document, on_pages=on_pages)
+        return document
+
+    def convert_document(self, document, on_pages=None):
+        """Converte o documento para texto, publicando as páginas conforme ficam prontas.
+
+        ``on_pages(prontas, total)`` é chamado a cada lote de páginas de PDF.
+        Em caso de erro o documento sai do corpus e a exceção é repassada.
+        """
+        file_path = document.path
+        filename = document.name
+        try:
+            if document.removed:
+                return
+
+            # Otimização: documento já extraído antes volta direto do cache em disco
+            cache_key = self.extraction_cache.key_for(file_path, self.extractor_id(file_path))
+            index_name = f"indice_{RETRIEVAL_CHUNK_SIZE}"
+            cached = self.extraction_cache.load(cache_key)
+            if cached is not None:
+                print(f"📦 Extração reaproveitada do cache: {filename}")
+                index = self.extraction_cache.load_artifact(cache_key, index_name)
+                self.corpus.publish_text(document, cached['text'], index=index, cleanup=cached['meta'].get('cleanup'))
+                if index is None:
+                    self.extraction_cache.save_artifact(cache_key, index_name, document.index)
+            else:
+                if file_path.endswith('.pdf'):
+                    # Perguntas já podem ser feitas sobre as páginas extraídas até o momento
+                    self.load_pdf_incrementally(document, on_pages)
+                else:
+                    raw_text = self.extract_document_text(file_path)
+                    if DOCUMENT_CLEANUP:
+                        text = text_cleanup.clean_text(raw_text)
+                        report = text_cleanup.cleanup_report(len(raw_text), len(text))
+                    else:
+                        text, report = raw_text, None
+                    self.corpus.publish_text(document, text, cleanup=report)
+                if document.removed:
+                    return
+                self.extraction_cache.save(cache_key, document.content, meta={
+                    'filename': filename,
+                    'page_offsets': page_offsets(document.content),
+                    'cleanup': document.cleanup
+                })
+                self.extraction_cache.save_artifact(cache_key, index_name, document.index)
+
+            self.corpus.mark_complete(document)
+        except Exception:
+            self.corpus.remove(file_path)
+            raise
+
+    def load_pdf_incrementally(self, document, on_pages=None):
+        """Extrai o PDF em paralelo e publica cada lote de páginas assim que fica pronto"""
+        raw_pages = []
+        for batch, done, total in document_extraction.iter_pdf_pages(document.path, workers=PDF_EXTRACTION_WORKERS):
+            if document.removed:
+                # Documento removido durante a conversão: parar de extrair
+                return
+            raw_pages.extend(batch)
+            self.corpus.publish_pages(document, batch, done, total)
+            if on_pages:
+                on_pages(done, total)
+        if DOCUMENT_CLEANUP:
+            raw_pages.sort(key=lambda page: page[0])
+            self.corpus.remove_repeated_page_lines(document, len(document_extraction.assemble_pages(raw_pages)))
+        if not document.content.strip():
+            raise Exception(document_extraction.NO_PDF_LIBRARY_MESSAGE)
+
+    def extractor_id(self, file_path):
+        """Biblioteca e versão usadas para extrair o arquivo (parte da chave do cache)"""
+        if file_path.endswith('.pdf'):
+            extractor = f"pdf:{document_extraction.pdf_extractor_signature()}"
+        elif file_path.endswith('.docx'):
+            extractor = f"docx:{document_extraction.DOCX_EXTRACTOR_VERSION}"
+        else:
+            extractor = "texto:utf-8"
+        if DOCUMENT_CLEANUP:
+            extractor += f"+limpeza-v{text_cleanup.CLEANUP_VERSION}"
+        return extractor
+
+    def extract_document_text(self, file_path):
+        """Extrai o texto de arquivos que não são PDF"""
+        if file_path.endswith('.docx'):
+            return document_extraction.extract_docx_text(file_path)
+        else:
+            # TXT ou outro formato: tentar ler como texto
+            with open(file_path, 'r', encoding='utf-8') as file:
+                return file.read()
+
+    # ------------------------------------------------------------------
+    # Reconhecimento de fala
+    # ------------------------------------------------------------------
+
+    def asr_backend_options(self, name):
+        """Opções do config para cada reconhecedor"""
+        if name == "vosk":
+            return {'model_path': VOSK_MODEL_PATH}
+        if name == "fake":
+            return {'latency': FAKE_ASR_LATENCY_SECONDS}
+        return {}
+
+    def get_asr_backend(self, name):
+        """Retorna o reconhecedor (criado uma vez e reaproveitado); Google se o escolhido não estiver disponível"""
+        backend = self.asr_backends.get(name)
+        if backend is None:
+            backend = create_backend(name, **self.asr_backend_options(name))
+            self.asr_backends[name] = backend
+        available, reason = backend.available()
+        if not available and name != "google":
+            print(f"⚠️ Reconhecedor {backend.label} indisponível: {reason}")
+            return self.get_asr_backend("google")
+        return backend
+
+    def transcribe_audio_array(self, audio_data, energy_threshold=300):
+        """Transcreve um array de áudio com o reconhecedor selecionado; retorna None se estiver vazio.
+
+        Lança NoSpeechError / BackendError (ver asr_backends).
+        """
+        samples = to_mono_int16(audio_data)
+        if len(samples) == 0:
+            print("  ❌ Áudio vazio")
+            return None
+
+        if self.debug_save_audio:
+            self.save_debug_audio(samples)
+
+        segments = self.asr_backend.transcribe(samples, self.rate, energy_threshold=energy_threshold)
+        return segments_text(segments)
+
+    def transcribe_segments(self, speech_audio, vad, on_progress=None, max_workers=None):
+        """Corta o áudio nas pausas e transcreve os trechos em paralelo, na ordem original.
+
+        ``max_workers`` limita os pedidos simultâneos ao reconhecedor (padrão:
+        TRANSCRIPTION_WORKERS). Retorna None se o áudio estiver vazio. Lança o erro do reconhecedor só
+        se nenhum trecho for transcrito; trechos que falharem aparecem como [...].
+        """
+        segments = split_at_silence(speech_audio, self.rate, vad, max_segment=TRANSCRIPTION_SEGMENT_SECONDS,
+                                    min_segment=TRANSCRIPTION_SEGMENT_SECONDS / 3.0)
+        if not segments:
+            return None
+        if len(segments) > 1:
+            lengths = ", ".join(f"{(end - start) / self.rate:.0f}s" for start, end in segments)
+            print(f"✂️ Áudio dividido em {len(segments)} trechos ({lengths})")
+
+        energy_threshold = vad.energy_threshold
+        transcriber = SegmentTranscriber(
+            lambda samples: self.transcribe_audio_array(samples, energy_threshold=energy_threshold),
+            max_workers=max_workers or self.transcription_workers,
+            retries=TRANSCRIPTION_RETRIES,
+            retry_on=(BackendError,),
+            empty_on=(NoSpeechError,)
+        )
+
+        texts, errors = transcriber.transcribe(speech_audio, segments, on_progress=on_progress)
+        for i, error in sorted(errors.items()):
+            print(f"  ⚠️ Trecho {i + 1} não transcrito: {error}")
+        if len(errors) == len(segments):
+            raise errors[0]
+        transcription = join_segments(texts)
+        if not transcription:
+            raise NoSpeechError("nenhum trecho reconhecido")
+        return transcription
+
+    def transcribe_channels(self, channels, on_progress=None):
+        """Transcreve cada canal por si e junta tudo numa transcrição com horário.
+
+        ``channels`` é [(rótulo, áudio, início em segundos, vad)]. Cada canal usa o
+        próprio VAD para achar os trechos de fala; os trechos de todos os canais
+        vão para o mesmo pool limitado, então microfone e sistema são
+        reconhecidos ao mesmo tempo.
+        """
+        clips = []
+        placements = []     # (rótulo, início do trecho em segundos) de cada clip
+        for label, audio, offset, vad in channels:
+            if not vad.calibrated:
+                vad.calibrate(audio)
+            regions = vad.speech_regions(audio)
+            speech_seconds = sum(end - start for start, end in regions) / float(self.rate)
+            print(f"🗣️ {label}: {len(regions)} trechos de fala, {speech_seconds:.1f}s "
+                  f"(início +{offset:.3f}s, limiar {vad.energy_threshold:.0f})")
+            for region_start, region_end in regions:
+                region = audio[region_start:region_end]
+                for start, end in split_at_silence(region, self.rate, vad,
+                                                   max_segment=TRANSCRIPTION_SEGMENT_SECONDS,
+                                                   min_segment=TRANSCRIPTION_SEGMENT_SECONDS / 3.0):
+                    clips.append((region[start:end], vad.energy_threshold))
+                    placements.append((label, offset + (region_start + start) / float(self.rate)))
+        if not clips:
+            raise NoSpeechError("nenhuma fala nos canais")
+
+        transcriber = SegmentTranscriber(
+            lambda clip: self.asr_backend.transcribe(clip[0], self.rate, energy_threshold=clip[1]),
+            max_workers=self.transcription_workers,
+            retries=TRANSCRIPTION_RETRIES,
+            retry_on=(BackendError,),
+            empty_on=(NoSpeechError,),
+            empty_result=[]
+        )
+
+        results, errors = transcriber.transcribe_clips(clips, on_progress=on_progress)
+        if len(errors) == len(clips):
+            raise next(iter(errors.values()))
+        entries = []
+        for i, ((label, clip_start), segments) in enumerate(zip(placements, results)):
+            if i in errors:
+                print(f"  ⚠️ Trecho {i + 1} ({label}, {format_timestamp(clip_start)}) não transcrito: {errors[i]}")
+                entries.append({'start': clip_start, 'label': label, 'text': "[...]"})
+                continue
+            entries.extend({'start': clip_start + segment['start'], 'label': label, 'text': segment['text']}
+                           for segment in segments)
+        transcription = merge_labeled(entries)
+        if not transcription:
+            raise NoSpeechError("nenhum trecho reconhecido")
+        return transcription
+
+    def save_debug_audio(self, audio_data):
+        """Salva o áudio enviado ao reconhecedor (apenas com debug_save_audio ativo)"""
+        # Microsegundos no nome evitam colisão entre transcrições no mesmo segundo
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        audio_filename = f"debug_audio_{timestamp}.wav"
+        try:
+            with span('encoding', format='wav'):
+                sf.write(audio_filename, to_mono_int16(audio_data), self.rate)
+            print(f"💾 Áudio de debug salvo: {audio_filename}")
+        except Exception as e:
+            print(f"  ⚠️ Erro ao salvar áudio de debug: {e}")
+
+    # ------------------------------------------------------------------
+    # Perguntas ao Claude
+    # ------------------------------------------------------------------
+
+    def build_document_context(self, transcription, top_k=RETRIEVAL_TOP_K, available_tokens=None):
+        """Seleciona o contexto que cabe no orçamento; retorna (contexto, modo).
+
+        Modo 'trechos': os trechos relevantes de maior pontuação que couberem.
+        Modo 'resumo': nenhum trecho casou com a pergunta (ou nenhum coube),
+        então vai o começo de cada página como visão geral do documento.
+        """
+        if available_tokens is None:
+            available_tokens = self.token_budget.limit
+        # Busca em todos os documentos do corpus; cada trecho indica o documento de origem
+        chunks = self.corpus.search(transcription, k=top_k)
+
+        relevant = fit_chunks([chunk for chunk in chunks if chunk['score'] > 0], available_tokens)
+        if relevant:
+            sources = sorted({f"{chunk['source']} p.{chunk['page']}" for chunk in relevant})
+            print(f"🔎 {len(relevant)} trechos selecionados ({', '.join(sources)})")
+            return format_chunks(relevant), 'trechos'
+
+        # O resumo ocupa no máximo o espaço que os trechos ocupariam
+        summary_tokens = min(available_tokens, self.retrieval_token_allowance(top_k))
+        summary = summarize_pages(self.corpus.page_texts(), summary_tokens)
+        if not summary:
+            raise TokenBudgetError(
+                f"Nenhuma parte do documento cabe no orçamento de {self.token_budget.limit:,} tokens. "
+                f"Aumente PROMPT_LATENCY_SECONDS ou CONTEXT_WINDOW_TOKENS no config.py."
+            )
+        print(f"📝 Nenhum trecho relevante: enviando resumo de {len(summary)} páginas")
+        return format_chunks([{'source': source, 'page': page, 'text': text}
+                              for (source, page), text in summary]), 'resumo'
+
+    def use_full_document(self, document_content):
+        """O documento inteiro vai no prompt (com cache) se couber no limite e no orçamento"""
+        if not PROMPT_CACHE_DOCUMENT or len(document_content) > PROMPT_CACHE_MAX_CHARS:
+            return False
+        return self.token_budget.fits(self.token_budget.estimate(CLAUDE_INSTRUCTIONS, document_content))
+
+    def retrieval_token_allowance(self, top_k):
+        """Tokens de ``top_k`` trechos do tamanho máximo"""
+        return top_k * (text_cleanup.tokens_for_chars(RETRIEVAL_CHUNK_SIZE) + MESSAGE_OVERHEAD_TOKENS)
+
+    def describe_prompt_budget(self, top_k=RETRIEVAL_TOP_K):
+        """Estimativa do prompt de cada pergunta, mostrada junto das estatísticas do documento"""
+        budget = self.token_budget
+        document_content = self.corpus.content
+        full_tokens = budget.estimate(CLAUDE_INSTRUCTIONS, document_content)
+        if self.use_full_document(document_content):
+            return (f"Prompt estimado: ~{full_tokens:,} tokens por pergunta com o documento inteiro "
+                    f"(~{budget.estimated_seconds(full_tokens):.1f}s; limite {budget.limit:,})")
+        retrieval_tokens = budget.estimate(CLAUDE_INSTRUCTIONS) + min(full_tokens, self.retrieval_token_allowance(top_k))
+        reason = (f"acima do limite de {budget.limit:,}" if not budget.fits(full_tokens)
+                  else "acima de PROMPT_CACHE_MAX_CHARS" if PROMPT_CACHE_DOCUMENT
+                  else "cache de prompt desativado")
+        return (f"Prompt estimado: documento inteiro ~{full_tokens:,} tokens ({reason}); "
+                f"cada pergunta envia só os trechos relevantes, até ~{retrieval_tokens:,} tokens")
+
+    def claude_request_params(self, top_k):
+        """Parâmetros que mudam a resposta e por isso fazem parte da chave do cache"""
+        return {
+            'model': CLAUDE_MODEL,
+            'max_tokens': CLAUDE_MAX_TOKENS,
+            'temperature': CLAUDE_TEMPERATURE,
+            'instructions': CLAUDE_INSTRUCTIONS,
+            'full_document': self.use_full_document(self.corpus.content),
+            'token_limit': self.token_budget.limit,
+            'top_k': top_k,
+            'chunk_size': RETRIEVAL_CHUNK_SIZE,
+        }
+
+    def build_claude_request(self, transcription, top_k=RETRIEVAL_TOP_K):
+        """Monta os parâmetros de messages.create; retorna (parâmetros, plano do orçamento).
+
+        O documento vai num bloco de sistema estável marcado com cache_control,
+        igual em todas as perguntas, para a API reaproveitar o prefixo; só a
+        mensagem do usuário (a transcrição) muda a cada chamada. Documentos
+        grandes demais para o cache ou para o orçamento de tokens usam os
+        trechos recuperados pela busca. Levanta TokenBudgetError se nem a
+        pergunta couber.
+        """
+        system = [{"type": "text", "text": CLAUDE_INSTRUCTIONS}]
+        # Referência única: durante a extração incremental o conteúdo é trocado por outra thread
+        document_content = self.corpus.content
+
+        note = ""
+        if not self.corpus.complete:
+            done, total = self.corpus.coverage
+            note = (f"OBSERVAÇÃO: o documento ainda está sendo carregado ({done} de {total} páginas "
+                    f"disponíveis). Se a resposta depender de páginas ausentes, avise.\n\n")
+        question = f"PERGUNTA: {transcription}"
+
+        # Pré-verificação local: quanto sobra para o documento depois das partes fixas
+        fixed_tokens = self.token_budget.estimate(CLAUDE_INSTRUCTIONS, note + question)
+        available_tokens = self.token_budget.available(fixed_tokens)
+
+        document_tokens = self.token_budget.estimate(document_content)
+        if self.use_full_document(document_content) and document_tokens <= available_tokens:
+            system.append({
+                "type": "text",
+                "text": f"{'DOCUMENTO' if len(self.corpus) == 1 else 'DOCUMENTOS'}:\n{document_content}",
+                "cache_control": {"type": "ephemeral"}
+            })
+            user_content = note + question
+            plan = {'mode': 'documento inteiro', 'tokens': fixed_tokens + document_tokens}
+        else:
+            # Otimização: enviar só os trechos relevantes em vez do documento inteiro
+            document_context, mode = self.build_document_context(transcription, top_k, available_tokens)
+            heading = ("TRECHOS DOS DOCUMENTOS (com o documento e a página de origem):" if mode == 'trechos'
+                       else "RESUMO DAS PÁGINAS (nenhum trecho específico encontrado para a pergunta):")
+            user_content = f"""{note}{heading}
+{document_context}
+
+{question}"""
+            plan = {'mode': mode, 'tokens': fixed_tokens + self.token_budget.estimate(document_context)}
+
+        # Otimização: Usar modelo mais rápido e configurações otimizadas
+        request = {
+            "model": CLAUDE_MODEL,
+            "max_tokens": CLAUDE_MAX_TOKENS,
+            "temperature": CLAUDE_TEMPERATURE,
+            "system": system,
+            "messages": [{
+                "role": "user",
+                "content": user_content
+            }]
+        }
+        return request, plan
+
+    def lookup_answer(self, transcription, top_k=RETRIEVAL_TOP_K):
+        """Procura a resposta nos caches locais antes de chamar a API.
+
+        Retorna {'cache_key', 'cache_scope', 'response', 'source', ...}: com
+        'source' = 'cache' (mesma pergunta), 'similar' (pergunta quase igual,
+        com 'similarity' e 'original_question') ou None (precisa perguntar).
+        """
+        params = self.claude_request_params(top_k)
+        corpus_digest = self.corpus.digest
+        lookup = {
+            'cache_key': ResponseCache.make_key(corpus_digest, transcription, params),
+            'cache_scope': ResponseCache.make_scope(corpus_digest, params),
+            'response': None,
+            'source': None,
+        }
+        # Otimização: Verificar cache
+        cached_response = self.response_cache.get(lookup['cache_key'])
+        if cached_response is not None:
+            lookup.update(response=cached_response, source='cache')
+            increment('cache_hits', kind='exact')
+            return lookup
+
+        # Otimização: pergunta quase igual a uma já respondida
+        self.similar_cache.ensure_loaded(lookup['cache_scope'], self.response_cache.entries_for_scope)
+        # A resposta vem do cache de respostas: se já expirou ou foi removida por tamanho, não é usada
+        similar = self.similar_cache.lookup(lookup['cache_scope'], transcription,
+                                            lambda key: self.response_cache.get(key, count=False))
+        if similar is not None:
+            similar_response, similarity, original_question = similar
+            lookup.update(response=similar_response, source='similar', similarity=similarity,
+                          original_question=original_question)
+            increment('cache_hits', kind='similar')
+        else:
+            increment('cache_misses')
+        return lookup
+
+    def ask_claude(self, transcription, top_k=RETRIEVAL_TOP_K, cache_key=None, cache_scope=None,
+                   on_text=None, cancelled=None):
+        """Envia a pergunta ao Claude em streaming e guarda a resposta nos caches.
+
+        ``on_text(pedaço)`` recebe o texto conforme é gerado; ``cancelled()``
+        verdadeiro interrompe a geração (retorna None). Retorna
+        {'response', 'usage', 'plan'}. Levanta TokenBudgetError sem chamar a
+        API se o pedido não couber no orçamento.
+        """
+        with span('prompt_build'):
+            request, plan = self.build_claude_request(transcription, top_k)
+        print(f"📏 Prompt estimado: ~{plan['tokens']:,} tokens ({plan['mode']})")
+        parts = []
+        start = time.perf_counter()
+        # Otimização: streaming - o texto aparece token a token em vez de só no final
+        with self.client.messages.stream(**request) as stream:
+            for text in stream.text_stream:
+                if cancelled is not None and cancelled():
+                    # Sair do bloco fecha a conexão e interrompe a geração
+                    return None
+                if not parts:
+                    observe('llm_first_token', time.perf_counter() - start)
+                parts.append(text)
+                if on_text:
+                    on_text(text)
+            message = stream.get_final_message()
+        observe('llm_total', time.perf_counter() - start)
+
+        response = "".join(parts)
+
+        # Otimização: Salvar no cache se cache_key for fornecido
+        if cache_key:
+            self.response_cache.put(cache_key, response, doc_digest=self.corpus.digest,
+                                    question=transcription, scope=cache_scope)
+        if cache_key and cache_scope:
+            self.similar_cache.add(cache_scope, transcription, cache_key)
+        return {'response': response, 'usage': message.usage, 'plan': plan}
+
+    def answer(self, transcription, top_k=RETRIEVAL_TOP_K, on_text=None):
+        """Resposta completa para uma transcrição: caches locais primeiro, depois a API.
+
+        Retorna {'response', 'source', 'plan', 'usage'}; 'source' é 'cache',
+        'similar' ou 'claude'.
+        """
+        lookup = self.lookup_answer(transcription, top_k)
+        if lookup['source'] is not None:
+            return {'response': lookup['response'], 'source': lookup['source'], 'plan': None, 'usage': None}
+        result = self.ask_claude(transcription, top_k, cache_key=lookup['cache_key'],
+                                 cache_scope=lookup['cache_scope'], on_text=on_text)
+        result['source'] = 'claude'
+        return result
+
+    def format_cache_stats(self):
+        """Resumo dos acertos do cache local de respostas"""
+        stats = self.response_cache.stats()
+        return (f"Cache local: {stats['hits']} acertos / {stats['misses']} falhas, "
+                f"{stats['entries']} respostas ({stats['size_bytes'] / 1024:.0f} KB)")
+
+
+class FakeClaudeClient:
+    """Substituto local do cliente da API para testes e benchmarks, sem rede nem API key.
+
+    Imita ``client.messages.stream``: depois de ``first_token_latency``
+    segundos entrega ``response_words`` palavras a ``words_per_second``. O
+    texto depende só da pergunta, então respostas são reproduzíveis. Cada
+    pedido é conferido como a API faria (ValueError se estiver malformado) e
+    guardado em ``requests``. Como o cache de prompt da API, o prefixo até o
+    último bloco de sistema com cache_control é gravado na primeira vez e
+    lido do cache quando chega idêntico de novo (sem expiração).
+    """
+
+    def __init__(self, first_token_latency=0.3, words_per_second=200.0, response_words=40):
+        self.first_token_latency = first_token_latency
+        self.words_per_second = words_per_second
+        self.response_words = response_words
+        self.messages = self
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.requests = []
+        self._cached_prefixes = set()
+
+    def stream(self, **request):
+        check_request_shape(request)
+        with self._lock:
+            self.calls += 1
+            self.requests.append(request)
+        return _FakeStream(self, request)
+
+    def prompt_cache(self, request):
+        """Tokens do prefixo em cache deste pedido: (lidos do cache, gravados no cache)"""
+        system = request.get('system', [])
+        marked = [i for i, block in enumerate(system) if 'cache_control' in block]
+        if not marked:
+            return 0, 0
+        prefix = system[:marked[-1] + 1]
+        tokens = sum(text_cleanup.estimate_tokens(block['text']) for block in prefix)
+        key = (request['model'], tuple(block['text'] for block in prefix))
+        with self._lock:
+            if key in self._cached_prefixes:
+                return tokens, 0
+            self._cached_prefixes.add(key)
+            return 0, tokens
+
+
+def check_request_shape(request):
+    """Confere os campos de messages.create usados aqui; ValueError com o primeiro problema"""
+    for field in ("model", "max_tokens", "messages"):
+        if field not in request:
+            raise ValueError(f"Pedido sem '{field}'")
+    for block in request.get("system", []):
+        if block.get("type") != "text" or not isinstance(block.get("text"), str):
+            raise ValueError(f"Bloco de sistema inválido: {sorted(block)}")
+        if "cache_control" in block and block["cache_control"] != {"type": "ephemeral"}:
+            raise ValueError(f"cache_control inválido: {block['cache_control']}")
+    messages = request["messages"]
+    if not messages or messages[-1].get("role") != "user":
+        raise ValueError("A última mensagem precisa ser do usuário")
+    for message in messages:
+        if message.get("role") not in ("user", "assistant") or not message.get("content"):
+            raise ValueError(f"Mensagem inválida: {sorted(message)}")
+
+
+class _FakeStream:
+    def __init__(self, client, request):
+        self.client = client
+        prompt = [block['text'] for block in request.get('system', [])]
+        prompt += [message['content'] for message in request['messages']]
+        # input_tokens da API não inclui o que foi lido ou gravado no cache de prompt
+        self.cache_read_tokens, self.cache_write_tokens = client.prompt_cache(request)
+        self.input_tokens = (sum(text_cleanup.estimate_tokens(text) for text in prompt)
+                             - self.cache_read_tokens - self.cache_write_tokens)
+        question = request['messages'][-1]['content'].rsplit("PERGUNTA:", 1)[-1].split()
+        words = (question or ["resposta"]) * (client.response_words // max(1, len(question)) + 1)
+        self.words = ["Resposta:"] + words[:client.response_words - 1]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        time.sleep(self.client.first_token_latency)
+        delay = 1.0 / self.client.words_per_second if self.client.words_per_second else 0.0
+        for i, word in enumerate(self.words):
+            if delay:
+                time.sleep(delay)
+            yield word if i == 0 else " " + word
+
+    def get_final_message(self):
+        usage = SimpleNamespace(input_tokens=self.input_tokens, output_tokens=len(self.words),
+                                cache_read_input_tokens=self.cache_read_tokens,
+                                cache_creation_input_tokens=self.cache_write_tokens)
+        return SimpleNamespace(usage=usage)
+
+
+def usage_counts(usage):
+    """Tokens de entrada/saída e do cache de prompt de uma resposta da API"""
+    return {
+        'input_tokens': getattr(usage, "input_tokens", 0) or 0,
+        'output_tokens': getattr(usage, "output_tokens", 0) or 0,
+        'cache_read_input_tokens': getattr(usage, "cache_read_input_tokens", 0) or 0,
+        'cache_creation_input_tokens': getattr(usage, "cache_creation_input_tokens", 0) or 0,
+    }
+
+
+def format_usage(usage):
+    """Resumo do uso de tokens da resposta, incluindo acertos do cache de prompt"""
+    counts = usage_counts(usage)
+    cache_read = counts['cache_read_input_tokens']
+    cache_write = counts['cache_creation_input_tokens']
+    total_input = counts['input_tokens'] + cache_read + cache_write
+    hit_ratio = cache_read / total_input if total_input else 0.0
+    return (f"Tokens: {total_input:,} entrada ({cache_read:,} do cache, {hit_ratio:.0%}; "
+            f"{cache_write:,} gravados no cache) / {counts['output_tokens']:,} saída")
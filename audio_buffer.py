@@ -0,0 +1,192 @@
+import threading
+import time
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Buffer int16 pré-alocado para o áudio capturado.
+
+    Os callbacks escrevem direto na arena, sem criar um array novo por bloco.
+    A capacidade dobra quando enche (custo amortizado); com ``max_seconds``
+    o buffer vira um anel e sobrescreve o áudio mais antigo.
+
+    Cada bloco registra também o instante de captura do seu primeiro frame
+    (relógio ``time.monotonic``), usado pelo mixer para alinhar as fontes.
+    """
+
+    def __init__(self, rate, channels=1, initial_seconds=30.0, max_seconds=None):
+        self.rate = rate
+        self.channels = channels
+        self.max_frames = int(max_seconds * rate) if max_seconds else None
+        capacity = max(1, int(initial_seconds * rate))
+        if self.max_frames:
+            capacity = min(capacity, self.max_frames)
+        self._data = np.zeros((capacity, channels), dtype=np.int16)
+        self._scratch = np.zeros(0, dtype=np.float32)
+        self._start = 0       # Posição do frame mais antigo na arena (modo anel)
+        self._length = 0      # Frames válidos guardados
+        self.total_frames = 0  # Frames escritos desde o início (inclui sobrescritos)
+        self.dropped_frames = 0
+        self._anchor_frames = np.zeros(1024, dtype=np.int64)
+        self._anchor_times = np.zeros(1024, dtype=np.float64)
+        self._anchor_count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def capacity(self):
+        return len(self._data)
+
+    @property
+    def duration(self):
+        """Duração guardada em segundos"""
+        return self._length / float(self.rate)
+
+    @property
+    def nbytes(self):
+        """Bytes de áudio efetivamente guardados"""
+        return self._length * self.channels * 2
+
+    @property
+    def capacity_bytes(self):
+        """Bytes alocados pela arena"""
+        return self._data.nbytes
+
+    @property
+    def fill_ratio(self):
+        return self._length / float(self.capacity)
+
+    def clear(self):
+        with self._lock:
+            self._start = 0
+            self._length = 0
+            self.total_frames = 0
+            self.dropped_frames = 0
+            self._anchor_count = 0
+
+    def write(self, samples, timestamp=None):
+        """Copia um bloco capturado para a arena.
+
+        Aceita int16 (caminho rápido: uma única cópia) ou float em [-1, 1],
+        com shape (frames, canais) ou intercalado em 1-D como o PyAudio entrega.
+        ``timestamp`` é o instante (``time.monotonic``) em que o bloco terminou
+        de ser capturado; por padrão, o momento da chamada.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        block = np.asarray(samples)
+        if block.ndim == 1:
+            usable = len(block) - (len(block) % self.channels)
+            block = block[:usable].reshape(-1, self.channels)
+        elif block.shape[1] != self.channels:
+            # Canais diferentes do esperado: usar a média (ex.: stereo em buffer mono)
+            block = block.mean(axis=1, keepdims=True).repeat(self.channels, axis=1)
+        frames = len(block)
+        if frames == 0:
+            return
+
+        with self._lock:
+            self._add_anchor(self.total_frames, timestamp - frames / float(self.rate))
+            if self.max_frames and frames > self.max_frames:
+                self.dropped_frames += frames - self.max_frames
+                block = block[-self.max_frames:]
+                frames = self.max_frames
+            self._reserve(frames)
+            pos = (self._start + self._length) % self.capacity
+            first = min(frames, self.capacity - pos)
+            self._copy_into(self._data[pos:pos + first], block[:first])
+            if first < frames:
+                self._copy_into(self._data[:frames - first], block[first:])
+
+            self._length += frames
+            if self._length > self.capacity:
+                overflow = self._length - self.capacity
+                self._start = (self._start + overflow) % self.capacity
+                self._length = self.capacity
+                self.dropped_frames += overflow
+            self.total_frames += frames
+
+    def _add_anchor(self, frame_index, capture_time):
+        """Registra (frame, instante); deve ser chamado com o lock adquirido"""
+        if self._anchor_count == len(self._anchor_frames):
+            self._anchor_frames = np.concatenate([self._anchor_frames, np.zeros_like(self._anchor_frames)])
+            self._anchor_times = np.concatenate([self._anchor_times, np.zeros_like(self._anchor_times)])
+        self._anchor_frames[self._anchor_count] = frame_index
+        self._anchor_times[self._anchor_count] = capture_time
+        self._anchor_count += 1
+
+    def timeline(self):
+        """Retorna (frames, instantes) dos blocos ainda guardados.
+
+        Os índices de frame são relativos ao início de ``view()``.
+        """
+        with self._lock:
+            first_frame = self.total_frames - self._length
+            frames = self._anchor_frames[:self._anchor_count]
+            keep = frames >= first_frame
+            return frames[keep] - first_frame, self._anchor_times[:self._anchor_count][keep].copy()
+
+    def _copy_into(self, dest, block):
+        if block.dtype == np.int16:
+            dest[...] = block
+            return
+        if block.dtype.kind == 'f':
+            # Converter float -> int16 reaproveitando um buffer de trabalho
+            size = block.size
+            if self._scratch.size < size:
+                self._scratch = np.zeros(size * 2, dtype=np.float32)
+            scratch = self._scratch[:size].reshape(block.shape)
+            np.multiply(block, 32767.0, out=scratch, casting='unsafe')
+            np.clip(scratch, -32768, 32767, out=scratch)
+            np.copyto(dest, scratch, casting='unsafe')
+        else:
+            np.copyto(dest, block, casting='unsafe')
+
+    def _reserve(self, frames):
+        """Garante espaço para mais ``frames``; deve ser chamado com o lock adquirido"""
+        needed = self._length + frames
+        if needed <= self.capacity:
+            return
+        if self.max_frames and self.capacity >= self.max_frames:
+            return  # Anel cheio: o write sobrescreve o mais antigo
+        new_capacity = self.capacity
+        while new_capacity < needed:
+            new_capacity *= 2
+        if self.max_frames:
+            new_capacity = min(new_capacity, self.max_frames)
+        grown = np.zeros((new_capacity, self.channels), dtype=np.int16)
+        grown[:self._length] = self._ordered()
+        self._data = grown
+        self._start = 0
+
+    def _ordered(self):
+        """Conteúdo em ordem cronológica (view quando não há volta no anel)"""
+        end = self._start + self._length
+        if end <= self.capacity:
+            return self._data[self._start:end]
+        return np.concatenate([self._data[self._start:], self._data[:end - self.capacity]])
+
+    def view(self, start=0, end=None, mono=False):
+        """Retorna o áudio guardado sem copiar.
+
+        ``start``/``end`` são índices de frame relativos ao conteúdo atual. Só
+        há cópia se o anel já deu a volta e o trecho atravessa o fim da arena.
+        Com ``mono=True`` e um único canal retorna um array 1-D.
+        """
+        with self._lock:
+            end = self._length if end is None else min(end, self._length)
+            start = max(0, min(start, end))
+            begin = self._start + start
+            stop = self._start + end
+            if stop <= self.capacity:
+                data = self._data[begin:stop]
+            elif begin >= self.capacity:
+                data = self._data[begin - self.capacity:stop - self.capacity]
+            else:
+                data = np.concatenate([self._data[begin:], self._data[:stop - self.capacity]])
+        if mono and self.channels == 1:
+            return data[:, 0]
+        return data
@@ -0,0 +1,222 @@
+"""Modo em lote, sem interface: transcreve uma pasta de gravações e responde cada uma com base nos documentos.
+
+Extração dos documentos, transcrição e perguntas ao Claude rodam como um
+pipeline: os documentos são extraídos enquanto os primeiros áudios são
+transcritos, e cada transcrição pronta já vai para o pool do Claude. Cada
+resultado vira uma linha JSON no arquivo de saída assim que fica pronto.
+
+Uso:
+    python batch.py gravacoes/ --documento tese.pdf --saida respostas.jsonl
+    python batch.py gravacoes/ --sem-claude --reconhecedor vosk --arquivos-simultaneos 4
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import soundfile as sf
+
+import config
+import instrumentation
+from asr_backends import BACKENDS, BackendError, NoSpeechError
+from assistant import MeetingAssistant, ASR_BACKEND, RETRIEVAL_TOP_K, TRANSCRIPTION_WORKERS, usage_counts
+from streaming import resample_linear, to_mono_int16
+from token_budget import TokenBudgetError
+from vad import VoiceActivityDetector
+
+# Formatos lidos pelo soundfile (libsndfile)
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.ogg')
+
+
+def find_audio_files(directory):
+    """Arquivos de áudio da pasta, em ordem alfabética"""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(AUDIO_EXTENSIONS))
+
+
+def read_audio(path, rate):
+    """Lê o arquivo como int16 mono na taxa ``rate`` (interpolação linear se preciso)"""
+    data, file_rate = sf.read(path, dtype='int16', always_2d=True)
+    return resample_linear(to_mono_int16(data), file_rate, rate)
+
+
+class JsonlWriter:
+    """Grava um objeto JSON por linha; seguro para várias threads"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+            self.count += 1
+
+
+class BatchPipeline:
+    """Documentos → transcrição → Claude, com um pool de threads por etapa.
+
+    ``file_workers`` arquivos são transcritos ao mesmo tempo (cada um ainda
+    divide o áudio em trechos paralelos, ver ``MeetingAssistant``) e
+    ``claude_workers`` perguntas são enviadas ao mesmo tempo. As perguntas
+    esperam a extração dos documentos terminar.
+    """
+
+    def __init__(self, assistant, writer, file_workers=2, claude_workers=2, top_k=RETRIEVAL_TOP_K, ask=True):
+        self.assistant = assistant
+        self.writer = writer
+        self.file_workers = max(1, file_workers)
+        self.claude_workers = max(1, claude_workers)
+        self.top_k = top_k
+        self.ask = ask
+        self.documents_ready = threading.Event()
+        self.document_errors = []
+
+    def load_documents(self, paths):
+        """Extrai os documentos um por vez (a extração de PDF já usa todos os processadores)"""
+        try:
+            for path in paths:
+                start = time.perf_counter()
+                try:
+                    document = self.assistant.load_document(path)
+                    print(f"📄 {document.name}: {len(document.content):,} caracteres "
+                          f"em {time.perf_counter() - start:.1f}s")
+                except Exception as e:
+                    print(f"❌ Erro ao converter {os.path.basename(path)}: {e}")
+                    self.document_errors.append(f"{os.path.basename(path)}: {e}")
+        finally:
+            self.documents_ready.set()
+
+    def transcribe_file(self, path):
+        """Lê e transcreve um arquivo; retorna o registro (com 'error' se falhar)"""
+        record = {'file': os.path.basename(path), 'path': path, 'transcription': None, 'error': None}
+        start = time.perf_counter()
+        try:
+            samples = read_audio(path, self.assistant.rate)
+            record['audio_seconds'] = round(len(samples) / float(self.assistant.rate), 2)
+            # Um VAD por arquivo: cada gravação calibra o próprio limiar de ruído
+            vad = VoiceActivityDetector(self.assistant.rate)
+            vad.calibrate(samples)
+            speech, _ = vad.trim(samples)
+            record['speech_seconds'] = round(len(speech) / float(self.assistant.rate), 2)
+            if len(speech) == 0:
+                record['error'] = "Nenhuma fala detectada no áudio"
+            else:
+                record['transcription'] = self.assistant.transcribe_segments(speech, vad)
+        except NoSpeechError:
+            record['error'] = "Não foi possível entender o áudio"
+        except BackendError as e:
+            record['error'] = f"Erro no serviço de reconhecimento: {e}"
+        except Exception as e:
+            record['error'] = f"Erro na transcrição: {e}"
+        record['timings'] = {'transcribe_seconds': round(time.perf_counter() - start, 3)}
+        return record
+
+    def answer_record(self, record):
+        """Pergunta ao Claude (ou aos caches locais) sobre a transcrição e grava o registro"""
+        self.documents_ready.wait()
+        start = time.perf_counter()
+        try:
+            if not self.assistant.corpus.loaded:
+                reasons = "; ".join(self.document_errors)
+                raise RuntimeError("Nenhum documento carregado e convertido" + (f" ({reasons})" if reasons else ""))
+            result = self.assistant.answer(record['transcription'], self.top_k)
+            record['response'] = result['response']
+            record['source'] = result['source']
+            if result['plan']:
+                record['mode'] = result['plan']['mode']
+                record['estimated_tokens'] = result['plan']['tokens']
+            if result['usage'] is not None:
+                record['usage'] = usage_counts(result['usage'])
+        except TokenBudgetError as e:
+            record['error'] = f"Pergunta não enviada: {e}"
+        except Exception as e:
+            record['error'] = f"Erro ao processar com Claude: {e}"
+        record['timings']['answer_seconds'] = round(time.perf_counter() - start, 3)
+        self.writer.write(record)
+        return record
+
+    def run(self, audio_paths, document_paths=()):
+        """Processa todos os arquivos; retorna os registros na ordem em que terminaram"""
+        threading.Thread(target=self.load_documents, args=(list(document_paths),), daemon=True).start()
+        records = []
+        with ThreadPoolExecutor(max_workers=self.file_workers, thread_name_prefix="lote-asr") as asr_pool, \
+                ThreadPoolExecutor(max_workers=self.claude_workers, thread_name_prefix="lote-claude") as claude_pool:
+            transcriptions = [asr_pool.submit(self.transcribe_file, path) for path in audio_paths]
+            answers = []
+            for future in as_completed(transcriptions):
+                record = future.result()
+                status = record['error'] or f"{len(record['transcription'])} caracteres"
+                print(f"🎤 {record['file']}: {status} ({record['timings']['transcribe_seconds']:.1f}s)")
+                if self.ask and record['transcription']:
+                    answers.append(claude_pool.submit(self.answer_record, record))
+                else:
+                    self.writer.write(record)
+                    records.append(record)
+            for future in as_completed(answers):
+                records.append(future.result())
+        return records
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Transcreve uma pasta de gravações e responde cada uma com base nos documentos (sem interface)."
+    )
+    parser.add_argument("pasta", help="pasta com os áudios (" + ", ".join(AUDIO_EXTENSIONS) + ")")
+    parser.add_argument("--documento", action="append", default=[],
+                        help="PDF, DOCX ou TXT usado nas respostas (pode repetir)")
+    parser.add_argument("--saida", default="respostas.jsonl", help="arquivo JSONL de saída (padrão: respostas.jsonl)")
+    parser.add_argument("--reconhecedor", choices=sorted(BACKENDS), default=ASR_BACKEND,
+                        help=f"reconhecedor de fala (padrão do config: {ASR_BACKEND})")
+    parser.add_argument("--arquivos-simultaneos", type=int, default=2,
+                        help="arquivos transcritos ao mesmo tempo (padrão: 2)")
+    parser.add_argument("--workers-transcricao", type=int, default=TRANSCRIPTION_WORKERS,
+                        help=f"trechos de cada arquivo transcritos em paralelo (padrão: {TRANSCRIPTION_WORKERS})")
+    parser.add_argument("--workers-claude", type=int, default=2,
+                        help="perguntas simultâneas ao Claude (padrão: 2)")
+    parser.add_argument("--trechos", type=int, default=RETRIEVAL_TOP_K,
+                        help=f"trechos do documento por pergunta (padrão: {RETRIEVAL_TOP_K})")
+    parser.add_argument("--sem-claude", action="store_true", help="só transcrever, sem perguntar ao Claude")
+    parser.add_argument("--metricas", help="salva tempos e contadores ao final (.json, ou .prom para o Prometheus)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    audio_paths = find_audio_files(args.pasta)
+    if not audio_paths:
+        print(f"Nenhum áudio encontrado em {args.pasta}", file=sys.stderr)
+        return 1
+    ask = not args.sem_claude
+    if ask and not args.documento:
+        print("Informe pelo menos um --documento (ou use --sem-claude)", file=sys.stderr)
+        return 1
+
+    assistant = MeetingAssistant(api_key=getattr(config, "ANTHROPIC_API_KEY", None), asr_backend=args.reconhecedor)
+    assistant.transcription_workers = max(1, args.workers_transcricao)
+    start = time.perf_counter()
+    with open(args.saida, "w", encoding="utf-8") as output:
+        pipeline = BatchPipeline(assistant, JsonlWriter(output),
+                                 file_workers=args.arquivos_simultaneos, claude_workers=args.workers_claude,
+                                 top_k=args.trechos, ask=ask)
+        records = pipeline.run(audio_paths, args.documento)
+
+    errors = sum(1 for record in records if record['error'])
+    print(f"✅ {len(records)} arquivos em {time.perf_counter() - start:.1f}s ({errors} com erro) → {args.saida}")
+    print(f"⏱️ {assistant.asr_backend.format_latency()} - {assistant.format_cache_stats()}")
+    if args.metricas:
+        registry = instrumentation.REGISTRY
+        with open(args.metricas, "w", encoding="utf-8") as output:
+            output.write(registry.to_prometheus() if args.metricas.endswith(".prom") else registry.to_json())
+        print(f"📊 Métricas em {args.metricas}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""Mede cada etapa do caminho gravação → resposta com dados sintéticos e serviços simulados.
+
+Gera áudio parecido com fala em várias durações e documentos PDF, DOCX e TXT
+em vários tamanhos, e cronometra as etapas do aplicativo: mixagem
+microfone + sistema, VAD, escrita e leitura de WAV, transcrição em trechos,
+extração e conversão dos documentos, montagem do prompt, consulta aos caches
+e resposta do Claude. Reconhecedor e Claude são os simulados do projeto
+(FakeBackend e FakeClaudeClient), com latência injetada, então nada sai da
+máquina e os números são comparáveis entre versões.
+
+O resultado é gravado em JSON (padrão: benchmarks/results/, fora do git); com
+--compare cada etapa é comparada com um resultado anterior e o script termina
+com código 1 se alguma ficou mais lenta que a tolerância.
+
+Uso:
+    python benchmarks/bench_pipeline.py --output benchmarks/results/antes.json
+    python benchmarks/bench_pipeline.py --quick --output benchmarks/results/depois.json \
+        --compare benchmarks/results/antes.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import document_extraction  # noqa: E402
+from asr_backends import FakeBackend  # noqa: E402
+from assistant import MeetingAssistant, FakeClaudeClient, PDF_EXTRACTION_WORKERS, RETRIEVAL_TOP_K  # noqa: E402
+from audio_buffer import AudioRingBuffer  # noqa: E402
+from batch import read_audio  # noqa: E402
+from bench_docx import SENTENCE, generate_docx  # noqa: E402
+from bench_transcription import RATE, synthetic_speech  # noqa: E402
+from extraction_cache import ExtractionCache  # noqa: E402
+from mixer import TimestampedMixer  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+from vad import VoiceActivityDetector  # noqa: E402
+
+QUESTION = "Quais são os riscos do projeto e os prazos de entrega discutidos no parágrafo 42?"
+SIMILAR_QUESTION = "Quais são os riscos do projeto e os prazos de entrega discutidos no parágrafo 42, né?"
+# Blocos de captura como os do callback do microfone (100 ms)
+BLOCK_SECONDS = 0.1
+PARAGRAPHS_PER_PAGE = 12
+# Resultados ficam junto dos benchmarks, numa pasta ignorada pelo git
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'bench_pipeline.json')
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silencia os prints de diagnóstico do aplicativo durante a medição"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def measure(function, repeat, setup=None):
+    """Executa ``function`` ``repeat`` vezes; retorna (tempos em segundos, último resultado)"""
+    times = []
+    result = None
+    for _ in range(max(1, repeat)):
+        if setup is not None:
+            setup()
+        with quiet():
+            start = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - start)
+    return times, result
+
+
+def record(results, stage, case, times, **extra):
+    """Guarda e mostra o melhor tempo e a média de uma etapa"""
+    entry = {'stage': stage, 'case': case, 'best_seconds': min(times),
+             'mean_seconds': sum(times) / len(times), 'repeat': len(times)}
+    entry.update(extra)
+    results.append(entry)
+    details = "   ".join(f"{key}={value}" for key, value in extra.items())
+    print(f"{stage:<18} {case:<14} {entry['best_seconds'] * 1000:10.1f} ms   "
+          f"(média {entry['mean_seconds'] * 1000:.1f} ms)   {details}")
+    return entry
+
+
+def recording(minutes, seed=0):
+    """Fala sintética precedida de 1 s de ruído ambiente (o VAD calibra no primeiro segundo)"""
+    noise = np.random.RandomState(seed).normal(0, 30, RATE).astype(np.int16)
+    return np.concatenate([noise, synthetic_speech(minutes, seed=seed)])
+
+
+def capture_buffers(minutes, offset=0.25, drift_ppm=100.0, channels=2):
+    """Buffers de microfone (mono) e sistema (stereo, atrasado e com deriva), blocos com instante de captura"""
+    block = int(RATE * BLOCK_SECONDS)
+    mic = AudioRingBuffer(RATE, channels=1)
+    system = AudioRingBuffer(RATE, channels=channels)
+    samples = recording(minutes)
+    # Outras vozes no sistema, mais baixas
+    other = recording(minutes, seed=1) // 2
+    start = 1000.0
+    for i, index in enumerate(range(0, len(samples), block)):
+        mic.write(samples[index:index + block, None], timestamp=start + (i + 1) * BLOCK_SECONDS)
+        chunk = np.repeat(other[index:index + block, None], channels, axis=1)
+        system.write(chunk, timestamp=start + offset + (i + 1) * BLOCK_SECONDS * (1 + drift_ppm / 1e6))
+    return mic, system
+
+
+def generate_text(paragraphs):
+    return "\n\n".join(SENTENCE.format(n=n) for n in range(paragraphs))
+
+
+def generate_pdf(path, pages):
+    """PDF com texto em todas as páginas, cabeçalho e numeração repetidos (exercita a limpeza)"""
+    fitz = document_extraction.fitz
+    pdf = fitz.open()
+    for page_number in range(pages):
+        page = pdf.new_page()
+        page.insert_text((72, 40), "Relatório de teste - documento sintético", fontsize=8)
+        first = page_number * PARAGRAPHS_PER_PAGE
+        text = "\n".join(SENTENCE.format(n=n) for n in range(first, first + PARAGRAPHS_PER_PAGE))
+        page.insert_textbox(fitz.Rect(72, 60, 540, 780), text, fontsize=9)
+        page.insert_text((300, 810), str(page_number + 1), fontsize=8)
+    pdf.save(path)
+    pdf.close()
+
+
+def generate_documents(directory, pages):
+    """{(formato, páginas): caminho} com o mesmo texto em PDF (se houver PyMuPDF), DOCX e TXT"""
+    documents = {}
+    paragraphs = pages * PARAGRAPHS_PER_PAGE
+    if document_extraction.fitz is not None:
+        documents[('pdf', pages)] = os.path.join(directory, f"doc_{pages}.pdf")
+        generate_pdf(documents[('pdf', pages)], pages)
+    documents[('docx', pages)] = os.path.join(directory, f"doc_{pages}.docx")
+    generate_docx(documents[('docx', pages)], paragraphs, tables=pages // 5)
+    documents[('txt', pages)] = os.path.join(directory, f"doc_{pages}.txt")
+    with open(documents[('txt', pages)], 'w', encoding='utf-8') as output:
+        output.write(generate_text(paragraphs))
+    return documents
+
+
+def bench_audio(results, assistant, minutes, repeat, directory):
+    case = f"{minutes:g} min"
+    mic, system = capture_buffers(minutes)
+    mixer = TimestampedMixer(RATE)
+
+    # Mesmo caminho de process_audio: mixagem alinhada pelos instantes de captura
+    times, mixed = measure(lambda: mixer.mix([mic, system]), repeat)
+    record(results, 'mixagem', case, times, audio_seconds=round(len(mixed) / RATE, 1))
+
+    vad = VoiceActivityDetector(RATE)
+
+    def trim():
+        vad.calibrate(mixed)
+        return vad.trim(mixed)
+
+    times, (speech, ratio) = measure(trim, repeat)
+    record(results, 'vad', case, times, speech_ratio=round(ratio, 3))
+
+    # WAV como em save_debug_audio (escrita) e no modo em lote (leitura)
+    path = os.path.join(directory, f"audio_{minutes:g}.wav")
+    times, _ = measure(lambda: sf.write(path, mixed, RATE), repeat)
+    record(results, 'wav_escrita', case, times, megabytes=round(os.path.getsize(path) / (1024 * 1024), 1))
+    times, _ = measure(lambda: read_audio(path, RATE), repeat)
+    record(results, 'wav_leitura', case, times)
+
+    # Transcrição em trechos paralelos com o reconhecedor simulado (uma execução: o tempo é dominado pela latência)
+    calls = assistant.asr_backend.calls
+    times, transcription = measure(lambda: assistant.transcribe_segments(speech, vad), 1)
+    record(results, 'transcricao', case, times, requests=assistant.asr_backend.calls - calls,
+           characters=len(transcription or ""))
+
+
+def bench_documents(results, assistant, documents, repeat, directory):
+    for (kind, pages), path in sorted(documents.items(), key=lambda item: (item[0][1], item[0][0])):
+        case = f"{kind} {pages} pág"
+        if kind == 'pdf':
+            times, text = measure(lambda: document_extraction.extract_pdf_text(path, workers=PDF_EXTRACTION_WORKERS),
+                                  repeat)
+        else:
+            times, text = measure(lambda: assistant.extract_document_text(path), repeat)
+        record(results, 'extracao', case, times, characters=len(text),
+               megabytes=round(os.path.getsize(path) / (1024 * 1024), 2))
+
+        # Conversão completa (extração, limpeza e índice): sem cache e com o cache em disco
+        cache_dir = os.path.join(directory, f"cache_{kind}_{pages}")
+
+        def cold_cache():
+            assistant.corpus.remove(path)
+            assistant.extraction_cache.clear()
+
+        assistant.extraction_cache = ExtractionCache(cache_dir)
+        times, _ = measure(lambda: assistant.load_document(path), repeat, setup=cold_cache)
+        record(results, 'conversao', case, times)
+        times, _ = measure(lambda: assistant.load_document(path), repeat,
+                                  setup=lambda: assistant.corpus.remove(path))
+        record(results, 'conversao_cache', case, times, chunks=assistant.corpus.chunk_count())
+        assistant.corpus.remove(path)
+
+
+def bench_questions(results, assistant, documents, repeat, top_k, directory):
+    """Prompt, caches e Claude simulado com o TXT de cada tamanho sozinho no corpus"""
+    for (kind, pages), path in sorted(documents.items(), key=lambda item: item[0][1]):
+        if kind != 'txt':
+            continue
+        case = f"{pages} pág"
+        with quiet():
+            assistant.load_document(path)
+
+        times, (request, plan) = measure(lambda: assistant.build_claude_request(QUESTION, top_k), repeat)
+        record(results, 'prompt', case, times, mode=plan['mode'], tokens=plan['tokens'])
+
+        assistant.response_cache = ResponseCache(path=os.path.join(directory, f"respostas_{pages}.sqlite3"))
+        times, lookup = measure(lambda: assistant.lookup_answer(QUESTION, top_k), repeat)
+        record(results, 'cache_falta', case, times, source=lookup['source'])
+
+        first_token = []
+
+        def ask():
+            start = time.perf_counter()
+            first_token.clear()
+            result = assistant.ask_claude(
+                QUESTION, top_k, cache_key=lookup['cache_key'], cache_scope=lookup['cache_scope'],
+                on_text=lambda text: first_token.append(time.perf_counter() - start) if not first_token else None)
+            return result
+
+        times, _ = measure(ask, 1)
+        record(results, 'claude', case, times, first_token_seconds=round(first_token[0], 3) if first_token else None)
+
+        times, lookup = measure(lambda: assistant.lookup_answer(QUESTION, top_k), repeat)
+        record(results, 'cache_acerto', case, times, source=lookup['source'])
+        times, lookup = measure(lambda: assistant.lookup_answer(SIMILAR_QUESTION, top_k), repeat)
+        record(results, 'cache_semelhante', case, times, source=lookup['source'])
+        assistant.corpus.remove(path)
+
+
+def git_commit():
+    """Commit atual (para identificar a versão medida); None fora de um repositório git"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous_path, tolerance, noise_ms):
+    """Compara com um JSON anterior; retorna as etapas que ficaram mais lentas que a tolerância"""
+    with open(previous_path, encoding='utf-8') as source:
+        previous = json.load(source)
+    before = {(entry['stage'], entry['case']): entry['best_seconds'] for entry in previous['results']}
+    print(f"\nComparação com {previous_path} (commit {previous.get('commit') or '?'}):")
+    regressions = []
+    for entry in results:
+        key = (entry['stage'], entry['case'])
+        if key not in before:
+            continue
+        old, new = before[key], entry['best_seconds']
+        change = (new - old) / old if old > 0 else 0.0
+        slower = change > tolerance and (new - old) * 1000 > noise_ms
+        if slower:
+            regressions.append(key)
+        marker = "  ⚠️ mais lento" if slower else ""
+        print(f"{key[0]:<18} {key[1]:<14} {old * 1000:10.1f} → {new * 1000:10.1f} ms  {change:+7.1%}{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--minutes', type=float, nargs='+', default=[1, 5, 15], help="durações de áudio (min)")
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 50, 200], help="tamanhos de documento")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--quick', action='store_true', help="tamanhos pequenos, para conferir rapidamente")
+    parser.add_argument('--top-k', type=int, default=RETRIEVAL_TOP_K)
+    parser.add_argument('--asr-latency', type=float, default=0.2, help="latência por pedido do reconhecedor (s)")
+    parser.add_argument('--asr-latency-per-second', type=float, default=0.01,
+                        help="latência extra por segundo de áudio (s)")
+    parser.add_argument('--claude-first-token', type=float, default=0.3, help="tempo até o primeiro token (s)")
+    parser.add_argument('--claude-words-per-second', type=float, default=200)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help=f"arquivo JSON com os resultados (padrão: {DEFAULT_OUTPUT})")
+    parser.add_argument('--compare', help="JSON de uma execução anterior para comparar")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="piora relativa aceita na comparação")
+    parser.add_argument('--noise-ms', type=float, default=2.0, help="diferenças menores que isso são ignoradas")
+    args = parser.parse_args()
+    if args.quick:
+        args.minutes, args.pages, args.repeat = [0.5, 2], [5, 20], 2
+
+    assistant = MeetingAssistant(client=FakeClaudeClient(first_token_latency=args.claude_first_token,
+                                                         words_per_second=args.claude_words_per_second),
+                                 asr_backend='fake')
+    assistant.asr_backend = FakeBackend(latency=args.asr_latency, latency_per_second=args.asr_latency_per_second)
+    results = []
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as directory:
+        # Caches do benchmark ficam na pasta temporária, nunca nos do usuário
+        assistant.response_cache = ResponseCache(path=os.path.join(directory, "respostas.sqlite3"))
+        assistant.extraction_cache = ExtractionCache(os.path.join(directory, "extracoes"))
+
+        print(f"Áudio: {', '.join(f'{m:g} min' for m in args.minutes)}\n")
+        for minutes in args.minutes:
+            bench_audio(results, assistant, minutes, args.repeat, directory)
+
+        documents = {}
+        for pages in args.pages:
+            documents.update(generate_documents(directory, pages))
+        if document_extraction.fitz is None:
+            print("\nPyMuPDF não instalado; PDFs ignorados (pip install pymupdf)")
+        print(f"\nDocumentos: {', '.join(f'{p} páginas' for p in args.pages)}\n")
+        bench_documents(results, assistant, documents, args.repeat, directory)
+
+        print("\nPerguntas\n")
+        bench_questions(results, assistant, documents, args.repeat, args.top_k, directory)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'total_seconds': round(time.perf_counter() - started, 2),
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(report, output, ensure_ascii=False, indent=2)
+    print(f"\nResultados em {args.output} ({report['total_seconds']:.1f}s)")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance, args.noise_ms)
+        if regressions:
+            print(f"\n{len(regressions)} etapas mais lentas que a tolerância de {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
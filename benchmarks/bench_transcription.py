@@ -0,0 +1,102 @@
+"""Mede a transcrição em trechos paralelos com um reconhecedor local simulado.
+
+O reconhecedor falso espera um tempo proporcional à duração do trecho (como
+um serviço remoto) e falha de vez em quando, para exercitar as repetições.
+
+Uso:
+    python benchmarks/bench_transcription.py --minutes 10 --workers 4
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from segment_transcription import SegmentTranscriber, join_segments, split_at_silence  # noqa: E402
+from vad import VoiceActivityDetector  # noqa: E402
+
+RATE = 16000
+
+
+class TransientError(Exception):
+    """Falha temporária do reconhecedor simulado"""
+
+
+class FakeRecognizer:
+    """Reconhecedor local: latência fixa + proporcional ao áudio, falhas ocasionais"""
+
+    def __init__(self, base_latency=0.05, seconds_per_audio_second=0.01, failure_rate=0.1, seed=1):
+        self.base_latency = base_latency
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, samples):
+        with self._lock:
+            self.calls += 1
+            fail = self.random.random() < self.failure_rate
+        time.sleep(self.base_latency + self.seconds_per_audio_second * len(samples) / RATE)
+        if fail:
+            raise TransientError("serviço indisponível (simulado)")
+        return f"<{len(samples) / RATE:.1f}s>"
+
+
+def synthetic_speech(minutes, seed=0):
+    """Falas de 2 a 8 s (tom com ruído) separadas por pausas de 0,3 a 1,2 s"""
+    rng = np.random.RandomState(seed)
+    parts = []
+    total = int(minutes * 60 * RATE)
+    length = 0
+    while length < total:
+        speech = int(rng.uniform(2, 8) * RATE)
+        t = np.arange(speech) / RATE
+        voice = 6000 * np.sin(2 * np.pi * rng.uniform(120, 220) * t) + rng.normal(0, 800, speech)
+        pause = int(rng.uniform(0.3, 1.2) * RATE)
+        parts.extend([voice, rng.normal(0, 30, pause)])
+        length += speech + pause
+    return np.clip(np.concatenate(parts)[:total], -32768, 32767).astype(np.int16)
+
+
+def run(label, samples, segments, workers, recognizer):
+    transcriber = SegmentTranscriber(recognizer, max_workers=workers, retries=3, backoff=0.01,
+                                     retry_on=(TransientError,))
+    start = time.perf_counter()
+    texts, errors = transcriber.transcribe(samples, segments)
+    elapsed = time.perf_counter() - start
+    longest = max(end - start_ for start_, end in segments) / RATE
+    print(f"{label:<28} {elapsed:7.2f} s   {len(segments):4d} trechos (maior {longest:5.1f}s)   "
+          f"{recognizer.calls:4d} chamadas   {len(errors)} falhas")
+    return join_segments(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=10)
+    parser.add_argument('--segment', type=float, default=30, help="duração máxima de cada trecho (s)")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--failure-rate', type=float, default=0.1)
+    args = parser.parse_args()
+
+    samples = synthetic_speech(args.minutes)
+    vad = VoiceActivityDetector(RATE)
+    vad.calibrate(samples)
+    segments = split_at_silence(samples, RATE, vad, max_segment=args.segment, min_segment=args.segment / 3.0)
+    print(f"Áudio sintético: {len(samples) / RATE / 60:.1f} min\n")
+
+    run("gravação inteira (1 pedido)", samples, [(0, len(samples))], 1, FakeRecognizer(failure_rate=0))
+    run("trechos, sequencial", samples, segments, 1, FakeRecognizer(failure_rate=args.failure_rate))
+    run(f"trechos, {args.workers} em paralelo", samples, segments, args.workers,
+        FakeRecognizer(failure_rate=args.failure_rate))
+    run(f"trechos, {len(segments)} em paralelo", samples, segments, len(segments),
+        FakeRecognizer(failure_rate=args.failure_rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,151 @@
 
 CLAUDE_API_KEY = "sua-api-key-aqui"
 
+# ========================================
+#    BUSCA NO DOCUMENTO
+# ========================================
+#
+# Em vez do documento inteiro, cada pergunta envia ao Claude apenas os
+# trechos mais relevantes (busca BM25 local, sem internet).
+#
+# RETRIEVAL_TOP_K: quantos trechos enviar por pergunta
+# RETRIEVAL_CHUNK_SIZE: tamanho máximo de cada trecho, em caracteres
+
+RETRIEVAL_TOP_K = 5
+RETRIEVAL_CHUNK_SIZE = 1200
+
+# Cache de prompt da API: documentos até PROMPT_CACHE_MAX_CHARS caracteres
+# vão inteiros num bloco reaproveitado entre perguntas (mais rápido e mais
+# barato a partir da 2ª pergunta); acima disso, usa-se a busca por trechos.
+
+PROMPT_CACHE_DOCUMENT = True
+PROMPT_CACHE_MAX_CHARS = 400000
+
+# Orçamento de tokens, verificado localmente antes de cada pergunta.
+# O prompt precisa caber na janela de contexto (descontada a resposta) e ser
+# processado em até PROMPT_LATENCY_SECONDS, estimando PREFILL_TOKENS_PER_SECOND
+# tokens por segundo. Acima disso o contexto é reduzido: documento inteiro →
+# trechos mais relevantes → resumo das páginas → recusa.
+# PROMPT_LATENCY_SECONDS = None desativa o limite por latência.
+
+CONTEXT_WINDOW_TOKENS = 200000
+PROMPT_LATENCY_SECONDS = 8
+PREFILL_TOKENS_PER_SECOND = 10000
+
+# ========================================
+#    CACHE DE RESPOSTAS
+# ========================================
+#
+# Respostas ficam gravadas em disco (SQLite) e sobrevivem ao fechar o
+# programa. A mesma pergunta sobre o mesmo documento volta instantaneamente.
+#
+# RESPONSE_CACHE_PATH: arquivo do cache (None = ~/.transcritor/respostas.sqlite3)
+# RESPONSE_CACHE_MAX_MB: tamanho máximo; as respostas menos usadas saem primeiro
+# RESPONSE_CACHE_TTL_HOURS: validade de cada resposta
+
+RESPONSE_CACHE_PATH = None
+RESPONSE_CACHE_MAX_MB = 50
+RESPONSE_CACHE_TTL_HOURS = 24 * 7
+
+# Perguntas quase iguais (ex.: "o que é o método" e "o que é método")
+# reaproveitam a resposta. Similaridade de 0 a 1; 1.0 desativa na prática.
+# As respostas valem pelo mesmo RESPONSE_CACHE_TTL_HOURS; no máximo
+# SIMILAR_QUESTION_MAX_ENTRIES perguntas ficam no índice (as mais antigas saem).
+SIMILAR_QUESTION_THRESHOLD = 0.8
+SIMILAR_QUESTION_MAX_ENTRIES = 5000
+
+# ========================================
+#    TRANSCRIÇÃO
+# ========================================
+#
+# Gravações longas são cortadas nas pausas em trechos de até
+# TRANSCRIPTION_SEGMENT_SECONDS e transcritas em paralelo por até
+# TRANSCRIPTION_WORKERS requisições simultâneas. Um trecho que falhar é
+# repetido até TRANSCRIPTION_RETRIES vezes sem refazer os outros.
+
+TRANSCRIPTION_SEGMENT_SECONDS = 30
+TRANSCRIPTION_WORKERS = 4
+TRANSCRIPTION_RETRIES = 2
+
+# Canais separados: microfone ("Eu") e áudio do sistema ("Reunião") são
+# transcritos cada um por si, em paralelo, sem mixagem, e juntados numa
+# transcrição com horário e quem falou. Fala sobreposta deixa de virar ruído.
+# Também pode ser ligado na interface.
+
+SEPARATE_CHANNEL_TRANSCRIPTION = False
+
+# Reconhecedor de fala (também pode ser trocado na interface):
+# "google" - Google Web Speech, online (padrão)
+# "vosk"   - offline, só CPU; requer pip install vosk e um modelo em português
+#            (ex.: vosk-model-small-pt-0.3) na pasta VOSK_MODEL_PATH
+# "fake"   - simulado e determinístico, para testes e benchmarks
+
+ASR_BACKEND = "google"
+VOSK_MODEL_PATH = None
+FAKE_ASR_LATENCY_SECONDS = 0.2
+
+# ========================================
+#    PIPELINE DA INTERFACE
+# ========================================
+#
+# Captura → VAD → transcrição → Claude rodam como etapas ligadas por filas
+# limitadas; o status abaixo do botão de gravação mostra a fila e o tempo
+# médio de cada etapa (⚠️ marca o gargalo). Quando uma etapa atrasa:
+# - VAD: blocos novos entram no último item da fila, os da mesma fonte
+#   juntados num bloco maior (nada é perdido)
+# - transcrição ao vivo: a fala nova é juntada à última da fila se for do
+#   mesmo canal; senão a fala mais antiga da fila é descartada
+# - Claude: a pergunta na fila é substituída pela mais nova
+
+PIPELINE_VAD_QUEUE = 64
+PIPELINE_ASR_WORKERS = 2
+PIPELINE_ASR_QUEUE = 16
+PIPELINE_LLM_WORKERS = 2
+PIPELINE_SHUTDOWN_SECONDS = 3
+
+# ========================================
+#    SERVIDOR LOCAL (python server.py)
+# ========================================
+
+# Um servidor compartilha documento, caches e cliente Claude entre várias
+# pessoas. Só aceita conexões desta máquina por padrão; use "0.0.0.0" para a rede
+# do laboratório. Os limites valem para pedidos simultâneos de cada serviço.
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+SERVER_ASR_CONCURRENCY = 4
+SERVER_LLM_CONCURRENCY = 2
+SERVER_MAX_BODY_MB = 50
+
+# POST /documents só aceita arquivos dentro desta pasta (caminhos relativos a
+# ela); None desativa a rota. Documentos passados em --documento não têm limite.
+SERVER_DOCUMENTS_DIR = "documentos"
+
+# Sessões sem uso por SERVER_SESSION_IDLE_MINUTES são descartadas; acima de
+# SERVER_MAX_SESSIONS abertas, novas sessões são recusadas (503)
+SERVER_MAX_SESSIONS = 100
+SERVER_SESSION_IDLE_MINUTES = 60
+
+# ========================================
+#    EXTRAÇÃO DE PDF
+# ========================================
+#
+# Processos usados para extrair páginas em paralelo (None = número de CPUs)
+
+PDF_EXTRACTION_WORKERS = None
+
+# Texto extraído e índice de busca ficam em cache no disco; reabrir o mesmo
+# arquivo é instantâneo. EXTRACTION_CACHE_DIR = None usa ~/.transcritor/extracoes
+
+EXTRACTION_CACHE_DIR = None
+EXTRACTION_CACHE_MAX_MB = 500
+
+# Limpeza do texto extraído antes de indexar/enviar ao Claude: remove cabeçalhos,
+# rodapés e numeração que se repetem nas páginas, junta palavras hifenizadas e
+# colapsa espaços. Menos tokens por pergunta = respostas mais rápidas e baratas.
+
+DOCUMENT_CLEANUP = True
+
 # ========================================
 #    COMO OBTER UMA API KEY
 # ========================================
@@ -0,0 +1,191 @@
+import os
+import threading
+
+import document_extraction
+import text_cleanup
+from response_cache import document_digest
+from retrieval import DocumentIndex, search_indexes, split_pages
+
+
+class CorpusDocument:
+    """Um documento do corpus: texto, páginas, índice próprio e progresso da extração"""
+
+    def __init__(self, path, chunk_size):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.content = ""
+        self.digest = None
+        self.pages = {}             # Páginas publicadas (PDF): {número: texto}
+        self.index = DocumentIndex(chunk_size=chunk_size)
+        self.coverage = (0, 0)      # (páginas prontas, total)
+        self.complete = False
+        self.cleanup = None         # Relatório da limpeza do texto
+        self.removed = False        # Removido durante a conversão: resultados são descartados
+
+
+class DocumentCorpus:
+    """Conjunto de documentos carregados ao mesmo tempo (ex.: tese + artigos de referência).
+
+    Cada documento é extraído, guardado em cache e indexado separadamente, então
+    adicionar ou remover um arquivo só processa aquele arquivo. A busca combina
+    os índices com estatísticas BM25 globais e indica de qual documento veio
+    cada trecho. Todos os métodos podem ser chamados de threads de conversão.
+    """
+
+    def __init__(self, chunk_size=1200, cleanup=True):
+        self.chunk_size = chunk_size
+        self.cleanup = cleanup
+        self.lock = threading.Lock()
+        self._documents = {}        # caminho -> CorpusDocument, na ordem de inclusão
+        self._content = None        # Texto combinado, refeito sob demanda
+        self._digest = None
+
+    def __len__(self):
+        return len(self._documents)
+
+    def documents(self):
+        with self.lock:
+            return list(self._documents.values())
+
+    def add(self, path):
+        """Começa (ou recomeça) um documento vazio; retorna o CorpusDocument"""
+        document = CorpusDocument(path, self.chunk_size)
+        with self.lock:
+            previous = self._documents.pop(path, None)
+            if previous is not None:
+                previous.removed = True
+            self._documents[path] = document
+            self._changed()
+        return document
+
+    def remove(self, path):
+        """Tira um documento do corpus sem mexer nos outros"""
+        with self.lock:
+            document = self._documents.pop(path, None)
+            if document is None:
+                return False
+            document.removed = True
+            self._changed()
+            return True
+
+    def _changed(self):
+        """Invalida o texto combinado; chamado com o lock adquirido"""
+        self._content = None
+        self._digest = None
+
+    def publish_text(self, document, text, index=None, cleanup=None):
+        """Publica um documento extraído de uma vez (TXT, DOCX ou cache)"""
+        if index is None:
+            index = DocumentIndex(chunk_size=self.chunk_size)
+            index.add_document(text)
+        with self.lock:
+            if document.removed:
+                return
+            document.content = text
+            document.digest = document_digest(text)
+            document.index = index
+            document.coverage = (1, 1)
+            document.cleanup = cleanup
+            self._changed()
+
+    def publish_pages(self, document, batch, done, total):
+        """Adiciona páginas ao documento e ao seu índice; perguntas passam a enxergá-las"""
+        with self.lock:
+            if document.removed:
+                return
+            for page_num, page_text, _ in batch:
+                if self.cleanup:
+                    page_text = text_cleanup.clean_text(page_text)
+                document.pages[page_num] = page_text
+                if page_text.strip():
+                    document.index.add_page(page_num, page_text)
+            document.content = self._assemble(document.pages)
+            document.digest = document_digest(document.content)
+            document.coverage = (done, total)
+            self._changed()
+
+    def remove_repeated_page_lines(self, document, raw_chars):
+        """Com todas as páginas prontas, remove cabeçalhos/rodapés repetidos e refaz o índice do documento"""
+        with self.lock:
+            if document.removed:
+                return
+            pages, removed = text_cleanup.remove_repeated_lines(document.pages)
+            if removed:
+                index = DocumentIndex(chunk_size=self.chunk_size)
+                for page_num in sorted(pages):
+                    if pages[page_num].strip():
+                        index.add_page(page_num, pages[page_num])
+                document.pages = pages
+                document.content = self._assemble(pages)
+                document.digest = document_digest(document.content)
+                document.index = index
+                self._changed()
+            document.cleanup = text_cleanup.cleanup_report(raw_chars, len(document.content), removed)
+
+    def mark_complete(self, document):
+        with self.lock:
+            document.complete = True
+
+    @staticmethod
+    def _assemble(pages):
+        return document_extraction.assemble_pages([(page_num, pages[page_num], None) for page_num in sorted(pages)])
+
+    @property
+    def content(self):
+        """Texto de todos os documentos; com mais de um, cada um vem com o nome no cabeçalho"""
+        with self.lock:
+            if self._content is None:
+                documents = [d for d in self._documents.values() if d.content.strip()]
+                if len(documents) == 1:
+                    self._content = documents[0].content
+                else:
+                    self._content = "\n\n".join(f"=== DOCUMENTO: {d.name} ===\n{d.content}" for d in documents)
+            return self._content
+
+    @property
+    def digest(self):
+        """Digest do corpus: muda quando qualquer documento entra, sai ou muda"""
+        with self.lock:
+            if self._digest is None:
+                digests = [d.digest for d in self._documents.values() if d.content.strip()]
+                if len(digests) == 1:
+                    self._digest = digests[0]
+                else:
+                    self._digest = document_digest("\n".join(digests)) if digests else None
+            return self._digest
+
+    @property
+    def loaded(self):
+        with self.lock:
+            return any(d.content.strip() for d in self._documents.values())
+
+    @property
+    def complete(self):
+        with self.lock:
+            return all(d.complete for d in self._documents.values())
+
+    @property
+    def coverage(self):
+        """Páginas prontas/total somadas entre os documentos ainda em conversão"""
+        with self.lock:
+            pending = [d.coverage for d in self._documents.values() if not d.complete]
+        return sum(done for done, _ in pending), sum(total for _, total in pending)
+
+    def chunk_count(self):
+        with self.lock:
+            return sum(len(d.index) for d in self._documents.values())
+
+    def search(self, query, k=5):
+        """Trechos mais relevantes entre todos os documentos, com o nome de origem em 'source'"""
+        with self.lock:
+            indexes = [(d.name, d.index) for d in self._documents.values()]
+            return search_indexes(indexes, query, k=k)
+
+    def page_texts(self):
+        """[((documento, página), texto)] de todos os documentos, em ordem"""
+        with self.lock:
+            documents = list(self._documents.values())
+        pages = []
+        for document in documents:
+            pages.extend(((document.name, page), text) for page, text in split_pages(document.content))
+        return pages
@@ -0,0 +1,300 @@
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from importlib import metadata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Importações opcionais para funcionalidades específicas
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    import PyPDF2
+except ImportError:
+    PyPDF2 = None
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+# PDFs pequenos são extraídos no próprio processo (abrir o pool custa mais que extrair)
+MIN_PAGES_FOR_POOL = 16
+
+NO_PDF_LIBRARY_MESSAGE = ("Não foi possível extrair texto do PDF. Instale uma das bibliotecas: "
+                          "pip install PyPDF2 ou pip install pdfplumber ou pip install PyMuPDF")
+
+
+def library_version(distribution):
+    """Versão instalada de um pacote, ou None"""
+    try:
+        return metadata.version(distribution)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def pdf_extractor_signature():
+    """Bibliotecas de PDF disponíveis e suas versões (parte da chave do cache de extração)"""
+    libraries = (('PyMuPDF', fitz), ('PyPDF2', PyPDF2), ('pdfplumber', pdfplumber))
+    return ';'.join(f"{name}={library_version(name)}" for name, module in libraries if module is not None)
+
+
+def pdf_page_count(pdf_path):
+    """Número de páginas usando a primeira biblioteca disponível"""
+    if fitz is not None:
+        try:
+            with fitz.open(pdf_path) as doc:
+                return len(doc)
+        except Exception as e:
+            print(f"Erro PyMuPDF: {e}")
+    if PyPDF2 is not None:
+        try:
+            with open(pdf_path, 'rb') as file:
+                return len(PyPDF2.PdfReader(file).pages)
+        except Exception as e:
+            print(f"Erro PyPDF2: {e}")
+    if pdfplumber is not None:
+        try:
+            with pdfplumber.open(pdf_path) as pdf:
+                return len(pdf.pages)
+        except Exception as e:
+            print(f"Erro pdfplumber: {e}")
+    raise Exception(NO_PDF_LIBRARY_MESSAGE)
+
+
+class _PageReaders:
+    """Abre cada biblioteca só quando uma página precisa dela (fallback por página)"""
+
+    def __init__(self, pdf_path):
+        self.pdf_path = pdf_path
+        self._opened = {}
+
+    def _open(self, name):
+        if name not in self._opened:
+            try:
+                if name == 'pymupdf':
+                    self._opened[name] = fitz.open(self.pdf_path)
+                elif name == 'pypdf2':
+                    self._opened[name] = PyPDF2.PdfReader(self.pdf_path)
+                else:
+                    self._opened[name] = pdfplumber.open(self.pdf_path)
+            except Exception as e:
+                print(f"Erro ao abrir com {name}: {e}")
+                self._opened[name] = None
+        return self._opened[name]
+
+    def extract(self, page_index):
+        """Texto da página pela biblioteca mais rápida que devolver algo; (texto, biblioteca)"""
+        attempts = (('pymupdf', fitz), ('pypdf2', PyPDF2), ('pdfplumber', pdfplumber))
+        for name, module in attempts:
+            if module is None:
+                continue
+            reader = self._open(name)
+            if reader is None:
+                continue
+            try:
+                if name == 'pymupdf':
+                    text = reader.load_page(page_index).get_text()
+                else:
+                    text = reader.pages[page_index].extract_text()
+            except Exception as e:
+                print(f"Erro {name} na página {page_index + 1}: {e}")
+                continue
+            if text and text.strip():
+                return text, name
+        return "", None
+
+    def close(self):
+        for name, reader in self._opened.items():
+            if reader is not None and name != 'pypdf2':
+                try:
+                    reader.close()
+                except Exception:
+                    pass
+
+
+def extract_page_range(pdf_path, start, end):
+    """Extrai as páginas [start, end) - roda dentro de um processo do pool"""
+    readers = _PageReaders(pdf_path)
+    try:
+        return [(page_index + 1,) + readers.extract(page_index) for page_index in range(start, end)]
+    finally:
+        readers.close()
+
+
+def iter_pdf_pages(pdf_path, workers=None):
+    """Gera as páginas conforme ficam prontas: ([(página, texto, biblioteca)], prontas, total).
+
+    No modo paralelo os lotes chegam na ordem em que os processos terminam,
+    não necessariamente na ordem das páginas.
+    """
+    total = pdf_page_count(pdf_path)
+    if total == 0:
+        return
+    workers = workers or os.cpu_count() or 1
+
+    if total < MIN_PAGES_FOR_POOL or workers == 1:
+        done = 0
+        step = max(1, total // 20)
+        for start in range(0, total, step):
+            batch = extract_page_range(pdf_path, start, min(total, start + step))
+            done += len(batch)
+            yield batch, done, total
+        return
+
+    # Faixas menores que páginas/workers equilibram páginas pesadas entre processos
+    range_size = max(1, total // (workers * 4))
+    ranges = [(start, min(total, start + range_size)) for start in range(0, total, range_size)]
+    done = 0
+    try:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    except Exception as e:
+        # Ambientes sem suporte a processos: extrair no próprio processo
+        print(f"⚠️ Extração paralela indisponível ({e}); extraindo sequencialmente")
+        yield from iter_pdf_pages(pdf_path, workers=1)
+        return
+    with pool:
+        futures = [pool.submit(extract_page_range, pdf_path, start, end) for start, end in ranges]
+        for future in as_completed(futures):
+            batch = future.result()
+            done += len(batch)
+            yield batch, done, total
+
+
+def extract_pdf_pages(pdf_path, workers=None, progress=None):
+    """Extrai todas as páginas em paralelo; retorna [(página, texto, biblioteca)] em ordem.
+
+    ``progress(páginas_prontas, total)`` é chamado conforme cada faixa termina.
+    """
+    pages = []
+    for batch, done, total in iter_pdf_pages(pdf_path, workers=workers):
+        pages.extend(batch)
+        if progress:
+            progress(done, total)
+    pages.sort(key=lambda page: page[0])
+    return pages
+
+
+def assemble_pages(pages):
+    """Junta as páginas com os marcadores '--- Página N ---' (custo linear)"""
+    parts = []
+    for page_num, text, _ in pages:
+        if text.strip():
+            parts.append(f"\n--- Página {page_num} ---\n")
+            parts.append(text + '\n')
+    return ''.join(parts)
+
+
+def extract_pdf_text(pdf_path, workers=None, progress=None):
+    """Extrai o texto do PDF; a biblioteca de fallback é escolhida página a página"""
+    pages = extract_pdf_pages(pdf_path, workers=workers, progress=progress)
+    text_content = assemble_pages(pages)
+    if not text_content.strip():
+        raise Exception(NO_PDF_LIBRARY_MESSAGE)
+    return text_content
+
+
+# ========================================
+#    DOCX (leitura direta do XML)
+# ========================================
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# Versão do extrator DOCX (parte da chave do cache de extração)
+DOCX_EXTRACTOR_VERSION = "stream-2"
+
+
+def _docx_part_order(archive):
+    """Partes do DOCX na ordem de leitura: cabeçalhos, corpo, rodapés"""
+    names = set(archive.namelist())
+    parts = {'header': [], 'footer': []}
+    if 'word/_rels/document.xml.rels' in names:
+        # O tipo da relação diz se a parte é cabeçalho ou rodapé
+        with archive.open('word/_rels/document.xml.rels') as rels:
+            for _, elem in ET.iterparse(rels):
+                if elem.tag != f'{REL_NS}Relationship':
+                    continue
+                kind = elem.get('Type', '').rsplit('/', 1)[-1]
+                target = posixpath.normpath(posixpath.join('word', elem.get('Target', '')))
+                if kind in parts and target in names and target not in parts[kind]:
+                    parts[kind].append(target)
+
+    def part_number(name):
+        digits = re.sub(r'\D', '', posixpath.basename(name))
+        return int(digits) if digits else 0
+
+    headers = sorted(parts['header'], key=part_number)
+    footers = sorted(parts['footer'], key=part_number)
+    return headers + ['word/document.xml'] + footers
+
+
+def _iter_part_blocks(stream):
+    """Gera parágrafos e linhas de tabela de uma parte XML, em memória constante"""
+    runs = []            # Pedaços de texto do parágrafo atual
+    cells = []           # Pilha de células abertas: [[parágrafos]]
+    rows = []            # Pilha de linhas abertas: [[células]]
+    container = None     # Elemento raiz do conteúdo (body/hdr/ftr), limpo a cada bloco
+    run_depth = 0        # Dentro de um w:r: w:tab fora dele é definição de tabulação (w:pPr/w:tabs)
+
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        tag = elem.tag[len(W_NS):] if elem.tag.startswith(W_NS) else None
+        if event == 'start':
+            if tag in ('body', 'hdr', 'ftr'):
+                container = elem
+            elif tag == 'tr':
+                rows.append([])
+            elif tag == 'tc':
+                cells.append([])
+            elif tag == 'r':
+                run_depth += 1
+            continue
+
+        if tag == 'r':
+            run_depth -= 1
+        elif tag == 't':
+            runs.append(elem.text or '')
+        elif tag == 'tab':
+            if run_depth:
+                runs.append('\t')
+        elif tag in ('br', 'cr'):
+            runs.append('\n')
+        elif tag == 'p':
+            paragraph = ''.join(runs)
+            runs = []
+            if cells:
+                cells[-1].append(paragraph)
+            else:
+                yield paragraph
+        elif tag == 'tc':
+            cell = '\n'.join(p for p in cells.pop() if p.strip())
+            if rows:
+                rows[-1].append(cell)
+        elif tag == 'tr':
+            row = ' | '.join(rows.pop())
+            if cells:
+                # Tabela dentro de célula: a linha vira um parágrafo da célula externa
+                cells[-1].append(row)
+            elif row.strip(' |'):
+                yield row
+
+        if tag in ('p', 'tbl') and not cells and container is not None:
+            # Bloco de nível superior concluído: liberar a árvore já lida
+            container.clear()
+
+
+def iter_docx_blocks(docx_path):
+    """Gera o texto do DOCX (parágrafos, tabelas, cabeçalhos e rodapés) em ordem de leitura"""
+    with zipfile.ZipFile(docx_path) as archive:
+        for part in _docx_part_order(archive):
+            with archive.open(part) as stream:
+                yield from _iter_part_blocks(stream)
+
+
+def extract_docx_text(docx_path):
+    """Extrai o texto do DOCX lendo o XML direto do zip (sem python-docx)"""
+    return '\n'.join(iter_docx_blocks(docx_path))
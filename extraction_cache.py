@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+
+from response_cache import DEFAULT_CACHE_DIR
+
+
+def file_digest(file_path, block_size=1024 * 1024):
+    """SHA-256 do conteúdo do arquivo, lido em blocos"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Cache em disco do texto extraído de documentos.
+
+    Cada entrada é uma pasta identificada pelo digest do conteúdo, tamanho,
+    data de modificação e biblioteca/versão do extrator. Além do texto ficam
+    gravados artefatos derivados (offsets das páginas, índice de busca) para
+    que recarregar um documento conhecido não refaça nenhum processamento.
+    Acima de ``max_size_mb`` as entradas usadas há mais tempo são removidas.
+    """
+
+    TEXT_FILE = "texto.txt"
+    META_FILE = "meta.json"
+
+    def __init__(self, directory=None, max_size_mb=500):
+        self.directory = directory or os.path.join(DEFAULT_CACHE_DIR, "extracoes")
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key_for(self, file_path, extractor):
+        """Chave da entrada: conteúdo + tamanho + mtime + extrator"""
+        stat = os.stat(file_path)
+        payload = json.dumps({
+            'sha256': file_digest(file_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'extractor': extractor,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.directory, key)
+
+    def load(self, key):
+        """Retorna {'text', 'meta'} ou None se a entrada não existir"""
+        entry_dir = self._entry_dir(key)
+        meta_path = os.path.join(entry_dir, self.META_FILE)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+            with open(os.path.join(entry_dir, self.TEXT_FILE), 'r', encoding='utf-8') as file:
+                text = file.read()
+        except (OSError, ValueError):
+            return None
+        # A data de modificação do meta.json marca o último uso (LRU)
+        os.utime(meta_path, None)
+        return {'text': text, 'meta': meta}
+
+    def save(self, key, text, meta=None):
+        """Grava o texto extraído e os metadados; aplica o limite de tamanho"""
+        entry_dir = self._entry_dir(key)
+        with self._lock:
+            os.makedirs(entry_dir, exist_ok=True)
+            with open(os.path.join(entry_dir, self.TEXT_FILE), 'w', encoding='utf-8') as file:
+                file.write(text)
+            meta = dict(meta or {}, created_at=time.time())
+            with open(os.path.join(entry_dir, self.META_FILE), 'w', encoding='utf-8') as file:
+                json.dump(meta, file, ensure_ascii=False)
+            self._evict(keep=key)
+
+    def save_artifact(self, key, name, obj):
+        """Grava um artefato derivado (ex.: índice de busca) junto da entrada"""
+        entry_dir = self._entry_dir(key)
+        if not os.path.isdir(entry_dir):
+            return
+        temp_path = os.path.join(entry_dir, f"{name}.pkl.tmp")
+        with open(temp_path, 'wb') as file:
+            pickle.dump(obj, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, os.path.join(entry_dir, f"{name}.pkl"))
+        with self._lock:
+            self._evict(keep=key)
+
+    def load_artifact(self, key, name):
+        """Carrega um artefato derivado ou None"""
+        try:
+            with open(os.path.join(self._entry_dir(key), f"{name}.pkl"), 'rb') as file:
+                return pickle.load(file)
+        except (OSError, pickle.PickleError, EOFError, AttributeError):
+            return None
+
+    def _entries(self):
+        """[(último uso, tamanho em bytes, pasta)] de todas as entradas"""
+        entries = []
+        for name in os.listdir(self.directory):
+            entry_dir = os.path.join(self.directory, name)
+            if not os.path.isdir(entry_dir):
+                continue
+            size = 0
+            for file_name in os.listdir(entry_dir):
+                try:
+                    size += os.path.getsize(os.path.join(entry_dir, file_name))
+                except OSError:
+                    pass
+            try:
+                last_used = os.path.getmtime(os.path.join(entry_dir, self.META_FILE))
+            except OSError:
+                last_used = 0
+            entries.append((last_used, size, entry_dir))
+        return entries
+
+    def _evict(self, keep=None):
+        """Remove as entradas usadas há mais tempo até caber no limite; chamado com o lock adquirido"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        keep_dir = self._entry_dir(keep) if keep else None
+        for _, size, entry_dir in entries:
+            if total <= self.max_size_bytes:
+                break
+            if entry_dir == keep_dir:
+                continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self):
+        """Apaga todas as extrações guardadas"""
+        with self._lock:
+            for _, _, entry_dir in self._entries():
+                shutil.rmtree(entry_dir, ignore_errors=True)
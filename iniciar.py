@@ -3,41 +3,45 @@ from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
 import pyaudio
 import wave
-import speech_recognition as sr
-import anthropic
 import os
-from datetime import datetime
 import numpy as np
 import sounddevice as sd
 import subprocess
 import platform
 import re
 import time
-import soundfile as sf
+import config
 from config import ANTHROPIC_API_KEY
+from streaming import UtteranceSegmenter, merge_audio_blocks, to_mono_int16
+from vad import VoiceActivityDetector
+from audio_buffer import AudioRingBuffer
+from mixer import TimestampedMixer
+from segment_transcription import format_timestamp
+from asr_backends import BACKENDS, BackendError, NoSpeechError, create_backend
+import text_cleanup
+import instrumentation
+from instrumentation import increment, observe, span
+from token_budget import TokenBudgetError
+from assistant import MeetingAssistant, ASR_BACKEND, RETRIEVAL_TOP_K, SAMPLE_RATE, format_usage
+from pipeline import Pipeline, DROPPED, DROP_NEWEST, DROP_OLDEST, MERGE
 
-# Importações opcionais para funcionalidades específicas
-try:
-    import fitz  # PyMuPDF
-except ImportError:
-    fitz = None
-
-try:
-    import PyPDF2
-except ImportError:
-    PyPDF2 = None
+# Removido soundcard - não é necessário
 
-try:
-    import pdfplumber
-except ImportError:
-    pdfplumber = None
+# Configurações opcionais (valores padrão se ausentes do config.py)
+SEPARATE_CHANNEL_TRANSCRIPTION = getattr(config, "SEPARATE_CHANNEL_TRANSCRIPTION", False)
+# Rótulo de cada fonte na transcrição por canais separados
+CHANNEL_LABELS = {'mic': "Eu", 'system': "Reunião"}
 
-try:
-    from docx import Document
-except ImportError:
-    Document = None
+# Pipeline: filas e workers de cada etapa
+PIPELINE_VAD_QUEUE = getattr(config, "PIPELINE_VAD_QUEUE", 64)
+PIPELINE_ASR_WORKERS = getattr(config, "PIPELINE_ASR_WORKERS", 2)
+PIPELINE_ASR_QUEUE = getattr(config, "PIPELINE_ASR_QUEUE", 16)
+PIPELINE_LLM_WORKERS = getattr(config, "PIPELINE_LLM_WORKERS", 2)
+PIPELINE_SHUTDOWN_SECONDS = getattr(config, "PIPELINE_SHUTDOWN_SECONDS", 3)
 
-# Removido soundcard - não é necessário
+RESPONSE_FLUSH_MS = 50  # Intervalo entre atualizações do painel durante o streaming
+LIVE_BLOCK_SECONDS = 0.1  # Blocos juntados na fila do VAD são reanalisados neste tamanho
+MAX_LIVE_UTTERANCE_SECONDS = 30  # Limite ao juntar falas atrasadas na fila da transcrição ao vivo
 
 class AudioTranscriberApp:
     def __init__(self, root):
@@ -49,32 +53,113 @@ class AudioTranscriberApp:
         self.chunk = 512  # Reduzir chunk size para menor latência
         self.format = pyaudio.paInt16
         self.channels = 2
-        self.rate = 16000  # Usar 16kHz em vez de 44.1kHz para transcrição mais rápida
+        self.rate = SAMPLE_RATE  # Usar 16kHz em vez de 44.1kHz para transcrição mais rápida
         self.recording = False
-        self.audio_frames_mic = []
-        self.audio_frames_system = []
-        self.combined_audio = []
-        
-        # Cliente Claude API
-        self.client = anthropic.Anthropic(
-            api_key = ANTHROPIC_API_KEY
-        )
-        
-        # Otimização: Cache para respostas da API
-        self.response_cache = {}
-        
-        # Otimização: Thread pool para operações paralelas
-        self.thread_pool = []
+        # Otimização: buffers pré-alocados em vez de listas de cópias por bloco
+        self.mic_buffer = None
+        self.system_buffer = None
+        self.mixer = TimestampedMixer(self.rate)
+        
+        # Transcrição ao vivo: um segmentador por fonte de áudio
+        self.live_mode = False
+        self.live_segmenters = {}
+        self.live_positions = {}  # Amostras já segmentadas por fonte
+        self.live_origins = {}    # Início de cada fonte em segundos desde o começo da gravação
+        self.separate_channels = SEPARATE_CHANNEL_TRANSCRIPTION
+        self.recording_started_at = time.monotonic()
+        self.capture_finished = None  # Sinalizado quando os streams da gravação atual fecham
+        self.capture_requested_at = time.perf_counter()
+        self.capture_started = set()  # Fontes que já entregaram o primeiro bloco
+        
+        # VAD com limiares calibrados por dispositivo (chave = nome na combobox)
+        self.vad_detectors = {}
+        self.recording_devices = {}
+        
+        # Núcleo sem interface: documentos, caches, reconhecedor e cliente Claude
+        # (o mesmo usado pelo modo em lote, ver batch.py)
+        self.assistant = MeetingAssistant(api_key=ANTHROPIC_API_KEY, asr_backend=ASR_BACKEND, rate=self.rate)
+        
+        # Streaming da resposta: pedaços acumulados e aplicados em lotes via root.after
+        self.claude_generation = 0  # Incrementado a cada pergunta; respostas antigas são canceladas
+        self.response_delta_lock = threading.Lock()
+        self.pending_response_deltas = []
+        self.response_flush_scheduled = False
+        self.response_stream_generation = None
         
         # Variáveis
-        self.selected_document_path = None
-        self.document_content = ""
-        self.document_loaded = False
-        self.audio_devices = self.get_audio_devices()
+        # Corpus: vários documentos, cada um extraído e indexado separadamente;
+        # as páginas ficam disponíveis para perguntas durante a extração
+        self.corpus = self.assistant.corpus
+        
+        # Etapas de trabalho em background, ligadas por filas limitadas
+        self.pipeline = self.build_pipeline().start()
+        with span('device_scan'):
+            self.audio_devices = self.get_audio_devices()
         self.selected_mic_device = None
         self.selected_system_device = None
         
         self.create_widgets()
+        self.update_pipeline_status()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+    def build_pipeline(self):
+        """Etapas: documentos, captura → VAD → transcrição → Claude.
+        
+        Cada etapa tem sua fila limitada e seus workers; o que fazer quando
+        uma fila enche é decidido por etapa (ver config.py, PIPELINE_*).
+        """
+        pipeline = Pipeline()
+        # Um documento por vez: a extração de PDF já usa todos os processadores
+        pipeline.add_stage('documentos', self.convert_document, max_queue=32, policy=DROP_NEWEST)
+        # Loop de captura de cada gravação (os streams chamam os callbacks por conta própria)
+        pipeline.add_stage('captura', self.run_capture, max_queue=1, policy=DROP_NEWEST)
+        # Os callbacks de captura só enfileiram; se o VAD atrasar, os blocos novos entram no último item da fila
+        pipeline.add_stage('vad', self.segment_live_blocks, max_queue=PIPELINE_VAD_QUEUE,
+                           policy=MERGE, merge=merge_audio_blocks,
+                           on_drop=lambda blocks: increment('dropped_frames', sum(len(b[1]) for b in blocks), stage='vad'))
+        # Falas transcritas em paralelo, mas mostradas na ordem em que foram ditas
+        pipeline.add_stage('asr', self.transcribe_live_utterance, workers=PIPELINE_ASR_WORKERS,
+                           max_queue=PIPELINE_ASR_QUEUE, policy=MERGE, merge=self.merge_live_utterances,
+                           ordered=True, output=self.show_live_text,
+                           on_drop=lambda item: increment('dropped_frames', len(item[0]), stage='asr'))
+        # Transcrição final (ou fim da transcrição ao vivo) de cada gravação, uma por vez
+        pipeline.add_stage('transcricao', lambda job: job(), max_queue=4, policy=DROP_NEWEST)
+        # Uma pergunta nova cancela a anterior; na fila só fica a mais recente
+        pipeline.add_stage('claude', lambda request: self.send_to_claude(*request),
+                           workers=PIPELINE_LLM_WORKERS, max_queue=1, policy=DROP_OLDEST)
+        return pipeline
+    
+    def update_pipeline_status(self):
+        """Mostra filas do pipeline e o painel de latências; repete a cada segundo"""
+        self.pipeline_label.config(text=self.pipeline.format_metrics())
+        self.latency_label.config(text=instrumentation.REGISTRY.format_latencies())
+        self.root.after(1000, self.update_pipeline_status)
+    
+    def export_metrics(self):
+        """Salva tempos e contadores em JSON ou no formato texto do Prometheus (.prom)"""
+        path = filedialog.asksaveasfilename(
+            title="Exportar Métricas",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("Prometheus (texto)", "*.prom"), ("Todos os arquivos", "*.*")]
+        )
+        if not path:
+            return
+        registry = instrumentation.REGISTRY
+        content = registry.to_prometheus() if path.endswith(('.prom', '.txt')) else registry.to_json()
+        try:
+            with open(path, 'w', encoding='utf-8') as output:
+                output.write(content)
+            print(f"📊 Métricas exportadas: {path}")
+        except OSError as e:
+            messagebox.showerror("Erro", f"Erro ao exportar métricas: {e}")
+    
+    def on_close(self):
+        """Fecha a janela encerrando as etapas sem esperar o que ainda está na fila"""
+        self.recording = False
+        self.claude_generation += 1  # Interrompe a resposta em andamento
+        if not self.pipeline.shutdown(drain=False, timeout=PIPELINE_SHUTDOWN_SECONDS):
+            print("⚠️ Algumas etapas ainda estavam trabalhando ao fechar")
+        self.root.destroy()
         
     def create_widgets(self):
         # Frame principal
@@ -94,12 +179,21 @@ class AudioTranscriberApp:
         doc_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
         doc_frame.columnconfigure(1, weight=1)
         
-        ttk.Button(doc_frame, text="Selecionar PDF/Documento", 
+        ttk.Button(doc_frame, text="➕ Adicionar Documentos", 
                   command=self.select_document).grid(row=0, column=0, padx=(0, 10))
         
         self.doc_label = ttk.Label(doc_frame, text="Nenhum documento selecionado")
         self.doc_label.grid(row=0, column=1, sticky=tk.W)
         
+        # Quantos trechos do documento enviar por pergunta
+        ttk.Label(doc_frame, text="Trechos por pergunta:").grid(row=0, column=2, padx=(10, 5))
+        self.top_k_var = tk.IntVar(value=RETRIEVAL_TOP_K)
+        ttk.Spinbox(doc_frame, from_=1, to=50, width=4, 
+                    textvariable=self.top_k_var).grid(row=0, column=3)
+        
+        ttk.Button(doc_frame, text="🧹 Limpar Cache", 
+                   command=self.clear_extraction_cache).grid(row=0, column=4, padx=(10, 0))
+        
         # Adicionar progress bar para conversão
         self.conversion_progress = ttk.Progressbar(doc_frame, mode='indeterminate')
         self.conversion_progress.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
@@ -120,6 +214,17 @@ class AudioTranscriberApp:
         )
         self.content_preview.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        # Documentos do corpus: perguntas buscam trechos em todos eles
+        corpus_frame = ttk.LabelFrame(doc_frame, text="Documentos Carregados")
+        corpus_frame.grid(row=3, column=2, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(10, 0), pady=(10, 0))
+        corpus_frame.columnconfigure(0, weight=1)
+        
+        self.document_list = tk.Listbox(corpus_frame, height=4, exportselection=False)
+        self.document_list.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.document_list.bind("<<ListboxSelect>>", self.show_document_preview)
+        ttk.Button(corpus_frame, text="➖ Remover", 
+                   command=self.remove_selected_document).grid(row=1, column=0, sticky=tk.E, pady=(2, 0))
+        
         # Seção de configuração de áudio
         audio_config_frame = ttk.LabelFrame(main_frame, text="Configuração de Áudio", padding="5")
         audio_config_frame.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -159,6 +264,33 @@ class AudioTranscriberApp:
         self.status_label = ttk.Label(audio_frame, text="Pronto para gravar")
         self.status_label.grid(row=0, column=1)
         
+        # Uso de memória dos buffers de áudio (útil em reuniões longas)
+        self.memory_label = ttk.Label(audio_frame, text="")
+        self.memory_label.grid(row=1, column=0, columnspan=3, sticky=tk.W, pady=(5, 0))
+        
+        # Filas e latência das etapas do pipeline (o gargalo aparece com ⚠️)
+        self.pipeline_label = ttk.Label(audio_frame, text="")
+        self.pipeline_label.grid(row=2, column=0, columnspan=5, sticky=tk.W, pady=(5, 0))
+        
+        # Transcrever cada frase durante a gravação em vez de esperar o fim
+        self.live_mode_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(audio_frame, text="Transcrição ao vivo", 
+                        variable=self.live_mode_var).grid(row=0, column=2, padx=(10, 0))
+        
+        # Reconhecedor de fala usado nas próximas transcrições
+        ttk.Label(audio_frame, text="Reconhecedor:").grid(row=0, column=3, padx=(10, 5))
+        self.asr_combo = ttk.Combobox(audio_frame, state="readonly", width=22,
+                                      values=[backend.label for backend in BACKENDS.values()])
+        self.asr_combo.set(self.assistant.asr_backend.label)
+        self.asr_combo.grid(row=0, column=4)
+        self.asr_combo.bind("<<ComboboxSelected>>", self.select_asr_backend)
+        
+        # Microfone e sistema transcritos separadamente, com rótulo de quem falou
+        self.separate_channels_var = tk.BooleanVar(value=SEPARATE_CHANNEL_TRANSCRIPTION)
+        ttk.Checkbutton(audio_frame, text="Canais separados (Eu / Reunião)", 
+                        variable=self.separate_channels_var).grid(row=1, column=3, columnspan=2,
+                                                                   sticky=tk.W, padx=(10, 0), pady=(5, 0))
+        
         # Seção de transcrição
         transcription_frame = ttk.LabelFrame(main_frame, text="Transcrição do Áudio", padding="5")
         transcription_frame.grid(row=4, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
@@ -185,10 +317,25 @@ class AudioTranscriberApp:
         )
         self.response_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        # Barra de status do Claude (uso de tokens e cache de prompt)
+        self.claude_status_label = ttk.Label(main_frame, text="", relief=tk.SUNKEN, anchor=tk.W)
+        self.claude_status_label.grid(row=7, column=0, sticky=(tk.W, tk.E), pady=(5, 0))
+        
+        # Painel de latência: último, média e p95 de cada etapa medida, atualizado a cada segundo
+        latency_frame = ttk.LabelFrame(main_frame, text="Latências", padding="5")
+        latency_frame.grid(row=8, column=0, sticky=(tk.W, tk.E), pady=(5, 0))
+        latency_frame.columnconfigure(0, weight=1)
+        self.latency_label = ttk.Label(latency_frame, text="", justify=tk.LEFT, font=("TkDefaultFont", 8))
+        self.latency_label.grid(row=0, column=0, rowspan=2, sticky=tk.W)
+        ttk.Button(latency_frame, text="💾 Exportar Métricas",
+                   command=self.export_metrics).grid(row=0, column=1, padx=(10, 0), sticky=tk.E)
+        ttk.Button(latency_frame, text="Zerar",
+                   command=instrumentation.REGISTRY.reset).grid(row=1, column=1, padx=(10, 0), sticky=tk.E)
+        
     def select_document(self):
-        """Seleciona e converte um documento imediatamente"""
-        file_path = filedialog.askopenfilename(
-            title="Selecionar Documento",
+        """Adiciona um ou mais documentos ao corpus e converte cada um em background"""
+        file_paths = filedialog.askopenfilenames(
+            title="Adicionar Documentos",
             filetypes=[
                 ("PDFs", "*.pdf"),
                 ("Arquivos de texto", "*.txt"),
@@ -197,138 +344,147 @@ class AudioTranscriberApp:
             ]
         )
         
-        if file_path:
-            self.selected_document_path = file_path
+        for file_path in file_paths:
             filename = os.path.basename(file_path)
+            document = self.corpus.add(file_path)
             self.doc_label.config(text=f"Convertendo: {filename}")
             
             # Mostrar progress bar
+            self.conversion_progress.config(mode='indeterminate')
             self.conversion_progress.grid()
             self.conversion_progress.start()
             self.conversion_status.config(text="Convertendo documento para texto...")
             
-            # Converter documento em thread separada
-            threading.Thread(target=self.convert_document, args=(file_path,), daemon=True).start()
+            # Converter documento em background (etapa 'documentos')
+            if self.pipeline.submit('documentos', document) == DROPPED:
+                self.corpus.remove(file_path)
+                messagebox.showwarning("Aviso", f"Muitos documentos na fila de conversão; {filename} não foi adicionado.")
+        if file_paths:
+            self.refresh_document_list()
     
-    def convert_document(self, file_path):
-        """Converte o documento para texto em background"""
+    def remove_selected_document(self):
+        """Remove o documento selecionado na lista; os outros continuam indexados"""
+        selection = self.document_list.curselection()
+        if not selection:
+            messagebox.showwarning("Aviso", "Selecione um documento na lista para remover.")
+            return
+        documents = self.corpus.documents()
+        document = documents[selection[0]]
+        self.corpus.remove(document.path)
+        print(f"➖ Documento removido do corpus: {document.name}")
+        self.refresh_document_list()
+        self.update_corpus_summary()
+    
+    def convert_document(self, document):
+        """Converte o documento para texto em background, publicando as páginas conforme ficam prontas"""
         try:
-            filename = os.path.basename(file_path)
-            
-            if file_path.endswith('.pdf'):
-                self.document_content = self.extract_pdf_text(file_path)
-            elif file_path.endswith('.txt'):
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    self.document_content = file.read()
-            elif file_path.endswith('.docx'):
-                if Document is not None:
-                    doc = Document(file_path)
-                    self.document_content = '\n'.join([paragraph.text for paragraph in doc.paragraphs])
-                else:
-                    self.root.after(0, lambda: messagebox.showerror("Erro", "Para arquivos .docx, instale: pip install python-docx"))
-                    return
-            else:
-                # Tentar ler como texto
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    self.document_content = file.read()
-            
+            self.assistant.convert_document(
+                document,
+                on_pages=lambda done, total: self.root.after(
+                    0, lambda: self.update_document_coverage(document, done, total))
+            )
+            if document.removed:
+                return
             # Atualizar interface na thread principal
-            self.root.after(0, lambda: self.document_conversion_complete(filename))
+            self.root.after(0, lambda: self.document_conversion_complete(document))
             
         except Exception as e:
-            error_msg = f"Erro ao converter documento: {str(e)}"
+            error_msg = f"Erro ao converter {document.name}: {str(e)}"
             self.root.after(0, lambda: self.document_conversion_error(error_msg))
     
-    def extract_pdf_text(self, pdf_path):
-        """Extrai texto de PDF usando múltiplas bibliotecas como fallback - OTIMIZADO"""
-        text_content = ""
-        
-        # Tentar com PyMuPDF primeiro (mais rápido)
-        if fitz is not None:
-            try:
-                doc = fitz.open(pdf_path)
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    page_text = page.get_text()
-                    if page_text.strip():
-                        text_content += f"\n--- Página {page_num + 1} ---\n"
-                        text_content += page_text + '\n'
-                doc.close()
-                
-                if text_content.strip():
-                    return text_content
-                    
-            except Exception as e:
-                print(f"Erro PyMuPDF: {e}")
-        
-        # Tentar com PyPDF2 como segunda opção
-        if PyPDF2 is not None:
-            try:
-                with open(pdf_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    for page_num, page in enumerate(pdf_reader.pages):
-                        page_text = page.extract_text()
-                        if page_text.strip():  # Se há texto na página
-                            text_content += f"\n--- Página {page_num + 1} ---\n"
-                            text_content += page_text + '\n'
-                
-                if text_content.strip():
-                    return text_content
-                    
-            except Exception as e:
-                print(f"Erro PyPDF2: {e}")
-        
-        # Tentar com pdfplumber como terceira opção
-        if pdfplumber is not None:
-            try:
-                with pdfplumber.open(pdf_path) as pdf:
-                    for page_num, page in enumerate(pdf.pages):
-                        page_text = page.extract_text()
-                        if page_text and page_text.strip():
-                            text_content += f"\n--- Página {page_num + 1} ---\n"
-                            text_content += page_text + '\n'
-                
-                if text_content.strip():
-                    return text_content
-                    
-            except Exception as e:
-                print(f"Erro pdfplumber: {e}")
-        
-        # Se nenhuma biblioteca funcionou
-        if not text_content.strip():
-            raise Exception("Não foi possível extrair texto do PDF. Instale uma das bibliotecas: pip install PyPDF2 ou pip install pdfplumber ou pip install PyMuPDF")
-        
-        return text_content
+    def clear_extraction_cache(self):
+        """Apaga as extrações e índices guardados em disco"""
+        extraction_cache = self.assistant.extraction_cache
+        size_mb = extraction_cache.size_bytes() / (1024 * 1024)
+        extraction_cache.clear()
+        messagebox.showinfo("Cache", f"Cache de documentos limpo ({size_mb:.1f} MB liberados).")
     
-    def document_conversion_complete(self, filename):
-        """Callback quando conversão do documento é concluída"""
-        # Parar progress bar
+    def start_determinate_progress(self):
+        """Troca a barra de conversão para o modo com porcentagem"""
         self.conversion_progress.stop()
-        self.conversion_progress.grid_remove()
-        
-        # Atualizar labels
-        char_count = len(self.document_content)
-        word_count = len(self.document_content.split())
-        
-        self.doc_label.config(text=f"✅ {filename}")
+        self.conversion_progress.config(mode='determinate', maximum=100, value=0)
+    
+    def update_document_coverage(self, document, done, total):
+        """Mostra quantas páginas já estão disponíveis para perguntas"""
+        if document.complete or document.removed:
+            return
+        if str(self.conversion_progress.cget('mode')) != 'determinate':
+            self.start_determinate_progress()
+        percent = 100.0 * done / total if total else 100.0
+        self.conversion_progress.config(value=percent)
+        self.doc_label.config(text=f"⏳ {document.name} (parcial)")
         self.conversion_status.config(
-            text=f"Conversão concluída: {char_count:,} caracteres, {word_count:,} palavras"
+            text=f"Extraindo páginas: {done}/{total} ({percent:.0f}%) - "
+                 f"perguntas já usam as páginas disponíveis"
         )
-        
-        # Mostrar prévia do conteúdo
+        self.refresh_document_list()
+    
+    def refresh_document_list(self):
+        """Atualiza a lista de documentos do corpus com o estado de cada um"""
+        self.document_list.delete(0, tk.END)
+        for document in self.corpus.documents():
+            if document.complete:
+                status = f"✅ {len(document.content):,} caracteres, {len(document.index):,} trechos"
+            else:
+                done, total = document.coverage
+                status = f"⏳ {done}/{total} páginas" if total else "⏳ convertendo"
+            self.document_list.insert(tk.END, f"{document.name} - {status}")
+    
+    def show_document_preview(self, event=None):
+        """Mostra a prévia do documento selecionado na lista"""
+        selection = self.document_list.curselection()
+        documents = self.corpus.documents()
+        if selection and selection[0] < len(documents):
+            self.set_preview(documents[selection[0]].content)
+    
+    def set_preview(self, content):
+        """Mostra os primeiros 500 caracteres como prévia"""
         self.content_preview.config(state=tk.NORMAL)
         self.content_preview.delete(1.0, tk.END)
-        
-        # Mostrar primeiros 500 caracteres como prévia
-        preview_text = self.document_content[:500]
-        if len(self.document_content) > 500:
+        preview_text = content[:500]
+        if len(content) > 500:
             preview_text += "... (conteúdo truncado para prévia)"
-            
         self.content_preview.insert(tk.END, preview_text)
         self.content_preview.config(state=tk.DISABLED)
+    
+    def update_corpus_summary(self):
+        """Estatísticas do corpus inteiro e estimativa do prompt por pergunta"""
+        documents = [d for d in self.corpus.documents() if d.content.strip()]
+        if not documents:
+            self.doc_label.config(text="Nenhum documento selecionado")
+            self.conversion_status.config(text="")
+            self.set_preview("")
+            return
+        content = self.corpus.content
+        names = ", ".join(d.name for d in documents)
+        self.doc_label.config(text=f"✅ {names}" if len(documents) == 1 else f"✅ {len(documents)} documentos: {names}")
+        self.conversion_status.config(
+            text=f"Corpus: {len(documents)} documento(s), {len(content):,} caracteres, "
+                 f"{len(content.split()):,} palavras, {self.corpus.chunk_count():,} trechos indexados"
+                 f"\n{self.assistant.describe_prompt_budget(self.get_top_k())}"
+        )
+    
+    def document_conversion_complete(self, document):
+        """Callback quando conversão do documento é concluída"""
+        if document.removed:
+            return
+        # Parar progress bar
+        self.conversion_progress.stop()
+        self.conversion_progress.grid_remove()
+        
+        self.refresh_document_list()
+        self.update_corpus_summary()
+        if document.cleanup:
+            self.conversion_status.config(
+                text=f"{self.conversion_status.cget('text')}\n{document.name}: "
+                     f"{text_cleanup.format_report(document.cleanup)}"
+            )
+        
+        # Mostrar prévia do conteúdo
+        self.set_preview(document.content)
         
-        self.document_loaded = True
-        messagebox.showinfo("Sucesso", f"Documento convertido com sucesso!\n{char_count:,} caracteres extraídos.")
+        char_count = len(document.content)
+        messagebox.showinfo("Sucesso", f"Documento convertido com sucesso!\n{document.name}: {char_count:,} caracteres extraídos.")
     
     def document_conversion_error(self, error_msg):
         """Callback quando há erro na conversão"""
@@ -339,8 +495,7 @@ class AudioTranscriberApp:
         # Mostrar erro
         self.doc_label.config(text="❌ Erro na conversão")
         self.conversion_status.config(text=error_msg)
-        
-        self.document_loaded = False
+        self.refresh_document_list()
         messagebox.showerror("Erro", error_msg)
     
     def get_audio_devices(self):
@@ -477,7 +632,8 @@ class AudioTranscriberApp:
     
     def refresh_audio_devices(self):
         """Atualiza a lista de dispositivos de áudio"""
-        self.audio_devices = self.get_audio_devices()
+        with span('device_scan'):
+            self.audio_devices = self.get_audio_devices()
         self.populate_audio_devices()
         self.debug_audio_devices()  # Debug após atualização
         messagebox.showinfo("Sucesso", "Dispositivos de áudio atualizados!")
@@ -550,13 +706,42 @@ class AudioTranscriberApp:
             self.record_button.config(text="🛑 Parar Gravação (Apenas Sistema)")
             self.status_label.config(text="Gravando apenas sistema...")
             
-        self.audio_frames_mic = []
-        self.audio_frames_system = []
-        self.combined_audio = []
-        
-        # Iniciar gravação em thread separada
-        threading.Thread(target=self.record_audio_combined, daemon=True).start()
-        
+        self.mic_buffer = AudioRingBuffer(self.rate, channels=1) if use_mic else None
+        self.system_buffer = None  # Criado quando o stream abre e o número de canais é conhecido
+        self.update_memory_usage()
+        
+        # Guardar os dispositivos usados (lidos aqui porque os callbacks não rodam na thread do Tk)
+        self.recording_devices = {
+            'mic': self.mic_combo.get() if use_mic else "",
+            'system': system_text if system_text and "Nenhum dispositivo" not in system_text else ""
+        }
+        self.separate_channels = self.separate_channels_var.get()
+        self.recording_started_at = time.monotonic()
+        self.capture_requested_at = time.perf_counter()
+        self.capture_started = set()
+        
+        # Preparar transcrição ao vivo
+        self.live_segmenters = {}
+        self.live_positions = {}
+        self.live_origins = {}
+        self.live_mode = self.live_mode_var.get()
+        if self.live_mode:
+            self.transcription_text.delete(1.0, tk.END)
+        
+        # Iniciar gravação em background (etapa 'captura')
+        self.capture_finished = threading.Event()
+        if self.pipeline.submit('captura', self.capture_finished) == DROPPED:
+            self.recording = False
+            self.record_button.config(text="🎤 Começar a Gravar")
+            self.status_label.config(text="A gravação anterior ainda está sendo encerrada, tente novamente")
+        
+    def run_capture(self, finished):
+        """Etapa 'captura': grava até o botão de parar e avisa quando os streams fecharam"""
+        try:
+            self.record_audio_combined()
+        finally:
+            finished.set()
+    
     def record_audio_combined(self):
         """Grava áudio do microfone e do sistema simultaneamente"""
         try:
@@ -578,14 +763,18 @@ class AudioTranscriberApp:
                 def mic_callback(indata, frames, time, status):
                     if status:
                         print(f"Mic status: {status}")
+                        increment('callback_overruns', source='mic')
                     if self.recording:
-                        self.audio_frames_mic.append(indata.copy())
+                        self.note_first_block('mic')
+                        self.mic_buffer.write(indata)
+                        self.feed_live_audio('mic', indata, 1)
                 
                 # Iniciar gravação do microfone
                 mic_stream = sd.InputStream(
                     device=mic_index,
                     channels=1,
                     samplerate=self.rate,
+                    dtype='int16',  # Mesmo formato do buffer: escrita sem conversão
                     callback=mic_callback,
                     blocksize=int(self.rate * duration_chunk)
                 )
@@ -625,7 +814,8 @@ class AudioTranscriberApp:
                         time.sleep(0.1)
                     
         except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("Erro de Áudio", f"Erro na gravação: {str(e)}"))
+            error_msg = f"Erro na gravação: {str(e)}"
+            self.root.after(0, lambda: messagebox.showerror("Erro de Áudio", error_msg))
     
     def get_system_audio_method(self):
         """Determina o método para capturar áudio do sistema baseado no OS"""
@@ -708,6 +898,7 @@ class AudioTranscriberApp:
                             frames_per_buffer=self.chunk
                         )
                         print(f"✅ Stream de loopback aberto para: {device_name}")
+                        stream_channels = min(2, output_channels)
                     except Exception as e:
                         print(f"❌ Erro ao abrir loopback para dispositivo de saída: {e}")
                         print("💡 Tentando método alternativo...")
@@ -717,14 +908,19 @@ class AudioTranscriberApp:
                             def output_callback(indata, frames, time, status):
                                 if status:
                                     print(f"Output status: {status}")
+                                    increment('callback_overruns', source='system')
                                 if self.recording:
-                                    self.audio_frames_system.append(indata.copy())
+                                    self.note_first_block('system')
+                                    self.system_buffer.write(indata)
+                                    self.feed_live_audio('system', indata, indata.shape[1])
                             
                             # Usar sounddevice para loopback
+                            self.system_buffer = AudioRingBuffer(self.rate, channels=min(2, output_channels))
                             with sd.InputStream(
                                 device=system_index,
                                 channels=min(2, output_channels),
                                 samplerate=self.rate,
+                                dtype='int16',
                                 callback=output_callback,
                                 blocksize=int(self.rate * 0.1)
                             ):
@@ -746,17 +942,21 @@ class AudioTranscriberApp:
                         frames_per_buffer=self.chunk
                     )
                     print(f"✅ Stream de entrada aberto para: {device_name}")
+                    stream_channels = min(2, input_channels)
                 else:
                     print("❌ Dispositivo não tem canais de entrada nem saída válidos")
                     self.record_mic_only()
                     return
                 
                 print(f"🎤 Gravando áudio do sistema usando: {device_name}")
+                self.system_buffer = AudioRingBuffer(self.rate, channels=stream_channels)
                 while self.recording:
                     try:
                         data = stream.read(self.chunk, exception_on_overflow=False)
                         audio_data = np.frombuffer(data, dtype=np.int16)
-                        self.audio_frames_system.append(audio_data)
+                        self.note_first_block('system')
+                        self.system_buffer.write(audio_data)
+                        self.feed_live_audio('system', audio_data, stream_channels)
                     except Exception as e:
                         print(f"❌ Erro ao ler áudio do sistema: {e}")
                         break
@@ -785,48 +985,177 @@ class AudioTranscriberApp:
         while self.recording:
             time.sleep(0.1)
             
+    def note_first_block(self, source):
+        """Mede o tempo entre o clique em gravar e o primeiro bloco de cada fonte"""
+        if source in self.capture_started:
+            return
+        self.capture_started.add(source)
+        observe('capture_start', time.perf_counter() - self.capture_requested_at, source=source)
+    
+    def update_memory_usage(self):
+        """Mostra o preenchimento dos buffers de áudio; repete enquanto grava"""
+        buffers = [b for b in (self.mic_buffer, self.system_buffer) if b is not None]
+        if buffers:
+            used_mb = sum(b.nbytes for b in buffers) / (1024 * 1024)
+            allocated_mb = sum(b.capacity_bytes for b in buffers) / (1024 * 1024)
+            duration = max(b.duration for b in buffers)
+            self.memory_label.config(
+                text=f"Memória de áudio: {used_mb:.1f} MB usados de {allocated_mb:.1f} MB alocados "
+                     f"({used_mb / allocated_mb:.0%}) - {duration:.0f}s gravados"
+            )
+        if self.recording:
+            self.root.after(1000, self.update_memory_usage)
+    
+    def feed_live_audio(self, source, samples, channels):
+        """Enfileira um bloco capturado para a etapa 'vad' (modo ao vivo); chamado pelos callbacks"""
+        if not self.live_mode:
+            return
+        # Cópia em int16 mono: o stream reaproveita o buffer do bloco
+        block = np.array(to_mono_int16(samples, channels))
+        self.pipeline.submit('vad', [(source, block, time.monotonic())])
+    
+    def segment_live_blocks(self, blocks):
+        """Etapa 'vad': blocos [(fonte, amostras, instante de captura)] em ordem; ver ``segment_live_block``"""
+        for source, block, captured_at in blocks:
+            self.segment_live_block(source, block, captured_at)
+    
+    def segment_live_block(self, source, block, captured_at):
+        """Passa o bloco pelo segmentador da fonte, que envia as falas para a etapa 'asr'"""
+        segmenter = self.live_segmenters.get(source)
+        if segmenter is None:
+            vad = self.get_vad(self.recording_devices.get(source) or source)
+            label = CHANNEL_LABELS.get(source) if self.separate_channels else None
+            # Início da fonte pelo instante de captura do primeiro bloco
+            self.live_positions[source] = 0
+            self.live_origins[source] = max(0.0, captured_at - self.recording_started_at - len(block) / float(self.rate))
+            
+            def on_utterance(audio):
+                # Cortar o silêncio que sobrou em volta da fala antes de enfileirar
+                speech, _ = vad.trim(audio)
+                if len(speech):
+                    started = self.live_origins[source] + (self.live_positions[source] - len(audio)) / float(self.rate)
+                    self.pipeline.submit('asr', (speech, vad.energy_threshold, label, max(0.0, started)))
+            
+            segmenter = UtteranceSegmenter(self.rate, on_utterance, vad=vad)
+            self.live_segmenters[source] = segmenter
+        # Blocos juntados na fila são reanalisados no tamanho original, então
+        # o atraso não muda onde as falas são cortadas
+        step = int(self.rate * LIVE_BLOCK_SECONDS)
+        for start in range(0, len(block), step):
+            piece = block[start:start + step]
+            self.live_positions[source] += len(piece)
+            segmenter.feed(piece)
+    
+    def merge_live_utterances(self, older, newer):
+        """Junta duas falas seguidas do mesmo canal quando a transcrição ao vivo atrasa"""
+        old_audio, threshold, label, started = older
+        new_audio = newer[0]
+        if newer[2] != label or len(old_audio) + len(new_audio) > MAX_LIVE_UTTERANCE_SECONDS * self.rate:
+            return None
+        pause = np.zeros(int(0.3 * self.rate), dtype=np.int16)
+        return np.concatenate([old_audio, pause, new_audio]), threshold, label, started
+    
+    def show_live_text(self, text):
+        """Saída da etapa 'asr': acrescenta a frase na interface, na ordem em que foi dita"""
+        if text:
+            self.root.after(0, lambda: self.append_transcription(text))
+    
+    def get_vad(self, device_key):
+        """Retorna o detector de voz do dispositivo, criando-o na primeira vez"""
+        vad = self.vad_detectors.get(device_key)
+        if vad is None:
+            vad = VoiceActivityDetector(self.rate)
+            self.vad_detectors[device_key] = vad
+        return vad
+    
+    def get_recording_vad(self):
+        """Detector de voz da combinação de dispositivos da gravação atual"""
+        key = " + ".join(name for name in (self.recording_devices.get('mic'),
+                                           self.recording_devices.get('system')) if name)
+        return self.get_vad(key or "padrão")
+    
+    def transcribe_live_utterance(self, utterance):
+        """Transcreve uma fala do modo ao vivo, ignorando trechos incompreensíveis"""
+        audio_data, energy_threshold, label, started = utterance
+        try:
+            text = self.assistant.transcribe_audio_array(audio_data, energy_threshold=energy_threshold)
+        except NoSpeechError:
+            return ""
+        except BackendError as e:
+            print(f"  ❌ Erro no serviço de reconhecimento: {e}")
+            return ""
+        if label and text:
+            return f"\n[{format_timestamp(started)}] {label}: {text}"
+        return text
+    
+    def finish_live_transcription(self, capture_finished=None):
+        """Entrega as falas pendentes e aguarda as etapas de VAD e transcrição esvaziarem"""
+        if capture_finished is not None:
+            with span('buffer_finalize'):
+                capture_finished.wait()
+        self.pipeline.stages['vad'].join()
+        # VAD parado: os segmentadores podem ser esvaziados desta thread
+        for segmenter in list(self.live_segmenters.values()):
+            segmenter.flush()
+        self.pipeline.stages['asr'].join()
+        self.live_segmenters = {}
+        self.root.after(0, self.show_asr_latency)
+            
     def stop_recording(self):
         """Para a gravação e processa o áudio"""
         self.recording = False
         self.record_button.config(text="🎤 Começar a Gravar")
-        self.status_label.config(text="Processando áudio...")
         
-        # Processar áudio em thread separada
-        threading.Thread(target=self.process_audio, daemon=True).start()
-        
-    def process_audio(self):
-        """Salva o áudio e faz a transcrição com otimizações"""
+        if self.live_mode:
+            # O áudio já foi transcrito frase a frase; só falta o final
+            self.live_mode = False
+            self.status_label.config(text="Finalizando transcrição ao vivo...")
+            job = self.finish_live_transcription
+        else:
+            self.status_label.config(text="Processando áudio...")
+            job = self.process_audio
+        finished = self.capture_finished
+        
+        # Processar áudio em background (etapa 'transcricao')
+        if self.pipeline.submit('transcricao', lambda: job(finished)) == DROPPED:
+            self.status_label.config(text="Muitas gravações aguardando transcrição - esta foi descartada")
+        
+    def process_audio(self, capture_finished=None):
+        """Prepara o áudio gravado e faz a transcrição com otimizações"""
+        # Os streams fecham ao fim do loop de captura; só então os buffers estão completos
+        if capture_finished is not None:
+            with span('buffer_finalize'):
+                capture_finished.wait()
         try:
             # Verificar se há áudio válido antes de processar
             use_mic = self.use_mic_var.get()
             
             print(f"🔍 Verificando áudio - Use mic: {use_mic}")
-            print(f"  Frames mic: {len(self.audio_frames_mic) if self.audio_frames_mic else 0}")
-            print(f"  Frames system: {len(self.audio_frames_system) if self.audio_frames_system else 0}")
+            mic_buffer = self.mic_buffer
+            system_buffer = self.system_buffer
+            print(f"  Áudio mic: {mic_buffer.duration if mic_buffer else 0:.1f}s")
+            print(f"  Áudio system: {system_buffer.duration if system_buffer else 0:.1f}s")
             
-            if use_mic and (not self.audio_frames_mic or len(self.audio_frames_mic) < 5):
+            if use_mic and (mic_buffer is None or mic_buffer.duration < 0.5):
                 self.root.after(0, lambda: self.update_transcription("Gravação muito curta ou sem áudio do microfone"))
                 self.root.after(0, lambda: self.status_label.config(text="Pronto para gravar"))
                 return
                 
-            if not use_mic and (not self.audio_frames_system or len(self.audio_frames_system) < 5):
+            if not use_mic and (system_buffer is None or len(system_buffer) < 5 * self.chunk):
                 self.root.after(0, lambda: self.update_transcription("Gravação muito curta ou sem áudio do sistema"))
                 self.root.after(0, lambda: self.status_label.config(text="Pronto para gravar"))
                 return
 
-            # Salvar arquivo de áudio temporário
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            audio_filename = f"temp_audio_{timestamp}.wav"
-            
             # Preparar áudio baseado no que foi gravado
             print("🎵 Preparando áudio para processamento...")
             
-            if use_mic and self.audio_frames_mic:
+            # Views dos buffers: nenhuma cópia do áudio gravado
+            if use_mic and mic_buffer is not None and len(mic_buffer):
                 print("  Usando áudio do microfone")
-                combined_audio_data = np.concatenate(self.audio_frames_mic, axis=0)
-            elif self.audio_frames_system:
+                combined_audio_data = mic_buffer.view()
+            elif system_buffer is not None and len(system_buffer):
                 print("  Usando áudio do sistema")
-                combined_audio_data = np.concatenate(self.audio_frames_system, axis=0)
+                combined_audio_data = system_buffer.view()
             else:
                 print("  ❌ Nenhum áudio disponível")
                 self.root.after(0, lambda: self.update_transcription("Nenhum áudio gravado"))
@@ -835,40 +1164,20 @@ class AudioTranscriberApp:
                 
             print(f"  Áudio preparado - Shape: {combined_audio_data.shape}")
             
-            # Se temos áudio do sistema E microfone, misturar
-            if use_mic and self.audio_frames_system:
+            # Canais separados: cada fonte é transcrita por si, sem mixagem
+            if self.separate_channels and use_mic and system_buffer is not None and len(system_buffer):
+                self.process_separate_channels([('mic', mic_buffer), ('system', system_buffer)])
+                return
+            
+            # Se temos áudio do sistema E microfone, misturar alinhando pelos instantes de captura
+            if use_mic and system_buffer is not None and len(system_buffer):
                 try:
-                    system_audio_data = np.concatenate(self.audio_frames_system, axis=0)
-                    # Ajustar tamanhos se necessário
-                    min_len = min(len(combined_audio_data), len(system_audio_data))
-                    combined_audio_data = combined_audio_data[:min_len]
-                    system_audio_data = system_audio_data[:min_len]
-                    
-                    # Verificar dimensões dos arrays antes de misturar
-                    print(f"Mic shape: {combined_audio_data.shape}")
-                    print(f"System shape: {system_audio_data.shape}")
-                    
-                    # Misturar os áudios (50% cada)
-                    if len(system_audio_data.shape) > 1 and system_audio_data.shape[1] == 2:
-                        # Sistema stereo
-                        if len(combined_audio_data.shape) == 1:
-                            # Mic mono - converter para stereo
-                            mic_stereo = np.column_stack((combined_audio_data, combined_audio_data))
-                            combined_audio_data = (mic_stereo * 0.5 + system_audio_data * 0.5)
-                        elif combined_audio_data.shape[1] == 1:
-                            # Mic mono - converter para stereo
-                            mic_stereo = np.column_stack((combined_audio_data.flatten(), combined_audio_data.flatten()))
-                            combined_audio_data = (mic_stereo * 0.5 + system_audio_data * 0.5)
-                        else:
-                            # Ambos stereo
-                            combined_audio_data = (combined_audio_data * 0.5 + system_audio_data * 0.5)
-                    else:
-                        # Ambos mono ou sistema mono
-                        if len(combined_audio_data.shape) > 1:
-                            combined_audio_data = combined_audio_data.flatten()
-                        if len(system_audio_data.shape) > 1:
-                            system_audio_data = system_audio_data.flatten()
-                        combined_audio_data = (combined_audio_data * 0.5 + system_audio_data * 0.5)
+                    with span('mixing'):
+                        combined_audio_data = self.mixer.mix([mic_buffer, system_buffer])
+                    for name, report in zip(("Mic", "System"), self.mixer.last_report):
+                        print(f"{name}: início +{report['offset_seconds']:.3f}s, "
+                              f"{report['duration_seconds']:.1f}s, deriva {report['drift_ppm']:.0f} ppm")
+                    print(f"Mix: {len(combined_audio_data) / self.rate:.1f}s")
                         
                 except Exception as e:
                     print(f"Erro ao misturar áudios: {e}")
@@ -876,79 +1185,122 @@ class AudioTranscriberApp:
                     import traceback
                     traceback.print_exc()
             
-            # Salvar usando soundfile
-            print(f"💾 Salvando arquivo: {audio_filename}")
-            try:
-                sf.write(audio_filename, combined_audio_data, self.rate)
-                print(f"  ✅ Arquivo salvo com sucesso")
-            except Exception as e:
-                print(f"  ❌ Erro ao salvar arquivo: {e}")
-                self.root.after(0, lambda: self.update_transcription(f"Erro ao salvar áudio: {str(e)}"))
+            # Remover silêncio antes de enviar para o reconhecimento
+            vad = self.get_recording_vad()
+            if not vad.calibrated:
+                vad.calibrate(combined_audio_data)
+            speech_audio, speech_ratio = vad.trim(combined_audio_data)
+            print(f"🗣️ VAD: {speech_ratio:.0%} de fala - limiar {vad.energy_threshold:.0f} - "
+                  f"{len(speech_audio) / self.rate:.1f}s de áudio útil")
+            self.root.after(0, lambda: self.status_label.config(
+                text=f"Transcrevendo... ({speech_ratio:.0%} de fala)"))
+            
+            if len(speech_audio) == 0:
+                self.root.after(0, lambda: self.update_transcription("Nenhuma fala detectada no áudio"))
                 self.root.after(0, lambda: self.status_label.config(text="Pronto para gravar"))
                 return
             
             # Transcrever áudio com otimizações
             print("🎤 Iniciando transcrição...")
-            
-            if os.path.exists(audio_filename) and os.path.getsize(audio_filename) > 44:  # Mais que header WAV
-                print(f"  Arquivo existe - Tamanho: {os.path.getsize(audio_filename)} bytes")
-                
-                try:
-                    recognizer = sr.Recognizer()
-                    # Otimização 2: Configurações mais rápidas para transcrição
-                    recognizer.energy_threshold = 300  # Reduzir sensibilidade
-                    recognizer.dynamic_energy_threshold = False  # Desabilitar ajuste dinâmico
-                    
-                    print("  Carregando arquivo de áudio...")
-                    with sr.AudioFile(audio_filename) as source:
-                        audio_data = recognizer.record(source)
-                    
-                    print("  Enviando para transcrição...")
-                    # Otimização 3: Usar configurações mais rápidas
-                    transcription = recognizer.recognize_google(
-                        audio_data, 
-                        language='pt-BR',
-                        show_all=False  # Não retornar alternativas
-                    )
-                    
+            try:
+                transcription = self.assistant.transcribe_segments(speech_audio, vad, on_progress=self.show_transcription_progress)
+                if transcription is None:
+                    self.root.after(0, lambda: self.update_transcription("Nenhum áudio gravado"))
+                else:
                     print(f"  ✅ Transcrição concluída: {transcription[:50]}...")
                     # Atualizar interface na thread principal
                     self.root.after(0, lambda: self.update_transcription(transcription))
                     
-                except sr.UnknownValueError:
-                    print("  ❌ Não foi possível entender o áudio")
-                    self.root.after(0, lambda: self.update_transcription("Não foi possível entender o áudio"))
-                except sr.RequestError as e:
-                    print(f"  ❌ Erro no serviço de reconhecimento: {e}")
-                    self.root.after(0, lambda: self.update_transcription(f"Erro no serviço de reconhecimento: {e}"))
-                except Exception as e:
-                    print(f"  ❌ Erro inesperado na transcrição: {e}")
-                    self.root.after(0, lambda: self.update_transcription(f"Erro na transcrição: {str(e)}"))
-            else:
-                print(f"  ❌ Arquivo não existe ou muito pequeno")
-                self.root.after(0, lambda: self.update_transcription("Nenhum áudio gravado"))
-            
-            # Remover arquivo temporário
-            print("🧹 Limpando arquivo temporário...")
-            if os.path.exists(audio_filename):
-                try:
-                    os.remove(audio_filename)
-                    print("  ✅ Arquivo removido")
-                except Exception as e:
-                    print(f"  ⚠️ Erro ao remover arquivo: {e}")
-            else:
-                print("  ⚠️ Arquivo não encontrado para remoção")
+            except NoSpeechError:
+                print("  ❌ Não foi possível entender o áudio")
+                self.root.after(0, lambda: self.update_transcription("Não foi possível entender o áudio"))
+            except BackendError as e:
+                print(f"  ❌ Erro no serviço de reconhecimento: {e}")
+                # O nome 'e' deixa de existir ao sair do except: a mensagem é montada antes do callback
+                error_msg = f"Erro no serviço de reconhecimento: {e}"
+                self.root.after(0, lambda: self.update_transcription(error_msg))
+            except Exception as e:
+                print(f"  ❌ Erro inesperado na transcrição: {e}")
+                error_msg = f"Erro na transcrição: {str(e)}"
+                self.root.after(0, lambda: self.update_transcription(error_msg))
                 
         except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("Erro", f"Erro ao processar áudio: {str(e)}"))
+            error_msg = f"Erro ao processar áudio: {str(e)}"
+            self.root.after(0, lambda: messagebox.showerror("Erro", error_msg))
         
-        self.root.after(0, lambda: self.status_label.config(text="Pronto para gravar"))
+        self.root.after(0, self.show_asr_latency)
         
+    def show_transcription_progress(self, done, total):
+        """Mostra quantos trechos já foram transcritos (chamado das threads de transcrição)"""
+        if total > 1:
+            self.root.after(0, lambda: self.status_label.config(text=f"Transcrevendo... {done}/{total} trechos"))
+    
+    def process_separate_channels(self, sources):
+        """Transcreve microfone e sistema separadamente e mostra a transcrição rotulada"""
+        try:
+            transcription = self.assistant.transcribe_channels(self.recording_channels(sources),
+                                                              on_progress=self.show_transcription_progress)
+            print(f"  ✅ Transcrição por canais concluída: {transcription[:50]}...")
+            self.root.after(0, lambda: self.update_transcription(transcription))
+        except NoSpeechError:
+            print("  ❌ Nenhuma fala reconhecida em nenhum dos canais")
+            self.root.after(0, lambda: self.update_transcription("Nenhuma fala detectada no áudio"))
+        except BackendError as e:
+            print(f"  ❌ Erro no serviço de reconhecimento: {e}")
+            error_msg = f"Erro no serviço de reconhecimento: {e}"
+            self.root.after(0, lambda: self.update_transcription(error_msg))
+        except Exception as e:
+            print(f"  ❌ Erro inesperado na transcrição: {e}")
+            error_msg = f"Erro na transcrição: {str(e)}"
+            self.root.after(0, lambda: self.update_transcription(error_msg))
+        self.root.after(0, self.show_asr_latency)
+    
+    def recording_channels(self, sources):
+        """[(rótulo, áudio, início, vad)] de cada fonte [(nome, buffer)] da gravação.
+        
+        Os inícios são relativos à fonte que começou primeiro (instantes de
+        captura, como na mixagem); cada fonte usa o VAD do seu dispositivo.
+        """
+        offsets = self.mixer.start_offsets([buffer for _, buffer in sources])
+        return [(CHANNEL_LABELS.get(source, source), buffer.view(), offset,
+                 self.get_vad(self.recording_devices.get(source) or source))
+                for (source, buffer), offset in zip(sources, offsets)]
+    
+    def show_asr_latency(self):
+        """Volta ao estado pronto mostrando a latência do reconhecedor usado"""
+        latency = self.assistant.asr_backend.format_latency()
+        print(f"⏱️ {latency}")
+        print(f"📊 {self.pipeline.format_metrics()}")
+        self.status_label.config(text=f"Pronto para gravar - {latency}")
+    
+    def select_asr_backend(self, event=None):
+        """Troca o reconhecedor pelo escolhido na lista"""
+        label = self.asr_combo.get()
+        name = next(name for name, backend in BACKENDS.items() if backend.label == label)
+        backend = self.assistant.get_asr_backend(name)
+        if backend.name != name:
+            _, reason = create_backend(name, **self.assistant.asr_backend_options(name)).available()
+            messagebox.showwarning("Reconhecedor indisponível", reason)
+            self.asr_combo.set(backend.label)
+        self.assistant.asr_backend = backend
+        print(f"🎙️ Reconhecedor: {backend.label}")
+    
     def update_transcription(self, text):
         """Atualiza o texto da transcrição"""
         self.transcription_text.delete(1.0, tk.END)
         self.transcription_text.insert(tk.END, text)
         
+    def append_transcription(self, text):
+        """Acrescenta uma frase à transcrição (modo ao vivo)"""
+        current = self.transcription_text.get(1.0, tk.END).strip()
+        if text.startswith("\n"):
+            # Fala rotulada (canais separados): uma linha por fala
+            text = text[1:] if not current else text
+        elif current:
+            self.transcription_text.insert(tk.END, " ")
+        self.transcription_text.insert(tk.END, text)
+        self.transcription_text.see(tk.END)
+        
     def process_with_claude(self):
         """Envia a transcrição e documento para Claude com cache e otimizações"""
         transcription = self.transcription_text.get(1.0, tk.END).strip()
@@ -957,78 +1309,116 @@ class AudioTranscriberApp:
             messagebox.showwarning("Aviso", "Nenhuma transcrição disponível!")
             return
             
-        if not self.document_loaded or not self.document_content:
+        if not self.corpus.loaded:
             messagebox.showwarning("Aviso", "Nenhum documento carregado e convertido!")
             return
         
-        # Otimização: Verificar cache
-        cache_key = f"{hash(self.document_content[:1000])}_{hash(transcription)}"
-        if cache_key in self.response_cache:
+        # Uma nova pergunta cancela a resposta que ainda está chegando
+        self.claude_generation += 1
+        generation = self.claude_generation
+        with self.response_delta_lock:
+            self.pending_response_deltas = []
+        
+        # Otimização: Verificar cache (mesma pergunta ou pergunta quase igual)
+        top_k = self.get_top_k()
+        lookup = self.assistant.lookup_answer(transcription, top_k)
+        if lookup['source'] == 'cache':
             self.response_text.delete(1.0, tk.END)
-            self.response_text.insert(tk.END, self.response_cache[cache_key])
+            self.response_text.insert(tk.END, lookup['response'])
+            self.claude_status_label.config(text=f"Resposta do cache local - {self.assistant.format_cache_stats()}")
             return
+        if lookup['source'] == 'similar':
+            self.response_text.delete(1.0, tk.END)
+            self.response_text.insert(tk.END, lookup['response'])
+            self.claude_status_label.config(
+                text=f"Resposta reaproveitada de pergunta semelhante ({lookup['similarity']:.0%}): "
+                     f"\"{lookup['original_question'][:60]}\""
+            )
+            return
+        cache_key = lookup['cache_key']
+        cache_scope = lookup['cache_scope']
         
-        # Limpar threads antigas
-        self.cleanup_threads()
-        
-        # Processar com Claude em thread separada
-        thread = threading.Thread(target=self.send_to_claude, args=(transcription, cache_key), daemon=True)
-        self.thread_pool.append(thread)
-        thread.start()
+        # Processar com Claude em background (etapa 'claude')
+        self.pipeline.submit('claude', (transcription, cache_key, top_k, generation, cache_scope))
         
         # Mostrar status
         self.response_text.delete(1.0, tk.END)
         self.response_text.insert(tk.END, "Processando com Claude...")
         
-    def send_to_claude(self, transcription, cache_key=None):
-        """Envia dados para Claude API com prompt estruturado e otimizações"""
+    def get_top_k(self):
+        """Valor do campo 'Trechos por pergunta' (padrão do config se inválido)"""
         try:
-            # Construir prompt conforme especificado
-            prompt = f"""{self.document_content}
-
-INSTRUÇÕES PARA RESPOSTA:
-- Use o documento como base principal
-- Adicione informações complementares úteis quando relevante
-- Mantenha a resposta concisa (máximo 1000 tokens)
-- Priorize clareza e objetividade mas linguagem acessivel
-
-PERGUNTA: {transcription}
-
-RESPOSTA:"""
-            
-            # Otimização: Usar modelo mais rápido e configurações otimizadas
-            message = self.client.messages.create(
-                model="claude-3-haiku-20240307",  # Modelo mais rápido que sonnet
-                max_tokens=1500,  # Reduzir tokens para resposta mais rápida
-                temperature=0.3,  # Menos criatividade = mais velocidade
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }]
+            return max(1, int(self.top_k_var.get()))
+        except (tk.TclError, ValueError):
+            return RETRIEVAL_TOP_K
+    
+    def send_to_claude(self, transcription, cache_key=None, top_k=RETRIEVAL_TOP_K, generation=None,
+                       cache_scope=None):
+        """Envia dados para Claude API e mostra a resposta conforme ela é gerada"""
+        if generation is not None and generation != self.claude_generation:
+            return  # Substituída por uma pergunta mais nova enquanto esperava na fila
+        try:
+            result = self.assistant.ask_claude(
+                transcription, top_k, cache_key=cache_key, cache_scope=cache_scope,
+                on_text=lambda text: self.queue_response_delta(generation, text),
+                cancelled=lambda: generation is not None and generation != self.claude_generation
             )
-            
-            response = message.content[0].text
-            
-            # Otimização: Salvar no cache se cache_key for fornecido
-            if cache_key:
-                self.response_cache[cache_key] = response
-                # Limitar tamanho do cache para evitar vazamento de memória
-                if len(self.response_cache) > 50:
-                    # Remover entrada mais antiga
-                    oldest_key = next(iter(self.response_cache))
-                    del self.response_cache[oldest_key]
+            if result is None:
+                print("⏹️ Resposta cancelada: uma nova pergunta foi enviada")
+                return
             
             # Atualizar interface na thread principal
-            self.root.after(0, lambda: self.update_response(response))
+            plan = result['plan']
+            usage_text = (f"{format_usage(result['usage'])} (estimado ~{plan['tokens']:,}, {plan['mode']}) - "
+                          f"{self.assistant.format_cache_stats()}")
+            response = result['response']
+            self.root.after(0, lambda: self.finish_response(generation, response, usage_text))
             
+        except TokenBudgetError as e:
+            # Recusado antes de chamar a API: nenhuma ida e volta desperdiçada
+            message = f"Pergunta não enviada: {e}"
+            self.root.after(0, lambda: self.finish_response(generation, message, "Orçamento de tokens excedido"))
         except Exception as e:
+            if generation is not None and generation != self.claude_generation:
+                return
             error_msg = f"Erro ao processar com Claude: {str(e)}"
             self.root.after(0, lambda: self.update_response(error_msg))
-            
-    def cleanup_threads(self):
-        """Limpa threads antigas para evitar vazamento de memória"""
-        self.thread_pool = [t for t in self.thread_pool if t.is_alive()]
     
+    def queue_response_delta(self, generation, text):
+        """Acumula um pedaço da resposta; a interface é atualizada em lotes"""
+        with self.response_delta_lock:
+            self.pending_response_deltas.append((generation, text))
+            if self.response_flush_scheduled:
+                return
+            self.response_flush_scheduled = True
+        self.root.after(RESPONSE_FLUSH_MS, self.flush_response_deltas)
+    
+    def flush_response_deltas(self):
+        """Insere no painel de resposta os pedaços acumulados desde o último lote"""
+        generation = self.claude_generation
+        with self.response_delta_lock:
+            # Pedaços de respostas canceladas são descartados aqui
+            text = "".join(delta for gen, delta in self.pending_response_deltas if gen == generation)
+            self.pending_response_deltas = []
+            self.response_flush_scheduled = False
+        if not text:
+            return
+        if self.response_stream_generation != generation:
+            # Primeiro lote desta resposta: trocar "Processando..." pelo texto
+            self.response_stream_generation = generation
+            self.response_text.delete(1.0, tk.END)
+        self.response_text.insert(tk.END, text)
+        self.response_text.see(tk.END)
+    
+    def finish_response(self, generation, response, usage_text):
+        """Fecha a resposta em streaming com o texto final completo"""
+        if generation != self.claude_generation:
+            return
+        with self.response_delta_lock:
+            self.pending_response_deltas = []
+        self.update_response(response)
+        self.claude_status_label.config(text=usage_text)
+            
     def update_response(self, text):
         """Atualiza o texto da resposta"""
         self.response_text.delete(1.0, tk.END)
@@ -1073,7 +1463,6 @@ def main():
         print(f"Dependências faltando: {', '.join(missing_deps)}")
         print("\nInstale as dependências necessárias:")
         print("pip install pyaudio speechrecognition anthropic sounddevice numpy soundfile")
-        print("pip install python-docx  # (opcional para documentos Word)")
         print("\nPara melhor extração de PDF (escolha uma):")
         print("pip install PyPDF2")
         print("pip install pdfplumber") 
@@ -11,9 +11,6 @@ echo.
 echo Instalando dependencias opcionais para PDF...
 pip install PyMuPDF
 
-echo.
-echo Instalando dependencias para documentos Word...
-pip install python-docx
 
 echo.
 echo ========================================
@@ -0,0 +1,199 @@
+"""Tempos e contadores do aplicativo, exportados em JSON e no formato texto do Prometheus.
+
+Um registro por processo (``REGISTRY``), seguro para várias threads. As
+etapas medem intervalos com ``span`` ou ``observe`` e contam eventos com
+``increment``; a interface, o servidor e o modo em lote leem o mesmo registro.
+
+    with span('prompt_build'):
+        request = ...
+    increment('cache_hits', kind='exact')
+"""
+import collections
+import contextlib
+import json
+import threading
+import time
+
+# Nome de exibição de cada intervalo medido (painel de latência)
+SPAN_LABELS = {
+    'device_scan': "Busca de dispositivos",
+    'capture_start': "Início da captura",
+    'buffer_finalize': "Fechamento dos buffers",
+    'mixing': "Mixagem",
+    'encoding': "Preparo do áudio",
+    'asr_request': "Reconhecimento (pedido)",
+    'prompt_build': "Montagem do prompt",
+    'llm_first_token': "Claude: primeiro token",
+    'llm_total': "Claude: resposta completa",
+}
+
+COUNTER_LABELS = {
+    'cache_hits': "Acertos de cache",
+    'cache_misses': "Faltas de cache",
+    'callback_overruns': "Estouros no callback",
+    'dropped_frames': "Quadros descartados",
+}
+
+PROMETHEUS_PREFIX = "transcritor"
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _series_key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{key}="{_escape(value)}"' for key, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Timer:
+    """Estatísticas de um intervalo: total, máximo, último e uma janela recente para os quantis"""
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.recent = collections.deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+        self.recent.append(seconds)
+
+    def quantile(self, q):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Registry:
+    """Intervalos e contadores com rótulos opcionais (ex.: backend='google')"""
+
+    def __init__(self, window=512):
+        self.window = window
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._counters = {}
+
+    @contextlib.contextmanager
+    def span(self, name, **labels):
+        """Mede o bloco ``with`` (também quando ele termina com exceção)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def observe(self, name, seconds, **labels):
+        key = _series_key(name, labels)
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is None:
+                timer = self._timers[key] = _Timer(self.window)
+            timer.add(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        key = _series_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def counter(self, name, **labels):
+        """Valor de um contador; sem rótulos, a soma de todas as séries com esse nome"""
+        with self._lock:
+            if labels:
+                return self._counters.get(_series_key(name, labels), 0)
+            return sum(value for (series, _), value in self._counters.items() if series == name)
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        """{'spans': [...], 'counters': [...]} com tempos em segundos"""
+        with self._lock:
+            spans = [{
+                'name': name,
+                'labels': dict(labels),
+                'count': timer.count,
+                'total_seconds': timer.total,
+                'mean_seconds': timer.total / timer.count,
+                'last_seconds': timer.last,
+                'max_seconds': timer.max,
+                'quantiles': {str(q): timer.quantile(q) for q in QUANTILES},
+            } for (name, labels), timer in sorted(self._timers.items())]
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+        return {'created': time.time(), 'spans': spans, 'counters': counters}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=indent)
+
+    def to_prometheus(self):
+        """Formato texto do Prometheus: intervalos como summary, contadores como counter"""
+        snapshot = self.snapshot()
+        lines = []
+        span_metric = f"{PROMETHEUS_PREFIX}_span_seconds"
+        if snapshot['spans']:
+            lines += [f"# HELP {span_metric} Duração das etapas medidas (janela recente para os quantis)",
+                      f"# TYPE {span_metric} summary"]
+        for entry in snapshot['spans']:
+            labels = [('span', entry['name'])] + sorted(entry['labels'].items())
+            for q, value in entry['quantiles'].items():
+                lines.append(f"{span_metric}{_format_labels(labels, [('quantile', q)])} {value:.6f}")
+            lines.append(f"{span_metric}_sum{_format_labels(labels)} {entry['total_seconds']:.6f}")
+            lines.append(f"{span_metric}_count{_format_labels(labels)} {entry['count']}")
+        declared = set()
+        for entry in snapshot['counters']:
+            metric = f"{PROMETHEUS_PREFIX}_{entry['name']}_total"
+            if metric not in declared:
+                declared.add(metric)
+                lines += [f"# HELP {metric} {COUNTER_LABELS.get(entry['name'], entry['name'])}",
+                          f"# TYPE {metric} counter"]
+            lines.append(f"{metric}{_format_labels(sorted(entry['labels'].items()))} {entry['value']}")
+        return "\n".join(lines) + "\n"
+
+    def format_latencies(self):
+        """Linhas para o painel: último, média e p95 de cada intervalo, depois os contadores"""
+        snapshot = self.snapshot()
+        merged = {}
+        for entry in snapshot['spans']:
+            # Séries com rótulos diferentes (ex.: backends) aparecem juntas no painel
+            timer = merged.setdefault(entry['name'], {'count': 0, 'total': 0.0, 'last': 0.0, 'p95': 0.0})
+            timer['count'] += entry['count']
+            timer['total'] += entry['total_seconds']
+            timer['last'] = entry['last_seconds']
+            timer['p95'] = max(timer['p95'], entry['quantiles']['0.95'])
+        lines = []
+        for name in list(SPAN_LABELS) + sorted(set(merged) - set(SPAN_LABELS)):
+            if name not in merged:
+                continue
+            timer = merged[name]
+            lines.append(f"{SPAN_LABELS.get(name, name)}: último {timer['last'] * 1000:.0f} ms · "
+                         f"média {timer['total'] / timer['count'] * 1000:.0f} ms · "
+                         f"p95 {timer['p95'] * 1000:.0f} ms ({timer['count']}x)")
+        counters = {}
+        for entry in snapshot['counters']:
+            counters[entry['name']] = counters.get(entry['name'], 0) + entry['value']
+        if counters:
+            lines.append(" · ".join(f"{COUNTER_LABELS.get(name, name)}: {value:,}"
+                                    for name, value in sorted(counters.items())))
+        return "\n".join(lines) if lines else "Nenhuma medição ainda"
+
+
+REGISTRY = Registry()
+span = REGISTRY.span
+observe = REGISTRY.observe
+increment = REGISTRY.increment
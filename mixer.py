@@ -0,0 +1,135 @@
+import numpy as np
+
+# Processar em blocos limita a memória extra a alguns centésimos da gravação
+MIX_BLOCK_FRAMES = 65536
+
+
+def estimate_clock(frame_indices, capture_times, nominal_rate, min_fit_seconds=5.0):
+    """Estima (instante do primeiro frame, taxa efetiva) de uma fonte.
+
+    Ajusta uma reta instante x frame pelos blocos capturados; a inclinação dá
+    a taxa real do dispositivo (que difere alguns ppm/‰ da nominal). Com
+    poucos blocos ou gravações curtas o ajuste é ruidoso e a taxa nominal é mantida.
+    """
+    if len(frame_indices) == 0:
+        return None, float(nominal_rate)
+    if len(frame_indices) < 3:
+        return float(capture_times[0] - frame_indices[0] / float(nominal_rate)), float(nominal_rate)
+
+    frames = frame_indices.astype(np.float64)
+    slope, intercept = np.polyfit(frames, capture_times, 1)
+    span_seconds = (frames[-1] - frames[0]) / float(nominal_rate)
+    effective_rate = float(nominal_rate)
+    if slope > 0 and span_seconds >= min_fit_seconds:
+        candidate = 1.0 / slope
+        # Ignorar estimativas absurdas (ex.: callbacks atrasados em rajada)
+        if abs(candidate / nominal_rate - 1.0) < 0.05:
+            effective_rate = candidate
+    return float(intercept), effective_rate
+
+
+class TimestampedMixer:
+    """Mistura fontes de áudio alinhando-as pelos instantes de captura.
+
+    Cada fonte é posicionada na linha do tempo pelo instante do seu primeiro
+    frame, reamostrada quando o relógio do dispositivo deriva da taxa nominal,
+    e somada em float32 num único buffer de saída. Trechos onde só uma fonte
+    tem áudio são mantidos (nada é truncado ao tamanho da menor).
+    """
+
+    def __init__(self, rate, drift_tolerance=0.0005):
+        self.rate = rate
+        self.drift_tolerance = drift_tolerance
+        self.last_report = []
+
+    def start_offsets(self, buffers):
+        """Início de cada fonte em segundos, relativo à que começou primeiro (sem misturar)"""
+        starts = []
+        for buffer in buffers:
+            frames, times = buffer.timeline()
+            start_time, _ = estimate_clock(frames, times, self.rate)
+            starts.append(start_time)
+        known = [start for start in starts if start is not None]
+        origin = min(known) if known else 0.0
+        return [max(0.0, start - origin) if start is not None else 0.0 for start in starts]
+
+    def mix(self, buffers, gains=None):
+        """Mistura ``AudioRingBuffer`` (ou objetos com view()/timeline()) em int16 mono"""
+        sources = [b for b in buffers if b is not None and len(b)]
+        if not sources:
+            return np.zeros(0, dtype=np.int16)
+        gains = gains or [1.0] * len(sources)
+
+        placements = []
+        for buffer, gain in zip(sources, gains):
+            frames, times = buffer.timeline()
+            start_time, effective_rate = estimate_clock(frames, times, self.rate)
+            ratio = effective_rate / self.rate
+            if abs(ratio - 1.0) <= self.drift_tolerance:
+                ratio = 1.0
+            out_frames = int(round(len(buffer) / ratio))
+            placements.append([buffer, gain, start_time, ratio, out_frames])
+
+        known = [p[2] for p in placements if p[2] is not None]
+        origin = min(known) if known else 0.0
+        total = 0
+        for placement in placements:
+            start_time = placement[2]
+            offset = int(round((start_time - origin) * self.rate)) if start_time is not None else 0
+            placement[2] = max(0, offset)
+            total = max(total, placement[2] + placement[4])
+
+        out = np.zeros(total, dtype=np.float32)
+        scratch = np.zeros(min(total, MIX_BLOCK_FRAMES), dtype=np.float32)
+        self.last_report = []
+        for buffer, gain, offset, ratio, out_frames in placements:
+            self._accumulate(out, buffer.view(), offset, out_frames, ratio, gain, scratch)
+            self.last_report.append({
+                'offset_seconds': offset / float(self.rate),
+                'duration_seconds': out_frames / float(self.rate),
+                'drift_ppm': (ratio - 1.0) * 1e6,
+            })
+
+        self._normalize_overlaps(out, [(p[2], p[2] + p[4]) for p in placements])
+        np.clip(out, -32768, 32767, out=out)
+        return out.astype(np.int16)
+
+    def _accumulate(self, out, data, offset, out_frames, ratio, gain, scratch):
+        """Soma uma fonte (int16, frames x canais) em ``out`` a partir de ``offset``"""
+        channels = data.shape[1] if data.ndim > 1 else 1
+        scale = np.float32(gain / channels)
+        for j0 in range(0, out_frames, MIX_BLOCK_FRAMES):
+            j1 = min(out_frames, j0 + MIX_BLOCK_FRAMES)
+            acc = scratch[:j1 - j0]
+            acc.fill(0)
+            if ratio == 1.0:
+                block = data[j0:j1]
+                for c in range(channels):
+                    column = block[:, c] if block.ndim > 1 else block
+                    np.add(acc, column, out=acc, casting='unsafe')
+            else:
+                # Reamostragem linear: frame j da saída vem da posição j * ratio da fonte
+                positions = np.arange(j0, j1, dtype=np.float64) * ratio
+                left = np.minimum(positions.astype(np.int64), len(data) - 1)
+                right = np.minimum(left + 1, len(data) - 1)
+                frac = (positions - left).astype(np.float32)
+                for c in range(channels):
+                    column = data[:, c] if data.ndim > 1 else data
+                    a = column[left].astype(np.float32)
+                    b = column[right].astype(np.float32)
+                    b -= a
+                    b *= frac
+                    a += b
+                    acc += a
+            acc *= scale
+            dest = out[offset + j0:offset + j1]
+            dest += acc
+
+    @staticmethod
+    def _normalize_overlaps(out, spans):
+        """Divide cada trecho pelo número de fontes ativas nele (média onde sobrepõe)"""
+        bounds = sorted({b for span in spans for b in span})
+        for start, end in zip(bounds, bounds[1:]):
+            active = sum(1 for s, e in spans if s <= start and end <= e)
+            if active > 1:
+                out[start:end] *= np.float32(1.0 / active)
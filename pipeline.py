@@ -0,0 +1,323 @@
+import collections
+import threading
+import time
+
+# O que fazer quando a fila de uma etapa está cheia
+BLOCK = "block"                # quem envia espera (pressão para trás até a origem)
+DROP_OLDEST = "drop_oldest"    # descarta o item mais antigo da fila (ex.: pergunta substituída por outra)
+DROP_NEWEST = "drop_newest"    # descarta o item novo
+MERGE = "merge"                # junta o item novo ao último da fila (ex.: blocos de áudio viram um bloco maior)
+POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, MERGE)
+
+# Resultado de Stage.submit
+QUEUED = "queued"
+MERGED = "merged"
+DROPPED = "dropped"
+
+
+class Stage:
+    """Uma etapa do pipeline: fila limitada atendida por ``workers`` threads.
+
+    ``fn(item)`` processa cada item; o retorno (se não for None) vai para
+    ``output``, que pode ser outra Stage ou uma função. Com ``ordered`` os
+    resultados saem na ordem de chegada mesmo com vários workers. Quando a
+    fila enche, ``policy`` decide entre esperar, descartar ou juntar
+    (``merge(último_da_fila, novo)``; se retornar None, o mais antigo é
+    descartado) e ``on_drop(item)`` é chamado para cada item descartado. Profundidade da fila, tempo de espera
+    e tempo de processamento ficam em ``metrics()``.
+    """
+
+    def __init__(self, name, fn, workers=1, max_queue=8, policy=BLOCK, merge=None, ordered=False,
+                 output=None, on_error=None, on_drop=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Política desconhecida: {policy} (opções: {', '.join(POLICIES)})")
+        if policy == MERGE and merge is None:
+            raise ValueError("A política 'merge' precisa de uma função merge")
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.merge = merge
+        self.ordered = ordered
+        self.output = output
+        self.on_error = on_error
+        self.on_drop = on_drop
+
+        self._items = collections.deque()   # (sequência, item, instante de chegada)
+        self._cond = threading.Condition()
+        self._threads = []
+        self._closed = False
+        self._active = 0
+        self._next_seq = 0
+        # Entrega em ordem: resultados prontos aguardando os anteriores
+        self._deliver_lock = threading.Lock()
+        self._next_delivery = 0
+        self._finished = {}
+
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.merged = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.wait_seconds = 0.0
+        self.service_seconds = 0.0
+        self.max_service_seconds = 0.0
+        self.last_service_seconds = 0.0
+
+    def start(self):
+        for i in range(self.workers - len(self._threads)):
+            thread = threading.Thread(target=self._run, name=f"etapa-{self.name}-{i + 1}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def submit(self, item, timeout=None):
+        """Enfileira um item; retorna QUEUED, MERGED ou DROPPED"""
+        result = self._enqueue(item, timeout)
+        if result == DROPPED:
+            self._dropped([item])
+        return result
+
+    def _enqueue(self, item, timeout):
+        skipped = None
+        with self._cond:
+            self.submitted += 1
+            if self._closed:
+                self.dropped += 1
+                return DROPPED
+            if len(self._items) >= self.max_queue:
+                if self.policy == BLOCK:
+                    deadline = None if timeout is None else time.monotonic() + timeout
+                    while len(self._items) >= self.max_queue and not self._closed:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    if len(self._items) >= self.max_queue or self._closed:
+                        self.dropped += 1
+                        return DROPPED
+                elif self.policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return DROPPED
+                else:
+                    if self.policy == MERGE:
+                        # Só com o último: juntar a um item anterior passaria o novo na frente dos seguintes
+                        seq, queued, arrived = self._items[-1]
+                        combined = self.merge(queued, item)
+                        if combined is not None:
+                            self._items[-1] = (seq, combined, arrived)
+                            self.merged += 1
+                            return MERGED
+                    skipped = self._items.popleft()
+                    self.dropped += 1
+            self._items.append((self._next_seq, item, time.monotonic()))
+            self._next_seq += 1
+            self.max_depth = max(self.max_depth, len(self._items))
+            # Workers, join() e submits bloqueados esperam na mesma condição: acordar todos
+            self._cond.notify_all()
+        if skipped is not None:
+            self._finish(skipped[0], None)
+            self._dropped([skipped[1]])
+        return QUEUED
+
+    def join(self, timeout=None):
+        """Espera a fila esvaziar e os workers ficarem livres; False se o tempo acabar"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._items or self._active:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, drain=True, timeout=None):
+        """Para de aceitar itens; com ``drain`` processa o que está na fila, senão descarta.
+
+        Retorna True se todos os workers terminaram dentro do ``timeout``.
+        """
+        with self._cond:
+            self._closed = True
+            discarded = []
+            if not drain:
+                discarded = list(self._items)
+                self.dropped += len(discarded)
+                self._items.clear()
+            self._cond.notify_all()
+        for seq, _, _ in discarded:
+            self._finish(seq, None)
+        self._dropped([item for _, item, _ in discarded])
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not any(thread.is_alive() for thread in self._threads)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._items and not self._closed:
+                    self._cond.wait()
+                if not self._items:
+                    return
+                seq, item, arrived = self._items.popleft()
+                self._active += 1
+                # Há espaço na fila: liberar quem esperava em submit (política BLOCK)
+                self._cond.notify_all()
+            started = time.monotonic()
+            result = None
+            failed = False
+            try:
+                result = self.fn(item)
+            except Exception as e:
+                failed = True
+                if self.on_error is not None:
+                    self.on_error(e)
+                else:
+                    print(f"❌ Erro na etapa {self.name}: {type(e).__name__}: {e}")
+            elapsed = time.monotonic() - started
+            try:
+                # Entregar antes de liberar o worker: join() só retorna com tudo repassado adiante
+                self._finish(seq, result)
+            except Exception as e:
+                print(f"❌ Erro ao entregar resultado da etapa {self.name}: {type(e).__name__}: {e}")
+            with self._cond:
+                self._active -= 1
+                self.processed += 1
+                self.errors += failed
+                self.wait_seconds += started - arrived
+                self.service_seconds += elapsed
+                self.last_service_seconds = elapsed
+                self.max_service_seconds = max(self.max_service_seconds, elapsed)
+                self._cond.notify_all()
+
+    def _dropped(self, items):
+        if self.on_drop is None:
+            return
+        for item in items:
+            try:
+                self.on_drop(item)
+            except Exception as e:
+                print(f"❌ Erro ao descartar item da etapa {self.name}: {e}")
+
+    def _finish(self, seq, result):
+        """Entrega o resultado (na ordem de chegada, se ``ordered``)"""
+        if not self.ordered:
+            if result is not None:
+                self._emit(result)
+            return
+        with self._deliver_lock:
+            self._finished[seq] = result
+            while self._next_delivery in self._finished:
+                ready = self._finished.pop(self._next_delivery)
+                self._next_delivery += 1
+                if ready is not None:
+                    self._emit(ready)
+
+    def _emit(self, result):
+        if isinstance(self.output, Stage):
+            self.output.submit(result)
+        elif self.output is not None:
+            self.output(result)
+
+    @property
+    def depth(self):
+        with self._cond:
+            return len(self._items)
+
+    def metrics(self):
+        with self._cond:
+            processed = self.processed
+            return {
+                'workers': self.workers,
+                'busy': self._active,
+                'depth': len(self._items),
+                'max_queue': self.max_queue,
+                'max_depth': self.max_depth,
+                'policy': self.policy,
+                'submitted': self.submitted,
+                'processed': processed,
+                'dropped': self.dropped,
+                'merged': self.merged,
+                'errors': self.errors,
+                'mean_wait_ms': 1000.0 * self.wait_seconds / processed if processed else 0.0,
+                'mean_service_ms': 1000.0 * self.service_seconds / processed if processed else 0.0,
+                'max_service_ms': 1000.0 * self.max_service_seconds,
+                'last_service_ms': 1000.0 * self.last_service_seconds,
+            }
+
+
+class Pipeline:
+    """Etapas com nome, filas limitadas entre elas e encerramento ordenado.
+
+    ``output`` de uma etapa pode ser o nome de outra etapa; as ligações são
+    resolvidas em ``start``. O encerramento fecha as etapas na ordem em que
+    foram criadas, então o que sai de uma etapa ainda é aceito pela seguinte.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._started = False
+
+    def add_stage(self, name, fn, **options):
+        if name in self.stages:
+            raise ValueError(f"Etapa repetida: {name}")
+        stage = Stage(name, fn, **options)
+        self.stages[name] = stage
+        if self._started:
+            self._connect(stage)
+            stage.start()
+        return stage
+
+    def _connect(self, stage):
+        if isinstance(stage.output, str):
+            stage.output = self.stages[stage.output]
+
+    def start(self):
+        for stage in self.stages.values():
+            self._connect(stage)
+        for stage in self.stages.values():
+            stage.start()
+        self._started = True
+        return self
+
+    def submit(self, name, item, timeout=None):
+        return self.stages[name].submit(item, timeout=timeout)
+
+    def shutdown(self, drain=True, timeout=5.0):
+        """Encerra todas as etapas; retorna True se todas pararam dentro do ``timeout``"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        stopped = True
+        for stage in self.stages.values():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            stopped = stage.close(drain=drain, timeout=remaining) and stopped
+        return stopped
+
+    def metrics(self):
+        return {name: stage.metrics() for name, stage in self.stages.items()}
+
+    def bottleneck(self):
+        """Etapa com mais tempo de espera médio na fila (None se nada esperou)"""
+        waits = {name: m['mean_wait_ms'] for name, m in self.metrics().items() if m['processed']}
+        if not waits or max(waits.values()) <= 0:
+            return None
+        return max(waits, key=waits.get)
+
+    def format_metrics(self):
+        """Linha curta para a interface: fila/limite, em andamento e tempo médio de cada etapa"""
+        bottleneck = self.bottleneck()
+        parts = []
+        for name, m in self.metrics().items():
+            if not m['submitted']:
+                continue
+            text = f"{name} {m['depth']}/{m['max_queue']}"
+            if m['busy']:
+                text += f" ({m['busy']} em andamento)"
+            if m['processed']:
+                text += f" ~{m['mean_service_ms']:.0f} ms"
+            if m['dropped'] or m['merged']:
+                text += f" [{m['dropped']} descartados, {m['merged']} juntados]"
+            if name == bottleneck:
+                text += " ⚠️"
+            parts.append(text)
+        return "Pipeline: " + (" · ".join(parts) if parts else "ocioso")
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".transcritor")
+
+
+def document_digest(text):
+    """Digest estável (SHA-256) do conteúdo completo do documento"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def normalize_question(question):
+    """Normalização leve da pergunta: minúsculas, espaços únicos, sem pontuação final"""
+    question = re.sub(r'\s+', ' ', question.strip().lower())
+    return question.rstrip(' ?!.')
+
+
+class ResponseCache:
+    """Cache persistente de respostas do Claude em SQLite.
+
+    A chave combina o digest do documento inteiro, os parâmetros do modelo e a
+    pergunta normalizada, então é a mesma entre execuções (ao contrário do
+    ``hash()`` do Python). Entradas expiram por TTL e, acima de ``max_size_mb``,
+    as menos usadas recentemente (LRU) são removidas.
+    """
+
+    def __init__(self, path=None, max_size_mb=50, ttl_seconds=7 * 24 * 3600):
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, "respostas.sqlite3")
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    document_digest TEXT,
+                    scope TEXT,
+                    question TEXT,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+            if 'scope' not in columns:
+                # Caches criados por versões anteriores
+                self._conn.execute("ALTER TABLE responses ADD COLUMN scope TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_scope ON responses (scope)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_document ON responses (document_digest)")
+
+    @staticmethod
+    def make_scope(doc_digest, params):
+        """Identifica documento + parâmetros; respostas só são reaproveitadas dentro do mesmo escopo"""
+        payload = json.dumps({'document': doc_digest, 'params': params}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def make_key(doc_digest, question, params):
+        """Chave estável: documento + parâmetros do modelo + pergunta normalizada"""
+        payload = json.dumps({
+            'document': doc_digest,
+            'params': params,
+            'question': normalize_question(question),
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key, count=True):
+        """Retorna a resposta guardada ou None (conta acerto/falha, exceto com ``count=False``)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += count
+                return None
+            response, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += count
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += count
+            return response
+
+    def put(self, key, response, doc_digest=None, question=None, scope=None):
+        """Guarda uma resposta e aplica as políticas de expiração e tamanho"""
+        now = time.time()
+        size = len(response.encode('utf-8')) + len((question or "").encode('utf-8'))
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, document_digest, scope, question, response, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, doc_digest, scope, question, response, size, now, now)
+                )
+                self._evict(now)
+
+    def _evict(self, now):
+        """Remove expirados e, se preciso, os menos usados; chamado com o lock adquirido"""
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+        excess = total - self.max_size_bytes
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def entries_for_scope(self, scope):
+        """Perguntas válidas de um escopo: [(pergunta, chave, criada em)]"""
+        min_created = time.time() - self.ttl_seconds if self.ttl_seconds else 0
+        with self._lock:
+            return self._conn.execute(
+                "SELECT question, key, created_at FROM responses "
+                "WHERE scope = ? AND question IS NOT NULL AND created_at >= ?",
+                (scope, min_created)
+            ).fetchall()
+
+    def stats(self):
+        """Contadores de acertos/falhas da sessão e ocupação do cache"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+            'entries': entries,
+            'size_bytes': size,
+        }
+
+    def clear(self):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
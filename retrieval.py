@@ -0,0 +1,258 @@
+import re
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+PAGE_MARKER = re.compile(r'^--- Página (\d+) ---$', re.MULTILINE)
+WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# Palavras muito comuns em português que não ajudam a achar o trecho certo
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de do da dos das em no na nos nas por pelo pela pelos pelas
+para pra com sem sob sobre entre ate e ou mas que se nao sim ja mais menos muito muita
+muitos muitas como quando onde qual quais quem porque pois isso isto esse essa esses essas
+este esta estes estas aquele aquela aqueles aquelas ele ela eles elas eu tu voce voces nos
+me te lhe seu sua seus suas meu minha meus minhas ao aos foi ser sao era estar esta tem ter
+ha ou the of and to in is
+""".split())
+
+
+def normalize_word(word):
+    """Minúsculas e sem acentos, para 'Método' e 'metodo' contarem como o mesmo termo"""
+    decomposed = unicodedata.normalize('NFKD', word.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """Quebra o texto em termos normalizados, sem stopwords"""
+    terms = (normalize_word(w) for w in WORD_PATTERN.findall(text))
+    return [t for t in terms if len(t) > 1 and t not in STOPWORDS]
+
+
+def split_pages(text):
+    """Divide o texto pelos marcadores '--- Página N ---'; retorna [(página, texto)].
+
+    Textos sem marcadores (TXT, DOCX) viram uma única página 1.
+    """
+    markers = list(PAGE_MARKER.finditer(text))
+    if not markers:
+        return [(1, text)]
+    pages = []
+    if text[:markers[0].start()].strip():
+        pages.append((1, text[:markers[0].start()]))
+    for i, match in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        pages.append((int(match.group(1)), text[match.end():end]))
+    return pages
+
+
+def page_offsets(text):
+    """Posição de cada marcador de página no texto: [(página, offset)]"""
+    return [(int(match.group(1)), match.start()) for match in PAGE_MARKER.finditer(text)]
+
+
+def chunk_page(page_text, chunk_size):
+    """Agrupa parágrafos de uma página em trechos de até ``chunk_size`` caracteres"""
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n', page_text) if p.strip()]
+    pieces = []
+    for paragraph in paragraphs:
+        if len(paragraph) <= chunk_size:
+            pieces.append(paragraph)
+            continue
+        # Parágrafo grande demais: quebrar em linhas/frases respeitando o limite
+        current = ""
+        for part in re.split(r'(?<=[.!?])\s+|\n', paragraph):
+            if current and len(current) + len(part) + 1 > chunk_size:
+                pieces.append(current)
+                current = ""
+            while len(part) > chunk_size:
+                pieces.append(part[:chunk_size])
+                part = part[chunk_size:]
+            current = f"{current} {part}" if current else part
+        if current:
+            pieces.append(current)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > chunk_size:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def bm25_idf(n_chunks, df):
+    return float(np.log(1.0 + (n_chunks - df + 0.5) / (df + 0.5)))
+
+
+class DocumentIndex:
+    """Índice BM25 local sobre trechos do documento (funciona sem internet).
+
+    Os trechos são criados pelos marcadores de página e pelos parágrafos, e
+    cada pergunta recupera só os ``k`` trechos mais relevantes com a página
+    de origem, em vez do documento inteiro.
+    """
+
+    def __init__(self, chunk_size=1200, k1=1.5, b=0.75):
+        self.chunk_size = chunk_size
+        self.k1 = k1
+        self.b = b
+        self.chunks = []          # [{'page', 'text', 'source'}]
+        self._lengths = []
+        self._postings = {}       # termo -> ([id do trecho], [frequência])
+        self._arrays = None       # Cache NumPy das postings, refeito após inserções
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def __getstate__(self):
+        # O cache NumPy é refeito sob demanda; não precisa ir para o disco
+        state = self.__dict__.copy()
+        state['_arrays'] = None
+        return state
+
+    def add_document(self, text, source=None):
+        """Indexa um texto extraído; retorna quantos trechos foram criados"""
+        added = 0
+        for page, page_text in split_pages(text):
+            added += self.add_page(page, page_text, source)
+        return added
+
+    def add_page(self, page, page_text, source=None):
+        """Indexa uma página; retorna quantos trechos foram criados"""
+        chunks = chunk_page(page_text, self.chunk_size)
+        for chunk_text in chunks:
+            chunk_id = len(self.chunks)
+            terms = tokenize(chunk_text)
+            self.chunks.append({'page': page, 'text': chunk_text, 'source': source})
+            self._lengths.append(len(terms))
+            for term, freq in Counter(terms).items():
+                ids, freqs = self._postings.setdefault(term, ([], []))
+                ids.append(chunk_id)
+                freqs.append(freq)
+        if chunks:
+            self._arrays = None
+        return len(chunks)
+
+    def _posting_arrays(self):
+        if self._arrays is None:
+            self._arrays = {
+                'lengths': np.asarray(self._lengths, dtype=np.float32),
+                'postings': {},
+            }
+        return self._arrays
+
+    def _term_postings(self, term):
+        arrays = self._posting_arrays()
+        cached = arrays['postings'].get(term)
+        if cached is None:
+            ids, freqs = self._postings[term]
+            cached = (np.asarray(ids, dtype=np.int64), np.asarray(freqs, dtype=np.float32))
+            arrays['postings'][term] = cached
+        return cached
+
+    @property
+    def total_length(self):
+        """Soma do número de termos de todos os trechos"""
+        return float(self._posting_arrays()['lengths'].sum())
+
+    def document_frequency(self, term):
+        """Em quantos trechos o termo aparece"""
+        postings = self._postings.get(term)
+        return len(postings[0]) if postings else 0
+
+    def scores(self, query, idf=None, avg_length=None):
+        """Pontuação BM25 de todos os trechos para a pergunta.
+
+        ``idf`` (termo -> peso) e ``avg_length`` permitem usar estatísticas de
+        um corpus maior, para comparar pontuações entre índices diferentes.
+        """
+        n_chunks = len(self.chunks)
+        scores = np.zeros(n_chunks, dtype=np.float32)
+        if n_chunks == 0:
+            return scores
+        lengths = self._posting_arrays()['lengths']
+        if avg_length is None:
+            avg_length = float(lengths.mean()) or 1.0
+        norm = self.k1 * (1.0 - self.b + self.b * lengths / avg_length)
+        for term, query_freq in Counter(tokenize(query)).items():
+            if term not in self._postings:
+                continue
+            ids, freqs = self._term_postings(term)
+            if idf is not None:
+                term_idf = idf.get(term, 0.0)
+            else:
+                term_idf = bm25_idf(n_chunks, len(ids))
+            scores[ids] += query_freq * term_idf * freqs * (self.k1 + 1.0) / (freqs + norm[ids])
+        return scores
+
+    def search(self, query, k=5):
+        """Retorna até ``k`` trechos relevantes, na ordem em que aparecem no documento"""
+        scores = self.scores(query)
+        if len(scores) == 0:
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[scores[top] > 0]
+        if len(top) == 0:
+            # Nenhum termo em comum: usar o início do documento como contexto mínimo
+            top = np.arange(k)
+        # Páginas podem ter sido indexadas fora de ordem (extração paralela)
+        top = sorted(top, key=lambda i: (self.chunks[i]['page'], i))
+        return [dict(self.chunks[i], score=float(scores[i])) for i in top]
+
+
+def search_indexes(indexes, query, k=5):
+    """Busca nos índices de vários documentos como se fossem um só.
+
+    ``indexes`` é [(nome do documento, DocumentIndex)]. O IDF e o tamanho
+    médio dos trechos são calculados sobre todos os índices, então as
+    pontuações são comparáveis e os ``k`` melhores trechos podem vir de
+    documentos diferentes. Cada trecho retornado traz o 'source' de origem,
+    na ordem dos documentos e das páginas.
+    """
+    indexes = [(source, index) for source, index in indexes if len(index)]
+    if not indexes:
+        return []
+    n_chunks = sum(len(index) for _, index in indexes)
+    avg_length = sum(index.total_length for _, index in indexes) / n_chunks or 1.0
+    idf = {}
+    for term in set(tokenize(query)):
+        df = sum(index.document_frequency(term) for _, index in indexes)
+        if df:
+            idf[term] = bm25_idf(n_chunks, df)
+
+    candidates = []  # (pontuação, ordem do documento, id do trecho)
+    for order, (_, index) in enumerate(indexes):
+        scores = index.scores(query, idf=idf, avg_length=avg_length)
+        local_k = min(k, len(scores))
+        top = np.argpartition(-scores, local_k - 1)[:local_k]
+        candidates.extend((float(scores[i]), order, int(i)) for i in top if scores[i] > 0)
+    candidates.sort(key=lambda item: (-item[0], item[1], item[2]))
+    selected = candidates[:k]
+    if not selected:
+        # Nenhum termo em comum: usar o início do primeiro documento como contexto mínimo
+        selected = [(0.0, 0, i) for i in range(min(k, len(indexes[0][1])))]
+
+    def position(item):
+        _, order, chunk_id = item
+        return order, indexes[order][1].chunks[chunk_id]['page'], chunk_id
+
+    results = []
+    for score, order, chunk_id in sorted(selected, key=position):
+        source, index = indexes[order]
+        results.append(dict(index.chunks[chunk_id], source=source, score=score))
+    return results
+
+
+def format_chunks(chunks):
+    """Monta o contexto do prompt com a página (e o documento, se houver) de cada trecho"""
+    def label(chunk):
+        if chunk.get('source'):
+            return f"[{chunk['source']} - Página {chunk['page']}]"
+        return f"[Página {chunk['page']}]"
+    return "\n\n".join(f"{label(chunk)}\n{chunk['text']}" for chunk in chunks)
@@ -0,0 +1,126 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from streaming import to_mono_int16
+
+
+def split_at_silence(samples, rate, vad, max_segment=30.0, min_segment=5.0):
+    """Divide o áudio em trechos de até ``max_segment`` segundos, cortando nas pausas.
+
+    Dentro da janela [min_segment, max_segment] de cada trecho o corte é feito
+    no quadro de menor energia (segundo o ``vad``), então palavras não são
+    partidas ao meio. Retorna [(início, fim)] em amostras; áudio curto vira um
+    único trecho.
+    """
+    samples = to_mono_int16(samples)
+    total = len(samples)
+    max_samples = int(max_segment * rate)
+    if total <= max_samples:
+        return [(0, total)] if total else []
+
+    rms, _ = vad.frame_features(samples)
+    frame = vad.frame_size
+    min_frames = max(1, int(min_segment * rate) // frame)
+    max_frames = max(min_frames + 1, max_samples // frame)
+
+    segments = []
+    start_frame = 0
+    total_frames = len(rms)
+    while total - start_frame * frame > max_samples:
+        window = rms[start_frame + min_frames:start_frame + max_frames]
+        cut = start_frame + min_frames + int(np.argmin(window)) if len(window) else start_frame + max_frames
+        segments.append((start_frame * frame, cut * frame))
+        start_frame = cut
+        if start_frame >= total_frames:
+            break
+    segments.append((start_frame * frame, total))
+    return segments
+
+
+class SegmentTranscriber:
+    """Transcreve trechos de áudio em paralelo num pool limitado de threads.
+
+    ``transcribe_fn(amostras)`` é chamada uma vez por trecho (ex.: o
+    recognize_google). Falhas em ``retry_on`` são repetidas só para aquele
+    trecho, com espera crescente; exceções em ``empty_on`` (trecho sem fala
+    reconhecível) contam como texto vazio. Os textos voltam na ordem do áudio,
+    então o tempo total acompanha o trecho mais lento, não a soma de todos.
+    """
+
+    def __init__(self, transcribe_fn, max_workers=4, retries=2, backoff=0.5,
+                 retry_on=(Exception,), empty_on=(), empty_result=""):
+        self.transcribe_fn = transcribe_fn
+        self.max_workers = max(1, max_workers)
+        self.retries = retries
+        self.backoff = backoff
+        self.retry_on = retry_on
+        self.empty_on = empty_on
+        self.empty_result = empty_result
+
+    def _transcribe_segment(self, samples):
+        attempt = 0
+        while True:
+            try:
+                result = self.transcribe_fn(samples)
+                return self.empty_result if result is None else result
+            except self.empty_on:
+                return self.empty_result
+            except self.retry_on as e:
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                print(f"  🔁 Repetindo trecho (tentativa {attempt + 1}): {e}")
+                time.sleep(self.backoff * attempt)
+
+    def transcribe(self, samples, segments, on_progress=None):
+        """Transcreve ``samples[início:fim]`` de cada trecho; retorna (textos, erros).
+
+        ``textos`` tem um item por trecho, na ordem do áudio (None se o trecho
+        falhou em todas as tentativas); ``erros`` é {índice do trecho: exceção}.
+        ``on_progress(prontos, total)`` é chamado a cada trecho concluído.
+        """
+        return self.transcribe_clips([samples[start:end] for start, end in segments], on_progress)
+
+    def transcribe_clips(self, clips, on_progress=None):
+        """Como ``transcribe``, para trechos que podem vir de áudios diferentes (ex.: mic e sistema)"""
+        texts = [None] * len(clips)
+        errors = {}
+        if not clips:
+            return texts, errors
+        workers = min(self.max_workers, len(clips))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transcricao") as pool:
+            futures = {pool.submit(self._transcribe_segment, clip): i for i, clip in enumerate(clips)}
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                try:
+                    texts[i] = future.result()
+                except Exception as e:
+                    errors[i] = e
+                if on_progress:
+                    on_progress(done, len(clips))
+        return texts, errors
+
+
+def join_segments(texts, missing_marker="[...]"):
+    """Junta os textos na ordem; trechos que falharam viram ``missing_marker``"""
+    parts = [missing_marker if text is None else text.strip() for text in texts]
+    return " ".join(part for part in parts if part)
+
+
+def format_timestamp(seconds):
+    """Segundos -> 'mm:ss' (ou 'h:mm:ss' em gravações de mais de uma hora)"""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+
+
+def merge_labeled(entries):
+    """Junta falas de vários canais numa transcrição única ordenada pelo tempo.
+
+    ``entries`` é [{'start', 'label', 'text'}]; retorna linhas '[mm:ss] Rótulo: texto'.
+    """
+    ordered = sorted((e for e in entries if e['text'].strip()), key=lambda e: (e['start'], e['label']))
+    return "\n".join(f"[{format_timestamp(e['start'])}] {e['label']}: {e['text'].strip()}" for e in ordered)
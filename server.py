@@ -0,0 +1,456 @@
+"""Servidor HTTP local: um documento carregado e um cliente Claude compartilhados pelo laboratório.
+
+Todos os pedidos passam por um único laço asyncio; reconhecimento de fala e
+chamadas ao Claude rodam em pools de threads próprios, cada um com um limite
+de pedidos simultâneos, então uma fila de áudios não atrasa as perguntas (e
+vice-versa). Documentos, índice de busca e caches são os do
+``MeetingAssistant``: extraídos uma vez e usados por todos.
+
+Uso:
+    python server.py --documento tese.pdf
+    python server.py --documento tese.txt --reconhecedor fake --llm fake   # sem rede, para testes
+
+Rotas (JSON, exceto /metrics):
+    GET    /status                         documentos, reconhecedor, caches e filas
+    GET    /metrics                        tempos e contadores no formato do Prometheus (?format=json para JSON)
+    GET    /documents                      documentos carregados
+    POST   /documents                      {"path": "..."} adiciona um documento da pasta de documentos
+    POST   /sessions                       cria uma sessão de transcrição
+    POST   /sessions/<id>/audio            corpo WAV (ou PCM int16 com ?rate=&channels=); transcreve o trecho
+    GET    /sessions/<id>/transcript       transcrição da sessão, trechos na ordem de envio
+    DELETE /sessions/<id>                  descarta a sessão
+    POST   /ask                            {"question": "..."} ou {"session": "<id>"}, opcional "top_k"
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import config
+import instrumentation
+from asr_backends import BACKENDS, BackendError, NoSpeechError
+from assistant import MeetingAssistant, FakeClaudeClient, ASR_BACKEND, RETRIEVAL_TOP_K, usage_counts
+from streaming import resample_linear, to_mono_int16
+from token_budget import TokenBudgetError
+from vad import VoiceActivityDetector
+
+SERVER_HOST = getattr(config, "SERVER_HOST", "127.0.0.1")
+SERVER_PORT = getattr(config, "SERVER_PORT", 8765)
+SERVER_ASR_CONCURRENCY = getattr(config, "SERVER_ASR_CONCURRENCY", 4)
+SERVER_LLM_CONCURRENCY = getattr(config, "SERVER_LLM_CONCURRENCY", 2)
+SERVER_MAX_BODY_MB = getattr(config, "SERVER_MAX_BODY_MB", 50)
+SERVER_DOCUMENTS_DIR = getattr(config, "SERVER_DOCUMENTS_DIR", "documentos")
+SERVER_MAX_SESSIONS = getattr(config, "SERVER_MAX_SESSIONS", 100)
+SERVER_SESSION_IDLE_MINUTES = getattr(config, "SERVER_SESSION_IDLE_MINUTES", 60)
+
+# Tempo máximo para receber o cabeçalho e o corpo de um pedido
+READ_TIMEOUT_SECONDS = 30
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DOCUMENT_EXTENSIONS = ('.pdf', '.docx', '.txt')
+
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               409: "Conflict", 413: "Payload Too Large", 422: "Unprocessable Entity",
+               500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    """Erro devolvido ao cliente como {"error": mensagem} com o status dado"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def decode_audio(body, query, rate):
+    """Corpo do pedido -> int16 mono na taxa ``rate``: WAV, ou PCM int16 cru com ?rate=&channels="""
+    if body[:4] == b'RIFF':
+        try:
+            with wave.open(io.BytesIO(body)) as wav:
+                if wav.getsampwidth() != 2:
+                    raise HttpError(400, "WAV precisa ser PCM de 16 bits")
+                source_rate = wav.getframerate()
+                channels = wav.getnchannels()
+                samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2')
+        except (wave.Error, EOFError) as e:
+            raise HttpError(400, f"WAV inválido: {e}")
+    else:
+        try:
+            source_rate = int(query.get('rate', [rate])[0])
+            channels = int(query.get('channels', [1])[0])
+        except ValueError:
+            raise HttpError(400, "rate e channels precisam ser números")
+        samples = np.frombuffer(body[:len(body) - len(body) % 2], dtype='<i2')
+    if source_rate <= 0 or channels < 1:
+        raise HttpError(400, "rate precisa ser positivo e channels pelo menos 1")
+    return resample_linear(to_mono_int16(samples, channels=channels), source_rate, rate)
+
+
+class Session:
+    """Transcrição de uma pessoa/reunião: trechos de áudio enviados em sequência"""
+
+    def __init__(self, session_id, rate):
+        self.id = session_id
+        # Um VAD por sessão: o limiar é calibrado no primeiro trecho enviado
+        self.vad = VoiceActivityDetector(rate)
+        self.chunks = {}            # sequência -> {'seq', 'text', 'error', 'audio_seconds'}
+        self.next_seq = 0
+        self.pending = 0
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+
+    def transcript(self):
+        return " ".join(chunk['text'] for _, chunk in sorted(self.chunks.items()) if chunk['text'])
+
+    def to_dict(self):
+        return {
+            'session': self.id,
+            'text': self.transcript(),
+            'chunks': [chunk for _, chunk in sorted(self.chunks.items())],
+            'pending': self.pending,
+        }
+
+
+class TranscriptionServer:
+    """Rotas HTTP sobre um ``MeetingAssistant`` compartilhado.
+
+    Os métodos ``async`` rodam só no laço de eventos, então sessões e
+    contadores não precisam de lock; o trabalho pesado vai para os pools
+    ``asr_executor`` e ``llm_executor``, cujos tamanhos são os limites de
+    concorrência de cada serviço.
+    """
+
+    def __init__(self, assistant, asr_concurrency=SERVER_ASR_CONCURRENCY, llm_concurrency=SERVER_LLM_CONCURRENCY,
+                 max_body_mb=SERVER_MAX_BODY_MB, documents_dir=SERVER_DOCUMENTS_DIR, max_sessions=SERVER_MAX_SESSIONS,
+                 session_idle_minutes=SERVER_SESSION_IDLE_MINUTES):
+        self.assistant = assistant
+        self.asr_executor = ThreadPoolExecutor(max_workers=max(1, asr_concurrency), thread_name_prefix="servidor-asr")
+        self.llm_executor = ThreadPoolExecutor(max_workers=max(1, llm_concurrency), thread_name_prefix="servidor-llm")
+        # A extração de PDF já usa todos os processadores: um documento por vez
+        self.document_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="servidor-docs")
+        self.max_body = int(max_body_mb * 1024 * 1024)
+        self.documents_dir = os.path.realpath(documents_dir) if documents_dir else None
+        self.max_sessions = max(1, max_sessions)
+        self.session_idle_seconds = session_idle_minutes * 60
+        self.sessions = {}
+        self.in_flight = {'asr': 0, 'llm': 0}
+        self.server = None
+
+    async def start(self, host=SERVER_HOST, port=SERVER_PORT):
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for executor in (self.asr_executor, self.llm_executor, self.document_executor):
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run_in(self, kind, executor, fn, *args):
+        """Roda ``fn`` no pool do serviço, contando os pedidos em andamento/na fila"""
+        self.in_flight[kind] += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        finally:
+            self.in_flight[kind] -= 1
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    async def handle_connection(self, reader, writer):
+        try:
+            method, target, headers, body = await asyncio.wait_for(self.read_request(reader), READ_TIMEOUT_SECONDS)
+            url = urlsplit(target)
+            status, payload = await self.route(method, url.path.rstrip('/') or '/', parse_qs(url.query), headers, body)
+        except HttpError as e:
+            status, payload = e.status, {'error': e.message}
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except Exception as e:
+            print(f"❌ Erro no servidor: {type(e).__name__}: {e}")
+            status, payload = 500, {'error': str(e)}
+        if isinstance(payload, str):
+            data, content_type = payload.encode('utf-8'), PROMETHEUS_CONTENT_TYPE
+        else:
+            data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            content_type = "application/json; charset=utf-8"
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + data
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def read_request(self, reader):
+        request_line = await reader.readline()
+        try:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise HttpError(400, "Pedido HTTP inválido")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HttpError(400, "Content-Length inválido")
+        if length < 0:
+            raise HttpError(400, "Content-Length inválido")
+        if length > self.max_body:
+            raise HttpError(413, f"Corpo maior que {self.max_body // (1024 * 1024)} MB")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, headers, body
+
+    async def route(self, method, path, query, headers, body):
+        parts = path.strip('/').split('/')
+        if path == '/status' and method == 'GET':
+            return 200, self.status()
+        if path == '/metrics' and method == 'GET':
+            if query.get('format', [''])[0] == 'json':
+                return 200, instrumentation.REGISTRY.snapshot()
+            return 200, self.metrics_text()
+        if path == '/documents':
+            if method == 'GET':
+                return 200, {'documents': self.document_list()}
+            if method == 'POST':
+                return await self.add_document(parse_json(body))
+        if parts[0] == 'sessions':
+            self.expire_sessions()
+        if path == '/sessions' and method == 'POST':
+            if len(self.sessions) >= self.max_sessions:
+                raise HttpError(503, f"Limite de {self.max_sessions} sessões abertas; encerre alguma antes")
+            session = Session(uuid.uuid4().hex[:12], self.assistant.rate)
+            self.sessions[session.id] = session
+            return 201, {'session': session.id}
+        if len(parts) >= 2 and parts[0] == 'sessions':
+            session = self.sessions.get(parts[1])
+            if session is None:
+                raise HttpError(404, f"Sessão não encontrada: {parts[1]}")
+            session.last_used = time.monotonic()
+            if len(parts) == 2 and method == 'DELETE':
+                del self.sessions[session.id]
+                return 200, {'session': session.id, 'deleted': True}
+            if parts[2:] == ['audio'] and method == 'POST':
+                return await self.upload_audio(session, body, query)
+            if parts[2:] == ['transcript'] and method == 'GET':
+                return 200, session.to_dict()
+        if path == '/ask' and method == 'POST':
+            return await self.ask(parse_json(body))
+        raise HttpError(404, f"Rota não encontrada: {method} {path}")
+
+    # ------------------------------------------------------------------
+    # Rotas
+    # ------------------------------------------------------------------
+
+    def status(self):
+        return {
+            'documents': self.document_list(),
+            'asr_backend': self.assistant.asr_backend.name,
+            'asr_latency': self.assistant.asr_backend.latency_stats(),
+            'response_cache': self.assistant.response_cache.stats(),
+            'sessions': len(self.sessions),
+            'in_flight': dict(self.in_flight),
+        }
+
+    def metrics_text(self):
+        """Tempos e contadores do registro mais as filas do servidor, no formato texto do Prometheus"""
+        prefix = instrumentation.PROMETHEUS_PREFIX
+        lines = [f"# HELP {prefix}_server_in_flight Pedidos em andamento por serviço",
+                 f"# TYPE {prefix}_server_in_flight gauge"]
+        lines += [f'{prefix}_server_in_flight{{service="{kind}"}} {count}' for kind, count in sorted(self.in_flight.items())]
+        lines += [f"# HELP {prefix}_server_sessions Sessões de transcrição abertas",
+                  f"# TYPE {prefix}_server_sessions gauge",
+                  f"{prefix}_server_sessions {len(self.sessions)}"]
+        return instrumentation.REGISTRY.to_prometheus() + "\n".join(lines) + "\n"
+
+    def expire_sessions(self):
+        """Descarta sessões paradas há mais de ``session_idle_seconds`` (as com trechos pendentes ficam)"""
+        cutoff = time.monotonic() - self.session_idle_seconds
+        for session_id in [sid for sid, s in self.sessions.items() if s.last_used < cutoff and not s.pending]:
+            del self.sessions[session_id]
+
+    def document_list(self):
+        return [{'name': d.name, 'path': d.path, 'complete': d.complete, 'chars': len(d.content),
+                 'pages': {'done': d.coverage[0], 'total': d.coverage[1]}}
+                for d in self.assistant.corpus.documents()]
+
+    def load_document(self, path):
+        """Converte no pool de documentos; erros só aparecem no log (o documento sai do corpus)"""
+        document = self.assistant.corpus.add(path)
+
+        def convert():
+            try:
+                self.assistant.convert_document(document)
+                print(f"📄 {document.name}: {len(document.content):,} caracteres")
+            except Exception as e:
+                print(f"❌ Erro ao converter {document.name}: {e}")
+
+        self.document_executor.submit(convert)
+        return document
+
+    def resolve_document_path(self, path):
+        """Caminho do pedido -> arquivo dentro de ``documents_dir``; HttpError fora dela ou se não existir"""
+        if self.documents_dir is None:
+            raise HttpError(404, "Servidor sem pasta de documentos (SERVER_DOCUMENTS_DIR)")
+        if not isinstance(path, str) or not path or '\0' in path:
+            raise HttpError(400, "Informe o caminho do documento em 'path'")
+        # Links simbólicos e '..' são resolvidos antes da comparação
+        resolved = os.path.realpath(os.path.join(self.documents_dir, path))
+        if os.path.commonpath([resolved, self.documents_dir]) != self.documents_dir:
+            raise HttpError(400, "O documento precisa estar na pasta de documentos do servidor")
+        if not resolved.lower().endswith(DOCUMENT_EXTENSIONS):
+            raise HttpError(400, f"Formato não suportado (use {', '.join(DOCUMENT_EXTENSIONS)})")
+        if not os.path.isfile(resolved):
+            raise HttpError(404, f"Documento não encontrado: {path}")
+        return resolved
+
+    async def add_document(self, data):
+        document = self.load_document(self.resolve_document_path(data.get('path')))
+        return 201, {'name': document.name, 'path': document.path, 'complete': False}
+
+    def transcribe_chunk(self, session, samples):
+        """Roda no pool de ASR: remove o silêncio e transcreve o trecho"""
+        vad = session.vad
+        if not vad.calibrated:
+            vad.calibrate(samples)
+        speech, _ = vad.trim(samples)
+        if len(speech) == 0:
+            return ""
+        # Um trecho por vez: o pool do servidor já é o limite de pedidos ao reconhecedor
+        return self.assistant.transcribe_segments(speech, vad, max_workers=1)
+
+    async def upload_audio(self, session, body, query):
+        if not body:
+            raise HttpError(400, "Envie o áudio no corpo do pedido")
+        samples = decode_audio(body, query, self.assistant.rate)
+        # A sequência é reservada na chegada: trechos transcritos fora de ordem voltam ao lugar certo
+        seq = session.next_seq
+        session.next_seq += 1
+        session.pending += 1
+        chunk = {'seq': seq, 'text': "", 'error': None, 'audio_seconds': round(len(samples) / float(self.assistant.rate), 2)}
+        start = time.perf_counter()
+        try:
+            chunk['text'] = await self.run_in('asr', self.asr_executor, self.transcribe_chunk, session, samples) or ""
+        except NoSpeechError:
+            pass
+        except BackendError as e:
+            chunk['error'] = f"Erro no serviço de reconhecimento: {e}"
+        finally:
+            session.pending -= 1
+        chunk['seconds'] = round(time.perf_counter() - start, 3)
+        session.chunks[seq] = chunk
+        return (502 if chunk['error'] else 200), dict(chunk, session=session.id)
+
+    async def ask(self, data):
+        question = data.get('question')
+        if question is not None and not isinstance(question, str):
+            raise HttpError(400, "'question' precisa ser texto")
+        if not question and data.get('session'):
+            if not isinstance(data['session'], str):
+                raise HttpError(400, "'session' precisa ser o id da sessão (texto)")
+            session = self.sessions.get(data['session'])
+            if session is None:
+                raise HttpError(404, f"Sessão não encontrada: {data['session']}")
+            question = session.transcript()
+        if not question or not question.strip():
+            raise HttpError(400, "Informe 'question' ou uma 'session' com transcrição")
+        if not self.assistant.corpus.loaded:
+            raise HttpError(409, "Nenhum documento carregado e convertido")
+        try:
+            top_k = max(1, int(data.get('top_k', RETRIEVAL_TOP_K)))
+        except (TypeError, ValueError):
+            raise HttpError(400, "top_k precisa ser um número")
+
+        start = time.perf_counter()
+        try:
+            result = await self.run_in('llm', self.llm_executor, self.assistant.answer, question.strip(), top_k)
+        except TokenBudgetError as e:
+            raise HttpError(422, f"Pergunta não enviada: {e}")
+        except Exception as e:
+            raise HttpError(502, f"Erro ao processar com Claude: {e}")
+        answer = {'question': question.strip(), 'response': result['response'], 'source': result['source'],
+                  'seconds': round(time.perf_counter() - start, 3)}
+        if result['plan']:
+            answer.update(mode=result['plan']['mode'], estimated_tokens=result['plan']['tokens'])
+        if result['usage'] is not None:
+            answer['usage'] = usage_counts(result['usage'])
+        return 200, answer
+
+
+def parse_json(body):
+    try:
+        data = json.loads(body.decode('utf-8') or "{}")
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise HttpError(400, f"JSON inválido: {e}")
+    if not isinstance(data, dict):
+        raise HttpError(400, "O corpo precisa ser um objeto JSON")
+    return data
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor HTTP local com documento, reconhecedor e Claude compartilhados.")
+    parser.add_argument("--host", default=SERVER_HOST, help=f"endereço (padrão: {SERVER_HOST})")
+    parser.add_argument("--porta", type=int, default=SERVER_PORT, help=f"porta (padrão: {SERVER_PORT})")
+    parser.add_argument("--documento", action="append", default=[],
+                        help="PDF, DOCX ou TXT carregado ao iniciar (pode repetir)")
+    parser.add_argument("--reconhecedor", choices=sorted(BACKENDS), default=ASR_BACKEND,
+                        help=f"reconhecedor de fala (padrão do config: {ASR_BACKEND})")
+    parser.add_argument("--llm", choices=["claude", "fake"], default="claude",
+                        help="'fake' responde localmente, sem API (testes)")
+    parser.add_argument("--pasta-documentos", default=SERVER_DOCUMENTS_DIR,
+                        help=f"pasta de onde POST /documents pode carregar arquivos (padrão: {SERVER_DOCUMENTS_DIR})")
+    parser.add_argument("--asr-simultaneos", type=int, default=SERVER_ASR_CONCURRENCY,
+                        help=f"trechos de áudio transcritos ao mesmo tempo (padrão: {SERVER_ASR_CONCURRENCY})")
+    parser.add_argument("--llm-simultaneos", type=int, default=SERVER_LLM_CONCURRENCY,
+                        help=f"perguntas simultâneas ao Claude (padrão: {SERVER_LLM_CONCURRENCY})")
+    return parser.parse_args(argv)
+
+
+async def serve(args):
+    client = FakeClaudeClient() if args.llm == "fake" else None
+    assistant = MeetingAssistant(api_key=getattr(config, "ANTHROPIC_API_KEY", None), client=client,
+                                 asr_backend=args.reconhecedor)
+    server = TranscriptionServer(assistant, asr_concurrency=args.asr_simultaneos, llm_concurrency=args.llm_simultaneos,
+                                 documents_dir=args.pasta_documentos)
+    for path in args.documento:
+        server.load_document(path)
+    host, port = await server.start(args.host, args.porta)
+    print(f"🌐 Servidor em http://{host}:{port} - reconhecedor {assistant.asr_backend.label}, "
+          f"{'Claude simulado' if client else 'Claude'}")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    try:
+        asyncio.run(serve(parse_args(argv)))
+    except KeyboardInterrupt:
+        print("Servidor encerrado")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import re
+import threading
+import time
+import unicodedata
+import zlib
+
+import numpy as np
+
+# Muletas e artigos que variam entre transcrições da mesma pergunta
+FILLER_WORDS = frozenset("""
+a o as os um uma uns umas ah ahn eh hum hmm uhm ne tipo entao assim bom bem la
+ai dai sabe olha ta ok tipo pois enfim
+""".split())
+
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def normalize_transcription(text):
+    """Minúsculas, sem acentos, sem pontuação e sem palavras de preenchimento"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    plain = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    words = re.findall(r'\w+', plain)
+    return ' '.join(w for w in words if w not in FILLER_WORDS)
+
+
+def char_ngrams(text, n=3):
+    """Conjunto de n-gramas de caracteres (com bordas) do texto normalizado"""
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class SimilarQuestionCache:
+    """Encontra perguntas quase iguais já respondidas (MinHash + LSH).
+
+    Cada pergunta normalizada vira uma assinatura MinHash dos seus n-gramas de
+    caracteres; as assinaturas são divididas em bandas indexadas em buckets,
+    então a busca só compara com candidatos que colidem em alguma banda, em vez
+    de percorrer todo o cache. Os candidatos são confirmados pela similaridade
+    de Jaccard exata dos n-gramas.
+
+    O índice guarda só a chave da resposta no ``ResponseCache``; a resposta é
+    lida de lá em cada acerto, então expiração e limite de tamanho são os do
+    cache de respostas. Entradas também saem do índice depois de
+    ``ttl_seconds`` e, acima de ``max_entries``, as mais antigas primeiro.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=64, bands=16, ngram=3, seed=1,
+                 ttl_seconds=7 * 24 * 3600, max_entries=5000):
+        if num_perm % bands:
+            raise ValueError("num_perm deve ser múltiplo de bands")
+        self.threshold = threshold
+        self.ngram = ngram
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self._entries = {}         # id -> {'scope', 'question', 'key', 'ngrams', 'bands', 'seen', 'created_at'}, em ordem de inclusão
+        self._next_id = 0
+        self._buckets = {}         # (escopo, banda, assinatura da banda) -> [ids]
+        self._seen = {}            # (escopo, pergunta normalizada) -> id
+        self._loaded_scopes = set()
+        self._lock = threading.Lock()
+
+    def signature(self, ngrams):
+        """Assinatura MinHash (num_perm valores) de um conjunto de n-gramas"""
+        hashes = np.fromiter((zlib.crc32(g.encode('utf-8')) for g in ngrams),
+                             dtype=np.uint64, count=len(ngrams)) % MERSENNE_PRIME
+        # (a * x + b) mod p para todas as permutações de uma vez
+        permuted = (hashes[:, None] * self._a[None, :] + self._b[None, :]) % MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+    def _band_keys(self, scope, signature):
+        return [(scope, band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    def _expired(self, created_at, now):
+        return bool(self.ttl_seconds) and now - created_at > self.ttl_seconds
+
+    def _remove(self, entry_id):
+        """Tira a entrada do índice; chamado com o lock adquirido"""
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for band_key in entry['bands']:
+            bucket = self._buckets[band_key]
+            bucket.remove(entry_id)
+            if not bucket:
+                del self._buckets[band_key]
+        del self._seen[entry['seen']]
+
+    def add(self, scope, question, key, created_at=None):
+        """Indexa uma pergunta respondida dentro de um escopo (documento + parâmetros).
+
+        ``key`` é a chave da resposta no ``ResponseCache``; ``created_at``
+        (time.time() da resposta) conta para o TTL; padrão: agora.
+        """
+        normalized = normalize_transcription(question)
+        if not normalized:
+            return
+        now = time.time()
+        created_at = now if created_at is None else created_at
+        if self._expired(created_at, now):
+            return
+        with self._lock:
+            previous = self._seen.get((scope, normalized))
+            if previous is not None:
+                # A resposta mais nova substitui a anterior (que pode sair antes do cache de respostas)
+                self._remove(previous)
+            ngrams = char_ngrams(normalized, self.ngram)
+            entry_id = self._next_id
+            self._next_id += 1
+            bands = self._band_keys(scope, self.signature(ngrams))
+            self._entries[entry_id] = {'scope': scope, 'question': question, 'key': key,
+                                       'ngrams': ngrams, 'bands': bands, 'seen': (scope, normalized),
+                                       'created_at': created_at}
+            self._seen[(scope, normalized)] = entry_id
+            for band_key in bands:
+                self._buckets.setdefault(band_key, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def ensure_loaded(self, scope, loader):
+        """Carrega (uma vez) as perguntas já guardadas de um escopo; ``loader`` retorna [(pergunta, chave, criada em)]"""
+        with self._lock:
+            if scope in self._loaded_scopes:
+                return
+            self._loaded_scopes.add(scope)
+        for question, key, created_at in loader(scope):
+            self.add(scope, question, key, created_at=created_at)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def lookup(self, scope, question, fetch):
+        """Retorna (resposta, similaridade, pergunta original) ou None.
+
+        ``fetch(chave)`` lê a resposta no cache de respostas; se ela já saiu de
+        lá (None), a entrada sai do índice e o próximo candidato é tentado.
+        """
+        normalized = normalize_transcription(question)
+        if not normalized:
+            return None
+        ngrams = char_ngrams(normalized, self.ngram)
+        now = time.time()
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(scope, self.signature(ngrams)):
+                candidates.update(self._buckets.get(band_key, ()))
+            matches = []
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if self._expired(entry['created_at'], now):
+                    # Resposta vencida no cache de respostas: não pode voltar por aqui
+                    self._remove(entry_id)
+                    continue
+                union = len(ngrams | entry['ngrams'])
+                similarity = len(ngrams & entry['ngrams']) / union if union else 0.0
+                if similarity >= self.threshold:
+                    matches.append((similarity, entry_id, entry['key'], entry['question']))
+        # A leitura no cache de respostas fica fora do lock do índice
+        for similarity, entry_id, key, original in sorted(matches, reverse=True):
+            response = fetch(key)
+            if response is not None:
+                return response, similarity, original
+            with self._lock:
+                self._remove(entry_id)
+        return None
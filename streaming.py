@@ -0,0 +1,140 @@
+import threading
+
+import numpy as np
+
+
+def to_mono_int16(samples, channels=1):
+    """Converte um bloco capturado (float ou int16, mono ou stereo) para int16 mono"""
+    data = np.asarray(samples)
+    if data.dtype.kind == 'f':
+        data = np.clip(data * 32767.0, -32768, 32767)
+    if data.ndim > 1:
+        data = data.mean(axis=1) if data.shape[1] > 1 else data[:, 0]
+    elif channels > 1:
+        # PyAudio entrega amostras intercaladas (L R L R ...)
+        usable = len(data) - (len(data) % channels)
+        data = data[:usable].reshape(-1, channels).mean(axis=1)
+    return data.astype(np.int16, copy=False)
+
+
+def resample_linear(samples, from_rate, to_rate):
+    """Reamostra int16 mono por interpolação linear (suficiente para reconhecimento de fala)"""
+    if from_rate == to_rate or len(samples) == 0:
+        return samples
+    positions = np.arange(int(len(samples) * to_rate / from_rate)) * (from_rate / float(to_rate))
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+
+
+def merge_audio_blocks(older, newer):
+    """Junta dois itens da fila do VAD: listas de blocos (fonte, amostras int16 mono, ...) em ordem de captura.
+
+    Usado quando a fila entre a captura e o VAD enche: o item novo entra no
+    último da fila em vez de ser descartado. Blocos seguidos da mesma fonte
+    viram um bloco maior (os demais campos, ex.: instante de captura, são os
+    do mais antigo); um bloco de outra fonte entra depois, mantendo a ordem.
+    """
+    merged = list(older)
+    for block in newer:
+        last = merged[-1]
+        if last[0] == block[0]:
+            merged[-1] = (last[0], np.concatenate([last[1], block[1]])) + tuple(last[2:])
+        else:
+            merged.append(block)
+    return merged
+
+
+class UtteranceSegmenter:
+    """Corta o áudio capturado em falas usando as pausas entre frases.
+
+    Recebe os blocos capturados (na etapa 'vad' do pipeline) e entrega cada fala
+    completa (int16 mono) para ``on_utterance`` assim que uma pausa é detectada.
+    Com um ``vad`` (VoiceActivityDetector) a decisão de fala usa o limiar
+    calibrado do dispositivo; sem ele, um limiar fixo de RMS.
+    """
+
+    def __init__(self, rate, on_utterance, channels=1, silence_threshold=500.0,
+                 min_silence=0.6, min_utterance=0.5, max_utterance=15.0, vad=None):
+        self.rate = rate
+        self.on_utterance = on_utterance
+        self.channels = channels
+        self.silence_threshold = silence_threshold
+        self.vad = vad
+        self.min_silence_samples = int(min_silence * rate)
+        self.min_utterance_samples = int(min_utterance * rate)
+        self.max_utterance_samples = int(max_utterance * rate)
+        # Manter um pouco de áudio antes da fala para não cortar o início da palavra
+        self.preroll_samples = int(0.2 * rate)
+
+        self._lock = threading.Lock()
+        self._blocks = []
+        self._preroll = []
+        self._speech_samples = 0
+        self._total_samples = 0
+        self._silence_run = 0
+        self._in_speech = False
+
+    def feed(self, samples):
+        """Adiciona um bloco de áudio capturado"""
+        block = to_mono_int16(samples, self.channels)
+        if len(block) == 0:
+            return
+
+        if self.vad is not None:
+            is_speech = self.vad.is_speech(block)
+        else:
+            rms = float(np.sqrt(np.mean(block.astype(np.float32) ** 2)))
+            is_speech = rms >= self.silence_threshold
+
+        with self._lock:
+            if not self._in_speech:
+                if is_speech:
+                    self._in_speech = True
+                    self._blocks = self._preroll + [block]
+                    self._total_samples = sum(len(b) for b in self._blocks)
+                    self._speech_samples = len(block)
+                    self._silence_run = 0
+                    self._preroll = []
+                else:
+                    self._preroll.append(block)
+                    while sum(len(b) for b in self._preroll) > self.preroll_samples and len(self._preroll) > 1:
+                        self._preroll.pop(0)
+                return
+
+            self._blocks.append(block)
+            self._total_samples += len(block)
+            if is_speech:
+                self._speech_samples += len(block)
+                self._silence_run = 0
+            else:
+                self._silence_run += len(block)
+
+            pause_found = self._silence_run >= self.min_silence_samples
+            too_long = self._total_samples >= self.max_utterance_samples
+            if not (pause_found or too_long):
+                return
+            utterance = self._take_utterance()
+
+        if utterance is not None:
+            self.on_utterance(utterance)
+
+    def flush(self):
+        """Entrega a fala em andamento (usado ao parar a gravação)"""
+        with self._lock:
+            utterance = self._take_utterance() if self._in_speech else None
+            self._preroll = []
+        if utterance is not None:
+            self.on_utterance(utterance)
+
+    def _take_utterance(self):
+        """Fecha a fala atual; deve ser chamado com o lock adquirido"""
+        blocks = self._blocks
+        speech_samples = self._speech_samples
+        self._blocks = []
+        self._total_samples = 0
+        self._speech_samples = 0
+        self._silence_run = 0
+        self._in_speech = False
+
+        if speech_samples < self.min_utterance_samples:
+            return None
+        return np.concatenate(blocks)
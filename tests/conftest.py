@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assistant import MeetingAssistant, FakeClaudeClient, SAMPLE_RATE
+from extraction_cache import ExtractionCache
+from response_cache import ResponseCache
+
+
+def speech_like(seconds, seed=0, lead_in=1.0, rate=SAMPLE_RATE):
+    """Ruído de fundo (para o VAD calibrar) seguido de falas de 2 a 6 s (tom com ruído) separadas por pausas"""
+    rng = np.random.RandomState(seed)
+    parts = [rng.normal(0, 30, int(lead_in * rate))]
+    length = 0
+    while length < seconds * rate:
+        speech = int(rng.uniform(2, 6) * rate)
+        t = np.arange(speech) / rate
+        pause = int(rng.uniform(0.4, 1.0) * rate)
+        parts += [6000 * np.sin(2 * np.pi * rng.uniform(120, 220) * t) + rng.normal(0, 800, speech),
+                  rng.normal(0, 30, pause)]
+        length += speech + pause
+    return np.clip(np.concatenate(parts), -32768, 32767).astype(np.int16)
+
+
+@pytest.fixture
+def assistant(tmp_path):
+    """MeetingAssistant com reconhecedor e Claude simulados e caches só para o teste"""
+    client = FakeClaudeClient(first_token_latency=0.0, words_per_second=0.0, response_words=10)
+    assistant = MeetingAssistant(client=client, asr_backend="fake")
+    assistant.asr_backend.latency = 0.0
+    assistant.response_cache = ResponseCache(path=":memory:")
+    assistant.extraction_cache = ExtractionCache(str(tmp_path / "extracoes"))
+    return assistant
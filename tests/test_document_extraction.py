@@ -0,0 +1,33 @@
+import zipfile
+
+from document_extraction import extract_docx_text
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def write_docx(path, body):
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('word/document.xml', f'<w:document {W}><w:body>{body}</w:body></w:document>')
+    return str(path)
+
+
+def test_tab_stop_definitions_are_not_text(tmp_path):
+    path = write_docx(tmp_path / "tabs.docx", """
+        <w:p>
+          <w:pPr><w:tabs><w:tab w:val="left" w:pos="720"/><w:tab w:val="right" w:pos="9000"/></w:tabs></w:pPr>
+          <w:r><w:t>Introdução</w:t></w:r>
+        </w:p>""")
+    assert extract_docx_text(path) == "Introdução"
+
+
+def test_tabs_inside_runs_are_kept(tmp_path):
+    path = write_docx(tmp_path / "sumario.docx", """
+        <w:p>
+          <w:pPr><w:tabs><w:tab w:val="right" w:leader="dot" w:pos="9000"/></w:tabs></w:pPr>
+          <w:r><w:t>1. Introdução</w:t></w:r><w:r><w:tab/><w:t>3</w:t></w:r>
+        </w:p>
+        <w:tbl><w:tr>
+          <w:tc><w:p><w:r><w:t>a</w:t><w:tab/><w:t>b</w:t></w:r></w:p></w:tc>
+          <w:tc><w:p><w:r><w:t>c</w:t></w:r></w:p></w:tc>
+        </w:tr></w:tbl>""")
+    assert extract_docx_text(path) == "1. Introdução\t3\na\tb | c"
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from instrumentation import Registry
+
+
+def test_spans_and_counters_are_exported():
+    registry = Registry()
+    for seconds in (0.1, 0.2, 0.3):
+        registry.observe('asr_request', seconds, backend='fake')
+    with registry.span('prompt_build'):
+        pass
+    registry.increment('cache_hits', kind='exact')
+    registry.increment('cache_hits', kind='similar')
+    registry.increment('cache_hits', kind='similar')
+
+    assert registry.counter('cache_hits') == 3
+    assert registry.counter('cache_hits', kind='similar') == 2
+
+    snapshot = json.loads(registry.to_json())
+    asr = next(s for s in snapshot['spans'] if s['name'] == 'asr_request')
+    assert asr['labels'] == {'backend': 'fake'}
+    assert asr['count'] == 3 and asr['max_seconds'] == 0.3
+    assert asr['total_seconds'] == pytest.approx(0.6)
+
+    text = registry.to_prometheus()
+    assert '# TYPE transcritor_span_seconds summary' in text
+    assert 'transcritor_span_seconds_count{span="asr_request",backend="fake"} 3' in text
+    assert 'transcritor_cache_hits_total{kind="similar"} 2' in text
+    assert text.count('# TYPE transcritor_cache_hits_total counter') == 1
+
+
+def test_reset_and_empty_panel():
+    registry = Registry()
+    assert registry.format_latencies() == "Nenhuma medição ainda"
+    registry.observe('llm_total', 1.5)
+    assert "Claude: resposta completa" in registry.format_latencies()
+    registry.reset()
+    assert registry.snapshot()['spans'] == []
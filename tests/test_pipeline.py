@@ -0,0 +1,124 @@
+import threading
+import time
+
+import numpy as np
+
+from pipeline import BLOCK, DROP_NEWEST, DROP_OLDEST, MERGE, DROPPED, MERGED, QUEUED, Pipeline, Stage
+from streaming import merge_audio_blocks
+
+
+def gated_stage(policy, max_queue=2, **options):
+    """Etapa com um worker parado no primeiro item até ``gate`` ser liberado"""
+    gate = threading.Event()
+    started = threading.Event()
+    processed = []
+
+    def work(item):
+        started.set()
+        gate.wait(5)
+        processed.append(item)
+
+    stage = Stage('teste', work, max_queue=max_queue, policy=policy, **options)
+    stage.start()
+    stage.submit('ocupado')
+    assert started.wait(5)
+    return stage, gate, processed
+
+
+def same_label(older, newer):
+    return (older[0], older[1] + newer[1]) if older[0] == newer[0] else None
+
+
+def test_merge_only_with_tail_keeps_order_between_sources():
+    stage, gate, processed = gated_stage(MERGE, max_queue=2, merge=same_label)
+    assert stage.submit(('mic', "a")) == QUEUED
+    assert stage.submit(('sistema', "b")) == QUEUED
+    # Juntar 'c' a 'a' passaria a fala do microfone na frente da fala do sistema
+    dropped = []
+    stage.on_drop = dropped.append
+    assert stage.submit(('mic', "c")) == QUEUED
+    assert stage.submit(('mic', "d")) == MERGED
+    gate.set()
+    stage.close()
+    assert processed == ['ocupado', ('sistema', "b"), ('mic', "cd")]
+    assert dropped == [('mic', "a")]
+    assert stage.metrics()['merged'] == 1 and stage.metrics()['dropped'] == 1
+
+
+def test_drop_policies():
+    for policy, expected in ((DROP_OLDEST, [2, 3]), (DROP_NEWEST, [1, 2])):
+        stage, gate, processed = gated_stage(policy)
+        results = [stage.submit(i) for i in (1, 2, 3)]
+        gate.set()
+        stage.close()
+        assert processed == ['ocupado'] + expected
+        assert results.count(DROPPED) == (policy == DROP_NEWEST)
+
+
+def test_block_policy_waits_for_space():
+    stage, gate, processed = gated_stage(BLOCK, max_queue=1)
+    stage.submit(1)
+    assert stage.submit(2, timeout=0.05) == DROPPED
+    threading.Timer(0.05, gate.set).start()
+    assert stage.submit(3, timeout=5) == QUEUED
+    stage.close()
+    assert processed == ['ocupado', 1, 3]
+
+
+def test_ordered_stage_delivers_in_arrival_order():
+    delivered = []
+    pipeline = Pipeline()
+    pipeline.add_stage('lento', lambda i: time.sleep(0.01 * (5 - i)) or i, workers=5, max_queue=10,
+                       ordered=True, output='saida')
+    pipeline.add_stage('saida', delivered.append, max_queue=10)
+    pipeline.start()
+    for i in range(5):
+        pipeline.submit('lento', i)
+    assert pipeline.shutdown(drain=True, timeout=5)
+    assert delivered == [0, 1, 2, 3, 4]
+
+
+def test_join_waits_for_results_to_be_delivered():
+    delivered = []
+
+    def work(item):
+        if item == 'b':
+            time.sleep(0.2)
+        return item
+
+    def output(item):
+        if item == 'a':
+            time.sleep(0.4)
+        delivered.append(item)
+
+    stage = Stage('teste', work, workers=2, max_queue=4, output=output)
+    stage.start()
+    stage.submit('a')
+    stage.submit('b')
+    assert stage.join(timeout=5)
+    assert sorted(delivered) == ['a', 'b']
+    stage.close()
+
+
+def test_close_without_drain_reports_discarded_items():
+    dropped = []
+    stage, gate, processed = gated_stage(BLOCK, max_queue=4, on_drop=dropped.append)
+    stage.submit(1)
+    stage.submit(2)
+    gate.set()
+    stage.close(drain=False, timeout=5)
+    assert processed == ['ocupado']
+    assert dropped == [1, 2]
+
+
+def test_merge_audio_blocks_keeps_capture_order():
+    mic = [('mic', np.array([1, 2], dtype=np.int16), 0.0)]
+    system = [('sistema', np.array([9], dtype=np.int16), 0.1)]
+    mic_later = [('mic', np.array([3], dtype=np.int16), 0.2)]
+    mic_last = [('mic', np.array([4], dtype=np.int16), 0.3)]
+
+    merged = merge_audio_blocks(merge_audio_blocks(merge_audio_blocks(mic, system), mic_later), mic_last)
+
+    assert [(source, block.tolist(), at) for source, block, at in merged] == [
+        ('mic', [1, 2], 0.0), ('sistema', [9], 0.1), ('mic', [3, 4], 0.2)]
+    assert [block.tolist() for _, block, _ in mic] == [[1, 2]]
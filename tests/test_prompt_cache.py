@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from assistant import check_request_shape, format_usage, usage_counts
+
+
+@pytest.fixture
+def loaded(assistant, tmp_path):
+    path = tmp_path / "tese.txt"
+    path.write_text("Capítulo 1. A tese trata de transcrição de reuniões em tempo real.\n" * 20, encoding='utf-8')
+    assistant.load_document(str(path))
+    return assistant
+
+
+def test_document_is_a_stable_cached_system_block(loaded):
+    questions = ["Qual é o tema da tese?", "Quantos capítulos tem o trabalho?"]
+    for question in questions:
+        loaded.ask_claude(question)
+    first, second = loaded.client.requests
+
+    document_blocks = [block for block in first['system'] if block.get('cache_control')]
+    assert len(document_blocks) == 1
+    assert document_blocks[0]['cache_control'] == {"type": "ephemeral"}
+    assert document_blocks[0]['text'].startswith("DOCUMENTO:\nCapítulo 1.")
+    # O prefixo em cache é tudo até o bloco marcado: precisa ser idêntico byte a byte
+    assert first['system'][-1] is document_blocks[0]
+    assert json.dumps(first['system']).encode('utf-8') == json.dumps(second['system']).encode('utf-8')
+
+    # Só a mensagem do usuário muda, e o documento não aparece nela
+    assert {key: value for key, value in first.items() if key != 'messages'} == \
+           {key: value for key, value in second.items() if key != 'messages'}
+    for request, question in zip((first, second), questions):
+        assert request['messages'] == [{'role': 'user', 'content': f"PERGUNTA: {question}"}]
+
+
+def test_build_claude_request_matches_what_is_sent(loaded):
+    request, plan = loaded.build_claude_request("Qual é o tema da tese?")
+    loaded.ask_claude("Qual é o tema da tese?")
+    assert plan['mode'] == 'documento inteiro'
+    assert loaded.client.requests == [request]
+
+
+@pytest.mark.parametrize("change", [
+    lambda r: r.pop('model'),
+    lambda r: r['system'][-1].update(cache_control={"type": "persistent"}),
+    lambda r: r['messages'].append({'role': 'assistant', 'content': "ok"}),
+    lambda r: r['messages'][0].update(content=""),
+])
+def test_fake_client_rejects_malformed_requests(loaded, change):
+    request, _ = loaded.build_claude_request("Qual é o tema da tese?")
+    check_request_shape(request)
+    change(request)
+    with pytest.raises(ValueError):
+        loaded.client.messages.stream(**request)
+
+
+def test_second_question_reads_the_document_from_the_prompt_cache(loaded):
+    first = loaded.ask_claude("Qual é o tema da tese?")
+    second = loaded.ask_claude("Quantos capítulos tem o trabalho?")
+
+    written = usage_counts(first['usage'])
+    read = usage_counts(second['usage'])
+    assert written['cache_read_input_tokens'] == 0 and written['cache_creation_input_tokens'] > 0
+    assert read['cache_creation_input_tokens'] == 0
+    assert read['cache_read_input_tokens'] == written['cache_creation_input_tokens']
+    # A parte não cacheada é só a pergunta
+    assert read['input_tokens'] < read['cache_read_input_tokens']
+
+    assert "(0 do cache, 0%;" in format_usage(first['usage'])
+    status = format_usage(second['usage'])
+    assert f"({read['cache_read_input_tokens']:,} do cache," in status
+    assert "; 0 gravados no cache" in status
+
+
+def test_changed_document_is_written_to_the_prompt_cache_again(loaded, tmp_path):
+    loaded.ask_claude("Qual é o tema da tese?")
+    other = tmp_path / "anexo.txt"
+    other.write_text("Anexo A. Questionário aplicado aos participantes.\n" * 10, encoding='utf-8')
+    loaded.load_document(str(other))
+
+    usage = usage_counts(loaded.ask_claude("Qual é o tema da tese?")['usage'])
+    assert usage['cache_read_input_tokens'] == 0 and usage['cache_creation_input_tokens'] > 0
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from conftest import speech_like
+from segment_transcription import SegmentTranscriber, join_segments, split_at_silence
+from vad import VoiceActivityDetector
+
+RATE = 16000
+
+
+class TransientError(Exception):
+    pass
+
+
+class FakeRecognizer:
+    """Reconhece o trecho pelo valor das amostras; latência e falhas são definidas por trecho"""
+
+    def __init__(self, latencies=None, failures=None, permanent=()):
+        self.latencies = latencies or {}
+        self.failures = dict(failures or {})   # trecho -> falhas antes de dar certo
+        self.permanent = set(permanent)
+        self.calls = {}
+        self.completed = []
+        self.lock = threading.Lock()
+
+    def __call__(self, samples):
+        index = int(samples[0])
+        with self.lock:
+            self.calls[index] = self.calls.get(index, 0) + 1
+            fail = index in self.permanent or self.failures.get(index, 0) > 0
+            if index in self.failures and self.failures[index] > 0:
+                self.failures[index] -= 1
+        time.sleep(self.latencies.get(index, 0.0))
+        if fail:
+            raise TransientError(f"trecho {index} falhou")
+        with self.lock:
+            self.completed.append(index)
+        return f"texto {index}"
+
+
+def numbered_audio(count, length=160):
+    """Trechos consecutivos em que todas as amostras do trecho i valem i"""
+    samples = np.repeat(np.arange(count, dtype=np.int16), length)
+    segments = [(i * length, (i + 1) * length) for i in range(count)]
+    return samples, segments
+
+
+def transcriber(recognizer, **options):
+    options.setdefault('max_workers', 8)
+    return SegmentTranscriber(recognizer, backoff=0.0, retry_on=(TransientError,), **options)
+
+
+def test_results_keep_audio_order_when_completion_is_shuffled():
+    samples, segments = numbered_audio(6)
+    # O primeiro trecho é o mais lento: termina por último
+    recognizer = FakeRecognizer(latencies={i: 0.03 * (6 - i) for i in range(6)})
+
+    texts, errors = transcriber(recognizer).transcribe(samples, segments)
+
+    assert errors == {}
+    assert texts == [f"texto {i}" for i in range(6)]
+    assert recognizer.completed != sorted(recognizer.completed)
+
+
+def test_failed_segment_is_retried_alone():
+    samples, segments = numbered_audio(5)
+    recognizer = FakeRecognizer(failures={2: 1})
+
+    texts, errors = transcriber(recognizer, retries=2).transcribe(samples, segments)
+
+    assert errors == {}
+    assert texts[2] == "texto 2"
+    assert recognizer.calls == {0: 1, 1: 1, 2: 2, 3: 1, 4: 1}
+
+
+def test_segment_failing_every_attempt_is_reported_without_losing_the_others():
+    samples, segments = numbered_audio(4)
+    recognizer = FakeRecognizer(permanent={1})
+
+    texts, errors = transcriber(recognizer, retries=2).transcribe(samples, segments)
+
+    assert list(errors) == [1]
+    assert isinstance(errors[1], TransientError)
+    assert recognizer.calls[1] == 3
+    assert join_segments(texts) == "texto 0 [...] texto 2 texto 3"
+
+
+def test_empty_segments_count_as_empty_text():
+    samples, segments = numbered_audio(3)
+
+    def recognizer(clip):
+        if clip[0] == 1:
+            raise LookupError("sem fala")
+        return f"texto {clip[0]}"
+
+    texts, errors = SegmentTranscriber(recognizer, empty_on=(LookupError,)).transcribe(samples, segments)
+    assert errors == {}
+    assert texts == ["texto 0", "", "texto 2"]
+
+
+def test_wall_time_follows_slowest_segment_not_the_sum():
+    samples, segments = numbered_audio(8)
+    latencies = {i: 0.05 + 0.03 * i for i in range(8)}   # soma 1,24 s, maior 0,26 s
+    recognizer = FakeRecognizer(latencies=latencies)
+
+    start = time.perf_counter()
+    texts, errors = transcriber(recognizer, max_workers=8).transcribe(samples, segments)
+    elapsed = time.perf_counter() - start
+
+    assert errors == {}
+    assert max(latencies.values()) <= elapsed < max(latencies.values()) + 0.2
+    assert elapsed < sum(latencies.values()) / 3
+
+
+def test_progress_is_reported_per_segment():
+    samples, segments = numbered_audio(4)
+    progress = []
+    transcriber(FakeRecognizer()).transcribe(samples, segments, on_progress=lambda done, total: progress.append((done, total)))
+    assert progress == [(1, 4), (2, 4), (3, 4), (4, 4)]
+
+
+@pytest.mark.parametrize("max_segment", [10.0, 20.0])
+def test_split_at_silence_cuts_in_pauses(max_segment):
+    samples = speech_like(60, seed=3)
+    vad = VoiceActivityDetector(RATE)
+    vad.calibrate(samples)
+
+    segments = split_at_silence(samples, RATE, vad, max_segment=max_segment, min_segment=max_segment / 3)
+
+    assert segments[0][0] == 0 and segments[-1][1] == len(samples)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(segments, segments[1:]))
+    assert all(end - start <= max_segment * RATE for start, end in segments)
+    rms, _ = vad.frame_features(samples)
+    for _, end in segments[:-1]:
+        assert rms[end // vad.frame_size] < vad.energy_threshold, f"corte em {end / RATE:.2f}s no meio de uma fala"
+
+
+def test_short_audio_is_a_single_segment():
+    vad = VoiceActivityDetector(RATE)
+    assert split_at_silence(np.zeros(RATE * 5, dtype=np.int16), RATE, vad) == [(0, RATE * 5)]
+    assert split_at_silence(np.zeros(0, dtype=np.int16), RATE, vad) == []
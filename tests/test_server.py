@@ -0,0 +1,244 @@
+import asyncio
+import http.client
+import io
+import json
+import os
+import socket
+import threading
+import time
+import wave
+
+import pytest
+
+from asr_backends import FakeBackend
+from conftest import speech_like
+from server import TranscriptionServer
+
+
+class Client:
+    """Servidor rodando num laço asyncio em outra thread, acessado por HTTP de verdade"""
+
+    def __init__(self, server, host, port, documents):
+        self.server = server
+        self.host = host
+        self.port = port
+        self.documents = documents
+
+    def request(self, method, path, body=None, json_body=None, headers=None):
+        if json_body is not None:
+            body = json.dumps(json_body).encode('utf-8')
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            data = response.read()
+        finally:
+            connection.close()
+        if response.getheader('Content-Type', '').startswith('application/json'):
+            data = json.loads(data)
+        return response.status, data
+
+    def raw(self, data):
+        """Envia bytes sem validação do cliente; retorna a linha de status"""
+        with socket.create_connection((self.host, self.port), timeout=10) as sock:
+            sock.sendall(data)
+            return sock.makefile('rb').readline().decode('latin-1')
+
+
+def wav_bytes(samples, rate=16000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def start_server(assistant, tmp_path):
+    documents = tmp_path / "documentos"
+    documents.mkdir()
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    servers = []
+
+    def start(**options):
+        options.setdefault('documents_dir', str(documents))
+        server = TranscriptionServer(assistant, **options)
+        host, port = asyncio.run_coroutine_threadsafe(server.start("127.0.0.1", 0), loop).result(10)
+        servers.append(server)
+        return Client(server, host, port, documents)
+
+    yield start
+    for server in servers:
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+    loop.close()
+
+
+def wait_complete(client, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        _, data = client.request('GET', '/documents')
+        if data['documents'] and all(d['complete'] for d in data['documents']):
+            return data['documents']
+        time.sleep(0.02)
+    raise AssertionError("documento não foi convertido")
+
+
+def test_session_transcribes_chunks_in_upload_order(start_server):
+    client = start_server()
+    status, data = client.request('POST', '/sessions')
+    assert status == 201
+    session = data['session']
+
+    for seed in (1, 2):
+        status, chunk = client.request('POST', f'/sessions/{session}/audio', body=wav_bytes(speech_like(4, seed=seed)))
+        assert status == 200
+        assert chunk['text'].startswith("fala ")
+
+    status, transcript = client.request('GET', f'/sessions/{session}/transcript')
+    assert status == 200
+    assert [chunk['seq'] for chunk in transcript['chunks']] == [0, 1]
+    assert transcript['text'] == " ".join(chunk['text'] for chunk in transcript['chunks'])
+
+
+def test_ask_uses_document_from_documents_dir(start_server):
+    client = start_server()
+    (client.documents / "tese.txt").write_text("A tese trata de transcrição de reuniões.", encoding='utf-8')
+
+    status, data = client.request('POST', '/documents', json_body={'path': "tese.txt"})
+    assert status == 201
+    assert data['path'] == os.path.realpath(client.documents / "tese.txt")
+    wait_complete(client)
+
+    status, answer = client.request('POST', '/ask', json_body={'question': "Qual é o tema da tese?"})
+    assert status == 200
+    assert answer['source'] == 'claude'
+    assert answer['response'].startswith("Resposta:")
+
+    status, again = client.request('POST', '/ask', json_body={'question': "Qual é o tema da tese?"})
+    assert status == 200
+    assert again['source'] == 'cache'
+    assert again['response'] == answer['response']
+
+
+@pytest.mark.parametrize("body", [{'question': 123}, {'question': ["x"]}, {'question': "  "}, {'session': ["x"]}, {}])
+def test_ask_rejects_missing_or_non_text_questions(start_server, body):
+    client = start_server()
+    status, data = client.request('POST', '/ask', json_body=body)
+    assert status == 400
+    assert 'error' in data
+
+
+@pytest.mark.parametrize("path, status", [
+    ("../fora.txt", 400),
+    ("/etc/passwd", 400),
+    ("link.txt", 400),
+    ("notas.csv", 400),
+    ("sumiu.txt", 404),
+    ("", 400),
+])
+def test_documents_outside_documents_dir_are_rejected(start_server, tmp_path, path, status):
+    client = start_server()
+    outside = tmp_path / "fora.txt"
+    outside.write_text("segredo", encoding='utf-8')
+    (client.documents / "notas.csv").write_text("a,b", encoding='utf-8')
+    os.symlink(outside, client.documents / "link.txt")
+
+    response_status, data = client.request('POST', '/documents', json_body={'path': path})
+    assert response_status == status
+    assert 'error' in data
+    assert client.server.assistant.corpus.documents() == []
+
+
+def test_documents_route_disabled_without_documents_dir(start_server):
+    client = start_server(documents_dir=None)
+    status, _ = client.request('POST', '/documents', json_body={'path': "tese.txt"})
+    assert status == 404
+
+
+@pytest.mark.parametrize("query", ["rate=0", "rate=-16000", "channels=0", "rate=abc"])
+def test_invalid_raw_audio_parameters_are_bad_request(start_server, query):
+    client = start_server()
+    session = client.request('POST', '/sessions')[1]['session']
+    status, data = client.request('POST', f'/sessions/{session}/audio?{query}', body=speech_like(2).tobytes())
+    assert status == 400
+    assert 'error' in data
+
+
+def test_raw_pcm_audio_is_transcribed(start_server):
+    client = start_server()
+    session = client.request('POST', '/sessions')[1]['session']
+    status, chunk = client.request('POST', f'/sessions/{session}/audio?rate=16000&channels=1',
+                                   body=speech_like(3).tobytes())
+    assert status == 200
+    assert chunk['text'].startswith("fala ")
+
+
+@pytest.mark.parametrize("length", ["-5", "abc", "1e3"])
+def test_invalid_content_length_is_bad_request(start_server, length):
+    client = start_server()
+    status_line = client.raw(f"POST /ask HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode('latin-1'))
+    assert status_line.split()[1] == "400"
+
+
+def test_body_over_limit_is_rejected(start_server):
+    client = start_server(max_body_mb=0.001)
+    status_line = client.raw(b"POST /ask HTTP/1.1\r\nContent-Length: 5000\r\n\r\n")
+    assert status_line.split()[1] == "413"
+
+
+def test_sessions_are_capped_and_expire_when_idle(start_server):
+    client = start_server(max_sessions=2, session_idle_minutes=1)
+    first = client.request('POST', '/sessions')[1]['session']
+    client.request('POST', '/sessions')
+    status, data = client.request('POST', '/sessions')
+    assert status == 503
+
+    client.server.sessions[first].last_used -= 120
+    status, _ = client.request('POST', '/sessions')
+    assert status == 201
+    assert client.request('GET', f'/sessions/{first}/transcript')[0] == 404
+    assert len(client.server.sessions) == 2
+
+
+def test_asr_concurrency_limits_recognizer_calls(start_server, assistant):
+    """Áudios longos viram vários trechos; o total de chamadas simultâneas ao reconhecedor respeita o limite"""
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+    original = FakeBackend._transcribe
+
+    def counting(self, samples, rate, energy_threshold):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        try:
+            time.sleep(0.05)
+            return original(self, samples, rate, energy_threshold)
+        finally:
+            with lock:
+                active[0] -= 1
+
+    assistant.asr_backend._transcribe = counting.__get__(assistant.asr_backend)
+    client = start_server(asr_concurrency=2)
+    sessions = [client.request('POST', '/sessions')[1]['session'] for _ in range(4)]
+    audio = wav_bytes(speech_like(75))
+    results = []
+
+    def upload(session):
+        results.append(client.request('POST', f'/sessions/{session}/audio', body=audio))
+
+    threads = [threading.Thread(target=upload, args=(session,)) for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+
+    assert [status for status, _ in results] == [200] * 4
+    assert all(len(chunk['text'].split("fala ")) > 2 for _, chunk in results), "cada áudio deveria ter vários trechos"
+    assert peak[0] == 2
@@ -0,0 +1,80 @@
+import time
+
+from response_cache import ResponseCache
+from similar_cache import SimilarQuestionCache
+
+QUESTION = "Qual é a metodologia usada no capítulo três?"
+VARIATION = "é, qual a metodologia usada no capítulo três"
+
+
+def answers(**responses):
+    """fetch() a partir de um dicionário chave -> resposta"""
+    return responses.get
+
+
+def test_similar_question_finds_answer():
+    cache = SimilarQuestionCache(threshold=0.7)
+    cache.add("escopo", QUESTION, "chave")
+    response, similarity, original = cache.lookup("escopo", VARIATION, answers(chave="resposta"))
+    assert response == "resposta" and original == QUESTION and similarity >= 0.7
+    assert cache.lookup("outro escopo", VARIATION, answers(chave="resposta")) is None
+
+
+def test_expired_answers_are_not_returned():
+    cache = SimilarQuestionCache(threshold=0.7, ttl_seconds=60)
+    fetch = answers(antiga="antiga", recente="recente")
+    cache.add("escopo", QUESTION, "antiga", created_at=time.time() - 61)
+    assert cache.lookup("escopo", VARIATION, fetch) is None
+    assert len(cache) == 0
+
+    cache.add("escopo", QUESTION, "recente", created_at=time.time() - 30)
+    assert cache.lookup("escopo", VARIATION, fetch)[0] == "recente"
+    cache._entries[next(iter(cache._entries))]['created_at'] -= 31
+    assert cache.lookup("escopo", VARIATION, fetch) is None
+    assert len(cache) == 0 and cache._buckets == {} and cache._seen == {}
+
+
+def test_oldest_entries_leave_the_index_above_the_cap():
+    cache = SimilarQuestionCache(threshold=0.9, max_entries=3)
+    questions = [f"pergunta número {n} sobre o trabalho" for n in ("um", "dois", "três", "quatro", "cinco")]
+    for i, question in enumerate(questions):
+        cache.add("escopo", question, f"chave {i}")
+    fetch = {f"chave {i}": f"resposta {i}" for i in range(5)}.get
+
+    assert len(cache) == 3
+    assert cache.lookup("escopo", questions[0], fetch) is None
+    assert cache.lookup("escopo", questions[1], fetch) is None
+    assert cache.lookup("escopo", questions[4], fetch)[0] == "resposta 4"
+    indexed = {entry_id for bucket in cache._buckets.values() for entry_id in bucket}
+    assert indexed == set(cache._entries)
+
+
+def test_answers_evicted_from_response_cache_are_not_served():
+    responses = ResponseCache(path=":memory:", max_size_mb=1)
+    cache = SimilarQuestionCache(threshold=0.7)
+    responses.put("chave", "resposta", question=QUESTION, scope="escopo")
+    cache.add("escopo", QUESTION, "chave")
+
+    def fetch(key):
+        return responses.get(key, count=False)
+
+    assert cache.lookup("escopo", VARIATION, fetch)[0] == "resposta"
+    # Uma resposta grande empurra a antiga para fora pelo limite de tamanho
+    responses.put("grande", "x" * (1024 * 1024), question="outra pergunta", scope="escopo")
+    assert responses.get("chave", count=False) is None
+    assert cache.lookup("escopo", VARIATION, fetch) is None
+    assert len(cache) == 0
+    assert responses.stats()['hits'] == 0 and responses.stats()['misses'] == 0
+
+
+def test_loaded_entries_keep_their_age_from_the_response_cache():
+    responses = ResponseCache(path=":memory:", ttl_seconds=60)
+    responses.put("chave", "resposta", question=QUESTION, scope="escopo")
+    responses._conn.execute("UPDATE responses SET created_at = created_at - 30")
+
+    cache = SimilarQuestionCache(threshold=0.7, ttl_seconds=60)
+    cache.ensure_loaded("escopo", responses.entries_for_scope)
+    entry = next(iter(cache._entries.values()))
+    assert entry['key'] == "chave"
+    assert time.time() - entry['created_at'] >= 30
+    assert cache.lookup("escopo", VARIATION, responses.get)[0] == "resposta"
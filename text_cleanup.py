@@ -0,0 +1,110 @@
+import math
+import re
+from collections import Counter
+
+# Versão das regras de limpeza (parte da chave do cache de extração)
+CLEANUP_VERSION = 1
+
+# Média de caracteres por token em texto português (estimativa local, sem API)
+CHARS_PER_TOKEN = 3.5
+
+# Cabeçalhos e rodapés ficam nas primeiras/últimas linhas de cada página
+EDGE_LINES = 3
+
+HORIZONTAL_SPACE = re.compile(r'[ \t\u00a0\f\v]+')
+EXTRA_BLANK_LINES = re.compile(r'\n{3,}')
+# "pala-\nvra" -> "palavra" (só quando a linha seguinte continua em minúscula)
+HYPHENATED_BREAK = re.compile(r'(?<=[^\W\d_])-[ \t]*\n[ \t]*(?=[a-zà-öø-ÿ])')
+DIGITS = re.compile(r'\d+')
+# Numeração de página depois de trocar dígitos por '#': "12", "- 12 -", "Página 3 de 40",
+# ou no começo/fim de um cabeçalho: "Relatório | pág. 7"
+PAGE_NUMBER = r'(p[áa]g(ina)?\.? ?)?#( ?(de|/|of) ?#)?'
+PAGE_NUMBER_LINE = re.compile(rf'^[-–— ]*{PAGE_NUMBER}[-–— ]*$|^p[áa]g(ina)?\.? ?#|p[áa]g(ina)?\.? ?#( ?(de|/|of) ?#)?$')
+
+
+def estimate_tokens(text):
+    """Estimativa local de tokens do texto"""
+    return tokens_for_chars(len(text))
+
+
+def tokens_for_chars(char_count):
+    return int(math.ceil(char_count / CHARS_PER_TOKEN))
+
+
+def line_key(line):
+    """Forma comparável de uma linha; na numeração de página os números são ignorados,
+    então 'Página 3 de 40' e 'Página 4 de 40' viram a mesma linha"""
+    key = HORIZONTAL_SPACE.sub(' ', line.strip().lower())
+    numbered = DIGITS.sub('#', key)
+    return numbered if PAGE_NUMBER_LINE.search(numbered) else key
+
+
+def _edge_positions(lines):
+    """Índices das linhas não vazias no início e no fim da página"""
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    return set(filled[:EDGE_LINES]) | set(filled[-EDGE_LINES:])
+
+
+def find_repeated_lines(page_texts, min_ratio=0.4, min_pages=3):
+    """Linhas de borda que se repetem em muitas páginas (cabeçalhos, rodapés, numeração)"""
+    page_texts = [text for text in page_texts if text.strip()]
+    if len(page_texts) < min_pages:
+        return set()
+    counts = Counter()
+    for text in page_texts:
+        lines = text.split('\n')
+        counts.update({line_key(lines[i]) for i in _edge_positions(lines)})
+    needed = max(min_pages, int(math.ceil(min_ratio * len(page_texts))))
+    return {key for key, count in counts.items() if count >= needed and key}
+
+
+def strip_repeated_lines(text, repeated):
+    """Remove da página as linhas de borda marcadas como repetidas; retorna (texto, linhas removidas)"""
+    lines = text.split('\n')
+    drop = {i for i in _edge_positions(lines) if line_key(lines[i]) in repeated}
+    if not drop:
+        return text, 0
+    kept = '\n'.join(line for i, line in enumerate(lines) if i not in drop)
+    return EXTRA_BLANK_LINES.sub('\n\n', kept).strip(), len(drop)
+
+
+def clean_text(text):
+    """Junta palavras hifenizadas na quebra de linha e colapsa espaços e linhas em branco"""
+    text = HYPHENATED_BREAK.sub('', text)
+    text = HORIZONTAL_SPACE.sub(' ', text)
+    text = '\n'.join(line.strip() for line in text.split('\n'))
+    return EXTRA_BLANK_LINES.sub('\n\n', text).strip()
+
+
+def remove_repeated_lines(pages):
+    """Aplica a remoção de linhas repetidas em {página: texto}; retorna (páginas, linhas removidas)"""
+    repeated = find_repeated_lines(pages.values())
+    if not repeated:
+        return pages, 0
+    cleaned = {}
+    removed = 0
+    for page, text in pages.items():
+        cleaned[page], count = strip_repeated_lines(text, repeated)
+        removed += count
+    return cleaned, removed
+
+
+def cleanup_report(chars_before, chars_after, lines_removed=0):
+    """Resumo da limpeza: caracteres e tokens estimados antes/depois"""
+    return {
+        'chars_before': chars_before,
+        'chars_after': chars_after,
+        'tokens_before': tokens_for_chars(chars_before),
+        'tokens_after': tokens_for_chars(chars_after),
+        'lines_removed': lines_removed,
+    }
+
+
+def format_report(report):
+    """Texto curto para a interface"""
+    saved = 1.0 - report['chars_after'] / report['chars_before'] if report['chars_before'] else 0.0
+    text = (f"Limpeza: {report['chars_before']:,} → {report['chars_after']:,} caracteres "
+            f"(~{report['tokens_before']:,} → ~{report['tokens_after']:,} tokens, -{saved:.0%})")
+    if report['lines_removed']:
+        text += f", {report['lines_removed']:,} linhas de cabeçalho/rodapé removidas"
+    return text
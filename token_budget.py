@@ -0,0 +1,97 @@
+from text_cleanup import estimate_tokens
+
+# Tokens extras por mensagem/bloco (papéis, separadores) além do texto
+MESSAGE_OVERHEAD_TOKENS = 16
+
+# Tamanho do resumo de cada página quando a pergunta não casa com nenhum trecho
+SUMMARY_CHARS_PER_PAGE = 240
+
+
+class TokenBudgetError(Exception):
+    """O pedido não cabe no orçamento nem depois de reduzido"""
+
+
+class TokenBudget:
+    """Orçamento de tokens do prompt, verificado localmente antes de chamar a API.
+
+    O limite é o menor entre a janela de contexto (descontada a reserva para a
+    resposta) e o que dá para processar dentro do orçamento de latência
+    (``latency_seconds`` x ``prefill_tokens_per_second``). Acima do limite o
+    contexto é reduzido sempre na mesma ordem: documento inteiro → trechos mais
+    relevantes → resumo das páginas → recusa com mensagem clara.
+    """
+
+    def __init__(self, context_tokens=200000, max_output_tokens=1500, latency_seconds=None,
+                 prefill_tokens_per_second=10000):
+        self.context_tokens = context_tokens
+        self.max_output_tokens = max_output_tokens
+        self.latency_seconds = latency_seconds
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+
+    @property
+    def limit(self):
+        """Máximo de tokens de entrada por pedido"""
+        limit = self.context_tokens - self.max_output_tokens
+        if self.latency_seconds:
+            limit = min(limit, int(self.latency_seconds * self.prefill_tokens_per_second))
+        return limit
+
+    def estimate(self, *texts):
+        """Tokens estimados de um prompt formado pelos textos"""
+        return sum(estimate_tokens(text) + MESSAGE_OVERHEAD_TOKENS for text in texts if text)
+
+    def estimated_seconds(self, tokens):
+        """Tempo estimado para a API processar o prompt"""
+        return tokens / float(self.prefill_tokens_per_second)
+
+    def fits(self, tokens):
+        return tokens <= self.limit
+
+    def available(self, fixed_tokens):
+        """Tokens que sobram para o documento depois das partes fixas do prompt"""
+        available = self.limit - fixed_tokens
+        if available <= 0:
+            raise TokenBudgetError(
+                f"As instruções e a pergunta já ocupam ~{fixed_tokens:,} tokens e o limite é {self.limit:,}. "
+                f"Encurte a transcrição ou aumente o orçamento no config.py."
+            )
+        return available
+
+
+def fit_chunks(chunks, available_tokens):
+    """Mantém os trechos de maior pontuação que cabem no orçamento, na ordem do documento.
+
+    ``chunks`` vem de ``DocumentIndex.search`` (com 'score'). O corte é
+    determinístico: empates de pontuação ficam com o trecho que aparece antes.
+    """
+    ranked = sorted(enumerate(chunks), key=lambda item: (-item[1].get('score', 0.0), item[0]))
+    kept = []
+    used = 0
+    for position, chunk in ranked:
+        cost = estimate_tokens(chunk['text']) + MESSAGE_OVERHEAD_TOKENS
+        if used + cost > available_tokens:
+            continue
+        kept.append(position)
+        used += cost
+    return [chunks[position] for position in sorted(kept)]
+
+
+def summarize_pages(pages, available_tokens, chars_per_page=SUMMARY_CHARS_PER_PAGE):
+    """Resumo extrativo: o começo de cada página, até esgotar o orçamento.
+
+    ``pages`` é [(identificação da página, texto)] em ordem; a identificação
+    (número da página, ou (documento, página)) volta junto de cada resumo.
+    """
+    summary = []
+    used = 0
+    for page, text in pages:
+        text = ' '.join(text.split())
+        if not text:
+            continue
+        excerpt = text if len(text) <= chars_per_page else text[:chars_per_page].rsplit(' ', 1)[0] + '...'
+        cost = estimate_tokens(excerpt) + MESSAGE_OVERHEAD_TOKENS
+        if used + cost > available_tokens:
+            break
+        summary.append((page, excerpt))
+        used += cost
+    return summary
@@ -0,0 +1,149 @@
+import threading
+
+import numpy as np
+
+from streaming import to_mono_int16
+
+
+class VoiceActivityDetector:
+    """Detecção de voz por energia e taxa de cruzamento por zero (ZCR), vetorizada em NumPy.
+
+    O limiar de energia é calibrado a partir do primeiro segundo de áudio de
+    cada dispositivo, em vez do valor fixo ``energy_threshold = 300``.
+    """
+
+    def __init__(self, rate, frame_duration=0.03, calibration_duration=1.0,
+                 noise_factor=3.0, min_energy_threshold=100.0, max_zcr=0.35,
+                 hangover=0.2, keep_silence=0.25):
+        self.rate = rate
+        self.frame_size = max(1, int(rate * frame_duration))
+        self.calibration_samples = int(rate * calibration_duration)
+        self.noise_factor = noise_factor
+        self.min_energy_threshold = min_energy_threshold
+        self.max_zcr = max_zcr
+        self.hangover_frames = max(0, int(hangover / frame_duration))
+        self.keep_silence_frames = max(0, int(keep_silence / frame_duration))
+
+        # Antes da calibração usar o mesmo valor que o reconhecedor usava
+        self.energy_threshold = 300.0
+        self.calibrated = False
+        self._calibration_blocks = []
+        self._calibration_count = 0
+        self._lock = threading.Lock()
+
+    def frame_features(self, audio):
+        """Retorna (rms, zcr) por quadro; o resto que não completa um quadro é ignorado"""
+        samples = to_mono_int16(audio)
+        n_frames = len(samples) // self.frame_size
+        if n_frames == 0:
+            empty = np.zeros(0, dtype=np.float32)
+            return empty, empty
+        frames = samples[:n_frames * self.frame_size].reshape(n_frames, self.frame_size).astype(np.float32)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / float(self.frame_size - 1 or 1)
+        return rms, zcr.astype(np.float32)
+
+    def calibrate(self, audio):
+        """Calibra o limiar de energia usando o ruído de fundo do trecho informado"""
+        rms, _ = self.frame_features(np.asarray(audio)[:self.calibration_samples])
+        if len(rms) == 0:
+            return self.energy_threshold
+        # O ruído de fundo é a parte mais silenciosa do trecho de calibração
+        noise_floor = float(np.percentile(rms, 20))
+        noise_spread = float(np.std(rms[rms <= np.percentile(rms, 50)])) if len(rms) > 1 else 0.0
+        self.energy_threshold = max(self.min_energy_threshold,
+                                    noise_floor * self.noise_factor + noise_spread)
+        self.calibrated = True
+        return self.energy_threshold
+
+    def observe(self, block):
+        """Acumula o primeiro segundo de um fluxo contínuo e calibra quando completo"""
+        if self.calibrated:
+            return
+        with self._lock:
+            if self.calibrated:
+                return
+            mono = to_mono_int16(block)
+            self._calibration_blocks.append(mono)
+            self._calibration_count += len(mono)
+            if self._calibration_count >= self.calibration_samples:
+                self.calibrate(np.concatenate(self._calibration_blocks))
+                self._calibration_blocks = []
+
+    def speech_mask(self, audio):
+        """Máscara booleana por quadro indicando presença de fala"""
+        rms, zcr = self.frame_features(audio)
+        if len(rms) == 0:
+            return np.zeros(0, dtype=bool)
+        loud = rms >= self.energy_threshold
+        # ZCR alto com pouca energia é ruído (chiado, ventilador); fala sonora tem ZCR baixo
+        mask = loud & ((zcr <= self.max_zcr) | (rms >= 2.0 * self.energy_threshold))
+        if self.hangover_frames and mask.any():
+            # Estender cada quadro de fala para não cortar finais de palavras
+            kernel = np.ones(self.hangover_frames + 1, dtype=np.int32)
+            mask = np.convolve(mask.astype(np.int32), kernel)[:len(mask)] > 0
+        return mask
+
+    def is_speech(self, block):
+        """Indica se um bloco curto contém fala (usado pelo segmentador ao vivo)"""
+        self.observe(block)
+        mask = self.speech_mask(block)
+        return bool(mask.any()) if len(mask) else False
+
+    def speech_ratio(self, audio):
+        """Proporção de quadros com fala (0.0 a 1.0)"""
+        mask = self.speech_mask(audio)
+        return float(mask.mean()) if len(mask) else 0.0
+
+    def speech_regions(self, audio, min_silence=0.6):
+        """Trechos de fala contínua [(início, fim)] em amostras.
+
+        Pausas menores que ``min_silence`` segundos não separam trechos; cada
+        trecho ganha ``keep_silence`` de margem, como no ``trim``.
+        """
+        samples = to_mono_int16(audio)
+        mask = self.speech_mask(samples)
+        if len(mask) == 0 or not mask.any():
+            return []
+        edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        gap_frames = int(min_silence * self.rate) // self.frame_size
+
+        regions = []
+        for start, end in zip(starts, ends):
+            if regions and start - regions[-1][1] < gap_frames:
+                regions[-1][1] = end
+            else:
+                regions.append([start, end])
+        last_frame = len(mask)
+        return [(max(0, start - self.keep_silence_frames) * self.frame_size,
+                 len(samples) if end + self.keep_silence_frames >= last_frame
+                 else (end + self.keep_silence_frames) * self.frame_size)
+                for start, end in regions]
+
+    def trim(self, audio):
+        """Remove silêncio inicial, final e pausas internas longas.
+
+        Retorna (audio_int16_mono, speech_ratio). Pausas internas são encurtadas
+        para ``keep_silence`` em vez de removidas, para o reconhecedor ainda
+        perceber a separação entre frases.
+        """
+        samples = to_mono_int16(audio)
+        mask = self.speech_mask(samples)
+        if len(mask) == 0 or not mask.any():
+            return samples[:0], 0.0
+        ratio = float(mask.mean())
+
+        keep = mask.copy()
+        if self.keep_silence_frames:
+            # Manter um pouco de silêncio em volta de cada trecho de fala
+            kernel = np.ones(2 * self.keep_silence_frames + 1, dtype=np.int32)
+            keep = np.convolve(mask.astype(np.int32), kernel, mode='same') > 0
+
+        sample_mask = np.repeat(keep, self.frame_size)
+        tail = len(samples) - len(sample_mask)
+        if tail > 0:
+            sample_mask = np.concatenate([sample_mask, np.full(tail, keep[-1])])
+        return samples[sample_mask], ratio